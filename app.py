@@ -1,83 +1,90 @@
 # app.py
+import base64
+import csv
+import io
 import os
 import re
+import unicodedata
+from collections import Counter
 from datetime import datetime
 
 from flask import (
-    Flask, render_template, request, redirect, url_for,
-    session, flash, jsonify
+    Flask, Response, render_template, request, redirect, url_for,
+    session, flash, jsonify, abort, stream_with_context
 )
 from werkzeug.security import generate_password_hash, check_password_hash
+from markupsafe import Markup
+from itsdangerous import BadSignature, URLSafeTimedSerializer
 
 import psycopg
 import psycopg.rows
 import psycopg.errors
 
-import boto3
+from cache import ByteLRUCache, TTLCache, VersionCounter
 
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("SECRET_KEY", "supersecretkey")
 
 # ===================== DB =====================
-DATABASE_URL = os.environ.get("DATABASE_URL", "")
+# Pool de conexiones por proceso (ver db.py): get_conn() es un context manager
+from db import DATABASE_URL, get_conn, fetch_pipelined, pool_stats, reset_round_trips, round_trips
+from rows import (
+    PROVIDER_DETAIL_COLUMNS, ComplianceRow, EnabledPeriodAdminRow, EnabledPeriodRow,
+    GlobalDocRow, ProjectDocRow, ProjectRow, ProviderRow, UserAuthRow,
+    columns, jsonable, row_factory,
+)
+from migrate import ensure_schema
 
-def _normalize_db_url(url: str) -> str:
-    if not url:
-        return url
-    if "sslmode=" in url:
-        return url
-    joiner = "&" if "?" in url else "?"
-    return url + f"{joiner}sslmode=require"
+# Esquema: migraciones versionadas (migrate.py) verificadas UNA vez al arrancar
+# el proceso; los handlers ya no hacen DDL.
+if DATABASE_URL and os.environ.get("MIGRATE_ON_START", "1").lower() in ("1", "true"):
+    ensure_schema()
 
-def get_conn():
-    return psycopg.connect(_normalize_db_url(DATABASE_URL))
+@app.before_request
+def _reset_db_counters():
+    reset_round_trips()
 
-def ensure_tables():
-    """
-    Crea tablas NUEVAS si no existen (no rompe la DB).
-    """
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        # meses habilitados para cada proveedor
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS enabled_periods(
-            id SERIAL PRIMARY KEY,
-            provider_id INTEGER NOT NULL REFERENCES usuarios(id),
-            periodo_year INT NOT NULL,
-            periodo_month INT NOT NULL,
-            created_at TIMESTAMP NOT NULL DEFAULT NOW(),
-            UNIQUE(provider_id, periodo_year, periodo_month)
-        )
-        """)
-
-        # docs que aplican / completado por pedido (project)
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS project_docs(
-            id SERIAL PRIMARY KEY,
-            project_id INTEGER NOT NULL REFERENCES projects(id),
-            tipo_documento TEXT NOT NULL,
-            aplica BOOLEAN NOT NULL DEFAULT FALSE,
-            completed BOOLEAN NOT NULL DEFAULT FALSE,
-            UNIQUE(project_id, tipo_documento)
-        )
-        """)
-        conn.commit()
-    finally:
-        cur.close()
-        conn.close()
+@app.after_request
+def _report_db_round_trips(resp):
+    # viajes de red a PostgreSQL que hizo ESTE request (pipeline = 1)
+    resp.headers["X-DB-Round-Trips"] = str(round_trips())
+    return resp
 
 # ===================== AWS S3 =====================
-AWS_REGION = os.environ.get("AWS_REGION", "us-east-2")
-BUCKET_NAME = os.environ.get("AWS_BUCKET_NAME", "repse-documento")
-
-s3 = boto3.client(
-    "s3",
-    aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY"),
-    region_name=AWS_REGION
-)
+# Cliente, URLs firmadas y borrado viven en storage.py
+# (el cliente boto3 se crea al primer uso, uno por proceso: storage.get_s3)
+from storage import clean_filename, get_presigned_url, head_object, on_s3_client, presign_upload, s3_delete_key
+# Borrado en cascada: outbox de llaves + worker por proceso
+from jobs import start_cascade, get_job, ensure_worker, wake_worker
+# Documentos por contenido (SHA-256, llaves cas/ con conteo de referencias)
+from blobs import BlobBusy, cas_key, hash_object, retain_blob, stored_sha256
+# Resumen de cumplimiento por pedido (project_compliance)
+from compliance import refresh_projects, refresh_provider_tipo
+# Recordatorios por correo: cola + pool de workers SMTP
+from reminders import enqueue_reminders, queue_stats, ensure_workers, wake_workers
+# Exportación de cumplimiento (CSV / XLSX en streaming)
+from export import csv_chunks, export_rows, xlsx_available, xlsx_chunks
+# ZIP de documentos globales desde S3 (streaming, prefetch acotado)
+from docs_zip import ZIP_MAX_FILES, provider_docs, zip_stream
+# Dashboard admin en vivo: LISTEN/NOTIFY compartido por proceso -> SSE
+from live import LIVE_BUSY_RETRY_MS, LIVE_ENABLED, sse_stream, subscribe
+# Operaciones del admin en lote (meses hábiles, aprobar / rechazar)
+from bulk import BULK_MAX_ITEMS, approve_users, enable_periods, reject_users
+
+# ===================== MÉTRICAS =====================
+# latencia por ruta, BD, S3 y templates -> /metrics y header Server-Timing
+import metrics
+metrics.init_app(app)
+if metrics.METRICS_ENABLED:
+    on_s3_client(metrics.instrument_s3)
+
+@app.before_request
+def _start_background_workers():
+    # revisa el pid: barato; arranca los threads tras el fork del worker
+    if DATABASE_URL:
+        ensure_worker()
+        ensure_workers()
 
 DOCUMENTOS_OBLIGATORIOS = [
     "Cédula fiscal",
@@ -103,57 +110,167 @@ def _safe_int(x):
     except:
         return None
 
-def _clean_filename(name: str) -> str:
-    name = name or "archivo"
-    name = re.sub(r"[^a-zA-Z0-9._-]+", "_", name).strip("_")
-    return name[:180] if len(name) > 180 else name
+# -------- búsqueda de pedidos (q) --------
+def _like_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
 
-def get_presigned_url(s3_key: str, download_name: str | None = None) -> str | None:
-    if not s3_key:
+def _search_clause(q: str):
+    """
+    Filtro SQL para la búsqueda de pedidos:
+      - "#123"  -> pedido_no exacto (btree, camino rápido)
+      - "texto" -> substring en name / pedido_no (índices GIN pg_trgm)
+    Sin COALESCE() sobre la columna para que el planner use los índices.
+    """
+    if q.startswith("#") and q[1:].strip():
+        return "pedido_no = %s", [q[1:].strip()]
+    like = f"%{_like_escape(q)}%"
+    return "(name ILIKE %s OR pedido_no ILIKE %s)", [like, like]
+
+# -------- paginación keyset de projects: cursor = (created_at, id) --------
+PAGE_SIZE = int(os.environ.get("PAGE_SIZE", 50))
+PAGE_SIZE_MAX = int(os.environ.get("PAGE_SIZE_MAX", 200))
+
+def _page_size(x) -> int:
+    n = _safe_int(x)
+    if not n or n < 1:
+        return PAGE_SIZE
+    return min(n, PAGE_SIZE_MAX)
+
+def _encode_cursor(row) -> str:
+    raw = f"{row.created_at.isoformat()}|{row.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(token: str | None):
+    if not token:
         return None
     try:
-        params = {"Bucket": BUCKET_NAME, "Key": s3_key}
-        if download_name:
-            params["ResponseContentDisposition"] = f'attachment; filename="{_clean_filename(download_name)}"'
-        return s3.generate_presigned_url("get_object", Params=params, ExpiresIn=300)
-    except Exception as e:
-        print("Presign error:", e)
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        created_at, pid = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(pid)
+    except Exception:
         return None
 
-def s3_delete_key(key: str):
-    if not key:
-        return
-    try:
-        s3.delete_object(Bucket=BUCKET_NAME, Key=key)
-    except Exception as e:
-        print("S3 delete error:", e)
+def _projects_page_query(where, params, after, per_page):
+    """
+    SQL de una página de projects (más recientes primero) con los filtros ya
+    armados; pide per_page + 1 filas para saber si hay siguiente página.
+    """
+    where = list(where)
+    params = list(params)
+    if after:
+        where.append("(created_at, id) < (%s, %s)")
+        params.extend(after)
+
+    sql = f"SELECT {columns(ProjectRow)} FROM projects"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY created_at DESC, id DESC LIMIT %s"
+    params.append(per_page + 1)
+    return sql, params
+
+def _project_docs_of_page_query(page_sql, page_params):
+    """
+    project_docs de los projects de esa página, SIN esperar sus ids:
+    la misma consulta de la página va como subconsulta, así puede ir en el
+    mismo lote (pipeline) que las demás.
+    """
+    sql = (f"SELECT {columns(ProjectDocRow, 'pd')} FROM project_docs pd"
+           f" WHERE pd.project_id IN (SELECT id FROM ({page_sql}) page)")
+    return sql, list(page_params)
+
+def _compliance_of_page_query(page_sql, page_params):
+    """
+    project_compliance de los projects de esa página (mismo truco que
+    _project_docs_of_page_query: va en el mismo lote del pipeline).
+    """
+    sql = (f"SELECT {columns(ComplianceRow, 'pc')} FROM project_compliance pc"
+           f" WHERE pc.project_id IN (SELECT id FROM ({page_sql}) page)")
+    return sql, list(page_params)
+
+# filtro "solo incompletos": lee el resumen, no recalcula nada
+INCOMPLETE_CLAUSE = "id IN (SELECT project_id FROM project_compliance WHERE missing_count > 0)"
+
+def _split_page(rows, per_page):
+    """
+    Regresa (rows, cursor_siguiente | None).
+    """
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = _encode_cursor(rows[-1])
+    return rows, next_cursor
+
+# ===================== DOCUMENTOS GLOBALES =====================
+def _upsert_global_doc(conn, usuario_id: int, tipo: str, nombre_archivo: str, ruta: str,
+                       sha256: str | None = None) -> tuple[str | None, str | None]:
+    """
+    Inserta o reemplaza el doc global (project_id NULL) de ese tipo
+    (índice único parcial documentos_global_usuario_tipo_uidx).
+    Regresa (ruta, sha256) del que se reemplazó o (None, None) si no había.
+    """
+    with conn.cursor() as cur:
+        while True:
+            # ON CONFLICT espera a la otra transacción que insertó la fila; sin
+            # DO UPDATE no hay que adivinar cuál era el valor anterior
+            cur.execute("""
+                INSERT INTO documentos(usuario_id, nombre_archivo, ruta, tipo_documento, fecha_subida, project_id, sha256)
+                VALUES(%s,%s,%s,%s,NOW(),NULL,%s)
+                ON CONFLICT (usuario_id, tipo_documento) WHERE project_id IS NULL DO NOTHING
+            """, (usuario_id, nombre_archivo, ruta, tipo, sha256))
+            if cur.rowcount:
+                return None, None
+
+            # ya existe: FOR UPDATE lee la versión más reciente (la del que
+            # ganó la carrera) y es justo la que se reemplaza
+            cur.execute("""
+                UPDATE documentos d
+                SET nombre_archivo=%s, ruta=%s, sha256=%s, fecha_subida=NOW()
+                FROM (
+                    SELECT id, ruta, sha256 FROM documentos
+                    WHERE usuario_id=%s AND project_id IS NULL AND tipo_documento=%s
+                    FOR UPDATE
+                ) old
+                WHERE d.id = old.id
+                RETURNING old.ruta, old.sha256
+            """, (nombre_archivo, ruta, sha256, usuario_id, tipo))
+            row = cur.fetchone()
+            if row:
+                return row
+            # se borró entre las dos sentencias: otra vuelta al INSERT
+
+def _touch_global_doc(conn, usuario_id: int, tipo: str, nombre_archivo: str, sha256: str) -> bool:
+    """
+    Si el doc global de ese tipo ya tiene ese contenido, sólo actualiza nombre
+    y fecha (nada en S3). Regresa False si el contenido es otro o no hay doc.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE documentos SET nombre_archivo=%s, fecha_subida=NOW()
+            WHERE usuario_id=%s AND project_id IS NULL AND tipo_documento=%s AND sha256=%s
+        """, (nombre_archivo, usuario_id, tipo, sha256))
+        return cur.rowcount > 0
 
 # ===================== AUTH =====================
 @app.route("/", methods=["GET", "POST"])
 def login():
-    ensure_tables()
-
     if request.method == "POST":
         usuario = request.form.get("usuario")
         contrasena = request.form.get("contrasena")
 
-        conn = get_conn()
-        cur = conn.cursor(row_factory=psycopg.rows.dict_row)
-        cur.execute("SELECT * FROM usuarios WHERE usuario=%s", (usuario,))
-        user = cur.fetchone()
-        cur.close()
-        conn.close()
+        with get_conn() as conn, conn.cursor(row_factory=row_factory(UserAuthRow)) as cur:
+            cur.execute(f"SELECT {columns(UserAuthRow)} FROM usuarios WHERE usuario=%s", (usuario,))
+            user = cur.fetchone()
 
-        if user and check_password_hash(user["password"], contrasena):
-            if user["estado"] == "pendiente":
+        if user and check_password_hash(user.password, contrasena):
+            if user.estado == "pendiente":
                 flash("Tu cuenta está pendiente de aprobación.")
                 return redirect(url_for("login"))
 
-            session["usuario"] = user["usuario"]
-            session["rol"] = user["rol"]
-            session["user_id"] = user["id"]
+            session["usuario"] = user.usuario
+            session["rol"] = user.rol
+            session["user_id"] = user.id
 
-            if user["rol"] == 1:
+            if user.rol == 1:
                 return redirect(url_for("dashboard_admin"))
             else:
                 return redirect(url_for("meses_habilitados"))
@@ -164,8 +281,6 @@ def login():
 
 @app.route("/registro", methods=["GET", "POST"])
 def registro():
-    ensure_tables()
-
     if request.method == "POST":
         nombre = request.form.get("nombre")
         usuario = request.form.get("usuario")
@@ -190,49 +305,46 @@ def registro():
         contacto_tel = (request.form.get("contacto_tel") or "").strip()
         contacto_correo = (request.form.get("contacto_correo") or "").strip()
 
-        conn = get_conn()
-        cur = conn.cursor()
-        try:
-            if rol == 2:
-                cur.execute("""
-                    INSERT INTO usuarios(
-                        nombre, usuario, correo, password, rol, estado,
+        with get_conn() as conn, conn.cursor() as cur:
+            try:
+                if rol == 2:
+                    cur.execute("""
+                        INSERT INTO usuarios(
+                            nombre, usuario, correo, password, rol, estado,
+                            repse_numero, repse_folio, repse_aviso, repse_fecha_aviso, repse_vigencia,
+                            rfc, repse_regimen, repse_objeto,
+                            contacto_nombre, contacto_tel, contacto_correo
+                        )
+                        VALUES(
+                            %s,%s,%s,%s,%s,%s,
+                            %s,%s,%s,%s,%s,
+                            %s,%s,%s,
+                            %s,%s,%s
+                        )
+                    """, (
+                        nombre, usuario, correo, password_hash, rol, "pendiente",
                         repse_numero, repse_folio, repse_aviso, repse_fecha_aviso, repse_vigencia,
-                        rfc, repse_regimen, repse_objeto,
+                        repse_rfc, repse_regimen, repse_objeto,
                         contacto_nombre, contacto_tel, contacto_correo
-                    )
-                    VALUES(
-                        %s,%s,%s,%s,%s,%s,
-                        %s,%s,%s,%s,%s,
-                        %s,%s,%s,
-                        %s,%s,%s
-                    )
-                """, (
-                    nombre, usuario, correo, password_hash, rol, "pendiente",
-                    repse_numero, repse_folio, repse_aviso, repse_fecha_aviso, repse_vigencia,
-                    repse_rfc, repse_regimen, repse_objeto,
-                    contacto_nombre, contacto_tel, contacto_correo
-                ))
-            else:
-                # Admin: solo datos base
-                cur.execute("""
-                    INSERT INTO usuarios(nombre, usuario, correo, password, rol, estado)
-                    VALUES(%s,%s,%s,%s,%s,%s)
-                """, (nombre, usuario, correo, password_hash, rol, "pendiente"))
+                    ))
+                else:
+                    # Admin: solo datos base
+                    cur.execute("""
+                        INSERT INTO usuarios(nombre, usuario, correo, password, rol, estado)
+                        VALUES(%s,%s,%s,%s,%s,%s)
+                    """, (nombre, usuario, correo, password_hash, rol, "pendiente"))
 
-            conn.commit()
-            flash("Registro exitoso. Espera aprobación del administrador.")
-            return redirect(url_for("login"))
+                conn.commit()
+                _invalidate_dashboard()
+                flash("Registro exitoso. Espera aprobación del administrador.")
+                return redirect(url_for("login"))
 
-        except psycopg.errors.UniqueViolation:
-            conn.rollback()
-            flash("El usuario ya existe.")
-        except Exception as e:
-            conn.rollback()
-            flash("Error en el registro: " + str(e))
-        finally:
-            cur.close()
-            conn.close()
+            except psycopg.errors.UniqueViolation:
+                conn.rollback()
+                flash("El usuario ya existe.")
+            except Exception as e:
+                conn.rollback()
+                flash("Error en el registro: " + str(e))
 
     return render_template("registro.html")
 
@@ -242,46 +354,150 @@ def logout():
     return redirect(url_for("login"))
 
 # ===================== ADMIN =====================
-@app.route("/admin/dashboard")
-def dashboard_admin():
-    ensure_tables()
+# Cache de los datasets del dashboard admin por filtros (+ página). Toda
+# escritura que los afecta hace _invalidate_dashboard() tras el commit.
+# DASHBOARD_CACHE_VERSION_FILE: archivo local para que TODOS los workers
+# vean la invalidación (sin él, cada proceso invalida solo lo suyo).
+_dashboard_cache = TTLCache(
+    maxsize=int(os.environ.get("DASHBOARD_CACHE_SIZE", 256)),
+    ttl=float(os.environ.get("DASHBOARD_CACHE_TTL", 60)),
+)
+_dashboard_version = VersionCounter(os.environ.get("DASHBOARD_CACHE_VERSION_FILE") or None)
+
+def _invalidate_dashboard():
+    _dashboard_version.bump()
+
+# Fragmentos: HTML de cada bloque de proveedor (admin_provider_block.html).
+# Llave = (proveedor, su versión, pedidos mostrados). La versión la cambian
+# triggers (migración 0014) con cualquier escritura en sus pedidos,
+# project_docs, documentos o encabezado, venga de donde venga; los pedidos
+# mostrados ya resumen filtros y página. Así un dashboard donde cambió un
+# proveedor re-renderiza sólo ese bloque. El bloque no trae URLs firmadas
+# (download_doc firma al dar clic): el TTL no depende de PRESIGN_EXPIRES.
+_fragment_cache = ByteLRUCache(
+    maxbytes=int(os.environ.get("FRAGMENT_CACHE_MAX_BYTES", 16 * 1024 * 1024)),
+    ttl=float(os.environ.get("FRAGMENT_CACHE_TTL", 600)),
+)
 
-    if "usuario" not in session or session.get("rol") != 1:
-        flash("Acceso denegado")
-        return redirect(url_for("login"))
+def _provider_blocks(proveedores, view, compliance, versions) -> dict:
+    """
+    {provider_id: Markup(html)} de los bloques del dashboard, del cache de
+    fragmentos o renderizados (y guardados) si cambió algo del proveedor.
+    """
+    # el template directo (sin render_template): cientos de bloques por página
+    # no deben pagar context processors y señales cada uno
+    template = app.jinja_env.get_template("admin_provider_block.html")
+    blocks = {}
+    for p in proveedores:
+        projects = view["projects_by_provider"].get(p.id, [])
+        key = (p.id, versions.get(p.id, 0), tuple(project.id for project in projects))
+        html = _fragment_cache.get(key)
+        if html is None:
+            html = template.render(
+                p=p,
+                projects=projects,
+                aplica_docs=view["aplica_docs"],
+                compliance=compliance,
+                months=MONTHS,
+            )
+            _fragment_cache.set(key, html)
+        blocks[p.id] = Markup(html)
+    return blocks
+
+def _build_admin_view(projects, global_docs, project_docs_rows):
+    """
+    View-model del dashboard admin, UNA pasada por cada lista:
+      - projects_by_provider: {provider_id: [project, ...]} (mismo orden del query)
+      - aplica_docs: {project_id: [(tipo_documento, doc_global | None), ...]}
+        solo los tipos marcados como "aplica", en el orden de DOCUMENTOS_OBLIGATORIOS
+    Así el template solo hace lookups en diccionarios.
+    """
+    projects_by_provider = {}
+    provider_of = {}
+    for p in projects:
+        projects_by_provider.setdefault(p.provider_id, []).append(p)
+        provider_of[p.id] = p.provider_id
+
+    # último doc global por (proveedor, tipo): vienen ordenados por fecha_subida DESC
+    latest_global = {}
+    for d in global_docs:
+        latest_global.setdefault((d.usuario_id, d.tipo_documento), d)
 
-    # -------- filtros GET --------
-    provider_ids = request.args.getlist("providers")
+    aplica_tipos = {}
+    for r in project_docs_rows:
+        if r.aplica:
+            aplica_tipos.setdefault(r.project_id, set()).add(r.tipo_documento)
+
+    aplica_docs = {}
+    for project_id, tipos in aplica_tipos.items():
+        provider_id = provider_of.get(project_id)
+        aplica_docs[project_id] = [
+            (tipo, latest_global.get((provider_id, tipo)))
+            for tipo in DOCUMENTOS_OBLIGATORIOS if tipo in tipos
+        ]
+
+    return {"projects_by_provider": projects_by_provider, "aplica_docs": aplica_docs}
+
+def _fetch_admin_datasets(page_sql, page_params):
+    """
+    Datasets del dashboard admin. Todas las consultas son independientes
+    => un solo viaje a PostgreSQL (pipeline).
+    """
+    with get_conn() as conn:
+        return fetch_pipelined(conn, [
+            # versiones por proveedor (cache de fragmentos). PRIMERO: cada
+            # consulta ve su propia foto (READ COMMITTED) y una versión más
+            # vieja que los datos sólo provoca un re-render de más; al revés
+            # quedarían datos viejos guardados bajo la versión nueva
+            ("SELECT provider_id, version FROM provider_versions", None),
+            # pendientes
+            (f"SELECT {columns(ProviderRow)} FROM usuarios WHERE estado='pendiente' ORDER BY id DESC",
+             None, row_factory(ProviderRow)),
+            # proveedores ALL (para selects / otras pestañas)
+            (f"SELECT {columns(ProviderRow)} FROM usuarios WHERE estado='aprobado' AND rol=2 ORDER BY nombre ASC",
+             None, row_factory(ProviderRow)),
+            # página de proyectos filtrados
+            (page_sql, page_params, row_factory(ProjectRow)),
+            # documentos (solo globales, porque ahora se suben 1 vez): descargas por tipo_documento
+            (f"""
+                SELECT {columns(GlobalDocRow)} FROM documentos
+                WHERE project_id IS NULL
+                ORDER BY fecha_subida DESC
+            """, None, row_factory(GlobalDocRow)),
+            # project_docs (qué aplica / completed) de ESA página
+            (*_project_docs_of_page_query(page_sql, page_params), row_factory(ProjectDocRow)),
+            # resumen de cumplimiento de ESA página
+            (*_compliance_of_page_query(page_sql, page_params), row_factory(ComplianceRow)),
+            # meses hábiles
+            ("""
+                SELECT ep.id, ep.provider_id, ep.periodo_year, ep.periodo_month,
+                       u.nombre, u.usuario, u.correo
+                FROM enabled_periods ep
+                JOIN usuarios u ON u.id = ep.provider_id
+                ORDER BY ep.periodo_year DESC, ep.periodo_month DESC
+            """, None, row_factory(EnabledPeriodAdminRow)),
+        ])
+
+def _admin_project_filters(args):
+    """
+    Filtros GET del dashboard admin (los mismos usa la exportación):
+    regresa (where, params, filtros) sobre columnas de projects.
+    """
     provider_ids_int = []
-    for x in provider_ids:
+    for x in args.getlist("providers"):
         xi = _safe_int(x)
         if xi is not None:
             provider_ids_int.append(xi)
 
-    year = (request.args.get("year", "") or "").strip()
-    month = (request.args.get("month", "") or "").strip()
-    q = (request.args.get("q", "") or "").strip()
+    year = (args.get("year", "") or "").strip()
+    month = (args.get("month", "") or "").strip()
+    q = (args.get("q", "") or "").strip()
 
     selected_year = int(year) if year.isdigit() else None
     selected_month = int(month) if month.isdigit() else None
 
-    conn = get_conn()
-    cur = conn.cursor(row_factory=psycopg.rows.dict_row)
-
-    # pendientes
-    cur.execute("SELECT * FROM usuarios WHERE estado='pendiente' ORDER BY id DESC")
-    pendientes = cur.fetchall()
+    only_incomplete = args.get("incompletos") == "1"
 
-    # proveedores ALL (para selects / otras pestañas)
-    cur.execute("SELECT * FROM usuarios WHERE estado='aprobado' AND rol=2 ORDER BY nombre ASC")
-    proveedores_all = cur.fetchall()
-
-    # proveedores filtrados (solo pestaña proveedores)
-    proveedores = proveedores_all
-    if provider_ids_int:
-        proveedores = [p for p in proveedores_all if p["id"] in provider_ids_int]
-
-    # -------- proyectos filtrados --------
     where = []
     params = []
 
@@ -298,76 +514,160 @@ def dashboard_admin():
         params.append(selected_month)
 
     if q:
-        where.append("(name ILIKE %s OR COALESCE(pedido_no,'') ILIKE %s)")
-        like = f"%{q}%"
-        params.extend([like, like])
+        sql_q, params_q = _search_clause(q)
+        where.append(sql_q)
+        params.extend(params_q)
+
+    if only_incomplete:
+        where.append(INCOMPLETE_CLAUSE)
+
+    filters = {
+        "provider_ids": provider_ids_int,
+        "year": selected_year,
+        "month": selected_month,
+        "q": q,
+        "only_incomplete": only_incomplete,
+    }
+    return where, params, filters
 
-    sql_projects = "SELECT * FROM projects"
-    if where:
-        sql_projects += " WHERE " + " AND ".join(where)
-    sql_projects += " ORDER BY created_at DESC"
-
-    cur.execute(sql_projects, params)
-    projects = cur.fetchall()
-    project_ids = [p["id"] for p in projects]
-
-    # -------- documentos (solo globales, porque ahora se suben 1 vez) --------
-    # los ocupamos para mapear descargas por tipo_documento
-    cur.execute("""
-        SELECT * FROM documentos
-        WHERE project_id IS NULL
-        ORDER BY fecha_subida DESC
-    """)
-    global_docs_all = cur.fetchall()
-
-    # -------- project_docs (qué aplica / completed por pedido) --------
-    project_docs_map = {}
-    if project_ids:
-        cur.execute("""
-            SELECT * FROM project_docs
-            WHERE project_id = ANY(%s)
-        """, (project_ids,))
-        rows = cur.fetchall()
-        for r in rows:
-            project_docs_map.setdefault(r["project_id"], {})[r["tipo_documento"]] = r
-
-    # -------- meses hábiles --------
-    cur.execute("""
-        SELECT ep.*, u.nombre, u.usuario, u.correo
-        FROM enabled_periods ep
-        JOIN usuarios u ON u.id = ep.provider_id
-        ORDER BY ep.periodo_year DESC, ep.periodo_month DESC
-    """)
-    enabled_periods = cur.fetchall()
-
-    cur.close()
-    conn.close()
-
-    # agrupar global docs por usuario (solo globales => pid=0)
-    docs_by_user = {}
-    for d in global_docs_all:
-        pid = 0
-        docs_by_user.setdefault(d["usuario_id"], {}).setdefault(pid, []).append(d)
+@app.route("/admin/dashboard")
+def dashboard_admin():
+    if "usuario" not in session or session.get("rol") != 1:
+        flash("Acceso denegado")
+        return redirect(url_for("login"))
+
+    # -------- filtros GET --------
+    where, params, filters = _admin_project_filters(request.args)
+    provider_ids_int = filters["provider_ids"]
+    selected_year = filters["year"]
+    selected_month = filters["month"]
+    q = filters["q"]
+    only_incomplete = filters["only_incomplete"]
+
+    after = _decode_cursor(request.args.get("after"))
+    per_page = _page_size(request.args.get("per_page"))
+
+    page_sql, page_params = _projects_page_query(where, params, after, per_page)
+
+    cache_key = (
+        _dashboard_version.get(),
+        tuple(sorted(provider_ids_int)), selected_year, selected_month, q,
+        only_incomplete, after, per_page,
+    )
+    datasets = _dashboard_cache.get(cache_key)
+    if datasets is None:
+        datasets = _fetch_admin_datasets(page_sql, page_params)
+        _dashboard_cache.set(cache_key, datasets)
+
+    (
+        provider_versions,
+        pendientes,
+        proveedores_all,
+        projects,
+        global_docs_all,
+        project_docs_rows,
+        compliance_rows,
+        enabled_periods,
+    ) = datasets
+
+    projects, next_cursor = _split_page(projects, per_page)
+
+    # proveedores filtrados (solo pestaña proveedores)
+    proveedores = proveedores_all
+    if provider_ids_int:
+        proveedores = [p for p in proveedores_all if p.id in provider_ids_int]
+
+    view = _build_admin_view(projects, global_docs_all, project_docs_rows)
+    provider_blocks = _provider_blocks(
+        proveedores, view, {r.project_id: r for r in compliance_rows}, dict(provider_versions)
+    )
 
     return render_template(
         "dashboard_admin.html",
         pendientes=pendientes,
         proveedores_all=proveedores_all,
         proveedores=proveedores,
-        proyectos=projects,
-        documentos_por_usuario=docs_by_user,  # solo globales por usuario
-        project_docs_map=project_docs_map,
-        DOCUMENTOS_OBLIGATORIOS=DOCUMENTOS_OBLIGATORIOS,
-        # PASAR LA FUNCIÓN REAL (no lambda) para poder usar (key, nombre)
-        get_presigned_url=get_presigned_url,
+        provider_blocks=provider_blocks,
+        only_incomplete=only_incomplete,
         selected_provider_ids=provider_ids_int,
         selected_year=selected_year,
         selected_month=selected_month,
         q=q,
         months=MONTHS,
-        enabled_periods=enabled_periods
+        enabled_periods=enabled_periods,
+        next_cursor=next_cursor,
+        is_first_page=after is None,
+        per_page=per_page,
+        live_enabled=LIVE_ENABLED,
+        live_busy_retry_ms=LIVE_BUSY_RETRY_MS,
     )
 
+# ===================== EXPORTACIÓN / ZIP (auditoría REPSE) =====================
+@app.route("/admin/export")
+def export_compliance():
+    """
+    Mismos filtros que el dashboard admin; una fila por (pedido, tipo de
+    documento). ?format=csv (default) o xlsx (requiere XlsxWriter).
+    """
+    if "usuario" not in session or session.get("rol") != 1:
+        flash("Acceso denegado")
+        return redirect(url_for("login"))
+
+    fmt = (request.args.get("format") or "csv").lower()
+    if fmt not in ("csv", "xlsx"):
+        abort(400)
+    if fmt == "xlsx" and not xlsx_available():
+        flash("La exportación a Excel no está disponible en este servidor; usa CSV.")
+        args = request.args.to_dict(flat=False)
+        args.pop("format", None)
+        return redirect(url_for("dashboard_admin", **args))
+
+    where, params, _ = _admin_project_filters(request.args)
+    rows = export_rows(where, params, DOCUMENTOS_OBLIGATORIOS)
+    filename = f"cumplimiento_repse_{datetime.now():%Y%m%d_%H%M}.{fmt}"
+
+    if fmt == "xlsx":
+        body = xlsx_chunks(rows)
+        mimetype = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    else:
+        body = csv_chunks(rows)
+        mimetype = "text/csv; charset=utf-8"
+
+    resp = Response(stream_with_context(body), mimetype=mimetype)
+    resp.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    resp.headers["Cache-Control"] = "no-store"
+    # que nginx no junte toda la respuesta antes de mandarla
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
+
+@app.route("/admin/documentos.zip")
+def download_docs_zip():
+    """
+    Documentos globales de los proveedores filtrados (mismos filtros que el
+    dashboard) en un solo ZIP armado al vuelo desde S3.
+    """
+    if "usuario" not in session or session.get("rol") != 1:
+        flash("Acceso denegado")
+        return redirect(url_for("login"))
+
+    where, params, filters = _admin_project_filters(request.args)
+    by_pedidos = (filters["year"] is not None or filters["month"] is not None
+                  or bool(filters["q"]) or filters["only_incomplete"])
+    docs = provider_docs(where, params, filters["provider_ids"], by_pedidos)
+
+    if not docs:
+        flash("No hay documentos para los filtros seleccionados.")
+        return redirect(url_for("dashboard_admin", **request.args.to_dict(flat=False)))
+    if len(docs) > ZIP_MAX_FILES:
+        flash(f"Son {len(docs)} documentos (máximo {ZIP_MAX_FILES} por ZIP): usa más filtros.")
+        return redirect(url_for("dashboard_admin", **request.args.to_dict(flat=False)))
+
+    filename = f"documentos_repse_{datetime.now():%Y%m%d_%H%M}.zip"
+    resp = Response(stream_with_context(zip_stream(docs)), mimetype="application/zip")
+    resp.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    resp.headers["Cache-Control"] = "no-store"
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
 
 @app.route("/admin/accion/<int:id>/<accion>")
 def accion(id, accion):
@@ -375,15 +675,13 @@ def accion(id, accion):
         flash("Acceso denegado")
         return redirect(url_for("login"))
 
-    conn = get_conn()
-    cur = conn.cursor()
-    if accion == "aprobar":
-        cur.execute("UPDATE usuarios SET estado='aprobado' WHERE id=%s", (id,))
-    else:
-        cur.execute("DELETE FROM usuarios WHERE id=%s", (id,))
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_conn() as conn, conn.cursor() as cur:
+        if accion == "aprobar":
+            cur.execute("UPDATE usuarios SET estado='aprobado' WHERE id=%s", (id,))
+        else:
+            cur.execute("DELETE FROM usuarios WHERE id=%s", (id,))
+        conn.commit()
+        _invalidate_dashboard()
 
     flash("Operación realizada.")
     return redirect(url_for("dashboard_admin"))
@@ -401,27 +699,14 @@ def delete_user():
     if user_id == session.get("user_id"):
         return jsonify({"success": False, "msg": "No puedes borrar tu propia cuenta"}), 400
 
-    conn = get_conn()
-    cur = conn.cursor(row_factory=psycopg.rows.dict_row)
-
-    # borrar S3 docs del usuario
-    cur.execute("SELECT ruta FROM documentos WHERE usuario_id=%s", (user_id,))
-    docs = cur.fetchall()
-    for d in docs:
-        s3_delete_key(d["ruta"])
-
-    # borrar BD
-    cur.execute("DELETE FROM documentos WHERE usuario_id=%s", (user_id,))
-    cur.execute("DELETE FROM project_docs WHERE project_id IN (SELECT id FROM projects WHERE provider_id=%s)", (user_id,))
-    cur.execute("DELETE FROM projects WHERE provider_id=%s", (user_id,))
-    cur.execute("DELETE FROM enabled_periods WHERE provider_id=%s", (user_id,))
-    cur.execute("DELETE FROM usuarios WHERE id=%s", (user_id,))
-
-    conn.commit()
-    cur.close()
-    conn.close()
+    # BD en una transacción; los archivos de S3 se borran en segundo plano (jobs.py)
+    with get_conn() as conn:
+        job_id = start_cascade(conn, "user", user_id, created_by=session.get("user_id"))
+        conn.commit()
+        _invalidate_dashboard()
+    wake_worker()
 
-    return jsonify({"success": True, "msg": "Usuario eliminado correctamente"})
+    return jsonify({"success": True, "msg": "Usuario eliminado correctamente", "job_id": job_id})
 
 @app.route("/admin/enable_month", methods=["POST"])
 def enable_month():
@@ -436,21 +721,18 @@ def enable_month():
     if not provider_id or not year or not month or month not in MONTHS:
         return jsonify({"success": False, "msg": "Datos inválidos"}), 400
 
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        cur.execute("""
-            INSERT INTO enabled_periods(provider_id, periodo_year, periodo_month)
-            VALUES(%s,%s,%s)
-            ON CONFLICT(provider_id, periodo_year, periodo_month) DO NOTHING
-        """, (provider_id, year, month))
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        return jsonify({"success": False, "msg": str(e)}), 500
-    finally:
-        cur.close()
-        conn.close()
+    with get_conn() as conn, conn.cursor() as cur:
+        try:
+            cur.execute("""
+                INSERT INTO enabled_periods(provider_id, periodo_year, periodo_month)
+                VALUES(%s,%s,%s)
+                ON CONFLICT(provider_id, periodo_year, periodo_month) DO NOTHING
+            """, (provider_id, year, month))
+            conn.commit()
+            _invalidate_dashboard()
+        except Exception as e:
+            conn.rollback()
+            return jsonify({"success": False, "msg": str(e)}), 500
 
     return jsonify({"success": True, "msg": "Mes habilitado"})
 
@@ -464,15 +746,126 @@ def disable_month():
     if not ep_id:
         return jsonify({"success": False, "msg": "ID inválido"}), 400
 
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM enabled_periods WHERE id=%s", (ep_id,))
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("DELETE FROM enabled_periods WHERE id=%s", (ep_id,))
+        conn.commit()
+        _invalidate_dashboard()
 
     return jsonify({"success": True, "msg": "Mes deshabilitado"})
 
+# -------- operaciones en lote (bulk.py): una sentencia por lote --------
+def _parse_periods(raw):
+    """
+    [{"year": 2026, "month": 11}, ...] -> [(2026, 11), ...]; None si alguno es inválido.
+    """
+    periods = []
+    for item in raw or []:
+        if not isinstance(item, dict):
+            return None
+        year = _safe_int(item.get("year"))
+        month = _safe_int(item.get("month"))
+        if not year or month not in MONTHS:
+            return None
+        periods.append((year, month))
+    return periods
+
+def _enable_periods_response(results):
+    counts = Counter(r["estado"] for r in results)
+    if counts["habilitado"]:
+        _invalidate_dashboard()
+
+    parts = [f"{counts['habilitado']} mes(es) habilitado(s)."]
+    if counts["ya_habilitado"]:
+        parts.append(f"{counts['ya_habilitado']} ya estaban habilitados.")
+    if counts["proveedor_invalido"]:
+        parts.append(f"{counts['proveedor_invalido']} con proveedor inválido.")
+
+    return jsonify({"success": True, "msg": " ".join(parts), "counts": dict(counts), "results": results})
+
+@app.route("/admin/enable_months", methods=["POST"])
+def enable_months():
+    """
+    Matriz proveedores × meses:
+    {"provider_ids": [...], "periods": [{"year": 2026, "month": 11}, ...]}
+    """
+    if "usuario" not in session or session.get("rol") != 1:
+        return jsonify({"success": False, "msg": "Acceso denegado"}), 403
+
+    data = request.get_json() or {}
+    provider_ids = [x for x in (_safe_int(p) for p in data.get("provider_ids") or []) if x]
+    periods = _parse_periods(data.get("periods"))
+
+    if not provider_ids or not periods:
+        return jsonify({"success": False, "msg": "Datos inválidos"}), 400
+    if len(set(provider_ids)) * len(set(periods)) > BULK_MAX_ITEMS:
+        return jsonify({"success": False, "msg": f"Máximo {BULK_MAX_ITEMS} combinaciones por lote."}), 400
+
+    with get_conn() as conn:
+        results = enable_periods(conn, periods, provider_ids)
+        conn.commit()
+
+    return _enable_periods_response(results)
+
+@app.route("/admin/enable_month_all", methods=["POST"])
+def enable_month_all():
+    """
+    Atajo de inicio de mes: habilita {"year", "month"} (default: el mes en
+    curso) a TODOS los proveedores aprobados.
+    """
+    if "usuario" not in session or session.get("rol") != 1:
+        return jsonify({"success": False, "msg": "Acceso denegado"}), 403
+
+    data = request.get_json() or {}
+    now = datetime.now()
+    year = _safe_int(data.get("year") or now.year)
+    month = _safe_int(data.get("month") or now.month)
+
+    if not year or month not in MONTHS:
+        return jsonify({"success": False, "msg": "Datos inválidos"}), 400
+
+    with get_conn() as conn:
+        results = enable_periods(conn, [(year, month)])
+        conn.commit()
+
+    return _enable_periods_response(results)
+
+@app.route("/admin/accion_lote", methods=["POST"])
+def accion_lote():
+    """
+    Aprobar / rechazar varios usuarios PENDIENTES:
+    {"accion": "aprobar" | "rechazar", "ids": [...]}
+    """
+    if "usuario" not in session or session.get("rol") != 1:
+        return jsonify({"success": False, "msg": "Acceso denegado"}), 403
+
+    data = request.get_json() or {}
+    accion = data.get("accion")
+    ids = [x for x in (_safe_int(u) for u in data.get("ids") or []) if x]
+
+    if accion not in ("aprobar", "rechazar"):
+        return jsonify({"success": False, "msg": "Acción inválida"}), 400
+    if not ids:
+        return jsonify({"success": False, "msg": "Selecciona al menos un usuario."}), 400
+    if len(set(ids)) > BULK_MAX_ITEMS:
+        return jsonify({"success": False, "msg": f"Máximo {BULK_MAX_ITEMS} usuarios por lote."}), 400
+
+    done = "aprobado" if accion == "aprobar" else "rechazado"
+    with get_conn() as conn:
+        results = (approve_users if accion == "aprobar" else reject_users)(conn, ids)
+        conn.commit()
+
+    counts = Counter(r["estado"] for r in results)
+    if counts[done]:
+        _invalidate_dashboard()
+
+    parts = [f"{counts[done]} usuario(s) {done}(s)."]
+    if counts["no_pendiente"]:
+        parts.append(f"{counts['no_pendiente']} ya no estaban pendientes.")
+    if counts["no_encontrado"]:
+        parts.append(f"{counts['no_encontrado']} no encontrados.")
+
+    return jsonify({"success": True, "msg": " ".join(parts), "counts": dict(counts), "results": results})
+
 @app.route("/admin/delete_project", methods=["POST"])
 def delete_project():
     if "usuario" not in session or session.get("rol") != 1:
@@ -483,61 +876,254 @@ def delete_project():
     if project_id is None:
         return jsonify({"success": False, "msg": "project_id inválido"}), 400
 
-    conn = get_conn()
-    cur = conn.cursor(row_factory=psycopg.rows.dict_row)
-
-    cur.execute("SELECT ruta FROM documentos WHERE project_id=%s", (project_id,))
-    docs = cur.fetchall()
-    for d in docs:
-        s3_delete_key(d["ruta"])
-
-    cur.execute("DELETE FROM project_docs WHERE project_id=%s", (project_id,))
-    cur.execute("DELETE FROM documentos WHERE project_id=%s", (project_id,))
-    cur.execute("DELETE FROM projects WHERE id=%s", (project_id,))
-
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_conn() as conn:
+        job_id = start_cascade(conn, "project", project_id, created_by=session.get("user_id"))
+        conn.commit()
+        _invalidate_dashboard()
+    wake_worker()
 
-    return jsonify({"success": True, "msg": "Proyecto eliminado correctamente"})
+    return jsonify({"success": True, "msg": "Proyecto eliminado correctamente", "job_id": job_id})
 
 @app.route("/admin/send_reminder", methods=["POST"], endpoint="send_reminder")
 def send_reminder():
-    # (simulado como lo traías)
     if "usuario" not in session or session.get("rol") != 1:
-        return jsonify({"success": False, "message": "Acceso denegado"}), 403
+        return jsonify({"success": False, "msg": "Acceso denegado"}), 403
+
     data = request.get_json() or {}
-    provider_ids = data.get("provider_ids", [])
-    sent = len(provider_ids) if provider_ids else 0
-    return jsonify({"success": True, "sent": sent})
+    provider_ids = [x for x in (_safe_int(p) for p in data.get("provider_ids") or []) if x]
+    if not provider_ids:
+        return jsonify({"success": False, "msg": "Selecciona al menos un proveedor."}), 400
+
+    # se encola y responde de inmediato; los workers de reminders.py envían
+    with get_conn() as conn:
+        result = enqueue_reminders(
+            conn, provider_ids,
+            subject=data.get("subject") or "",
+            message=data.get("message") or "",
+            created_by=session.get("user_id"),
+        )
+        conn.commit()
+    if result["queued"]:
+        wake_workers()
+
+    parts = [f"Recordatorio en cola para {len(result['queued'])} proveedor(es)."]
+    if result["no_pendientes"]:
+        parts.append(f"{len(result['no_pendientes'])} sin documentos pendientes.")
+    if result["duplicados"]:
+        parts.append(f"{len(result['duplicados'])} ya tenían uno en cola.")
+    if result["sin_correo"]:
+        parts.append(f"{len(result['sin_correo'])} sin correo registrado.")
+
+    return jsonify({
+        "success": True,
+        "msg": " ".join(parts),
+        "sent": len(result["queued"]),
+        **result,
+    })
+
+@app.route("/admin/reminders/status")
+def reminders_status():
+    if "usuario" not in session or session.get("rol") != 1:
+        return jsonify({"success": False, "msg": "Acceso denegado"}), 403
+    with get_conn() as conn:
+        stats = queue_stats(conn)
+    return jsonify({"success": True, "reminders": stats})
+
+@app.route("/admin/pool_stats")
+def admin_pool_stats():
+    # espera y saturación del pool de conexiones de ESTE worker
+    if "usuario" not in session or session.get("rol") != 1:
+        return jsonify({"success": False, "msg": "Acceso denegado"}), 403
+    return jsonify({"success": True, "pool": pool_stats()})
+
+@app.route("/admin/jobs/<int:job_id>")
+def admin_job_status(job_id):
+    # progreso del borrado en S3 de delete_user / delete_project
+    if "usuario" not in session or session.get("rol") != 1:
+        return jsonify({"success": False, "msg": "Acceso denegado"}), 403
+
+    with get_conn() as conn:
+        job = get_job(conn, job_id)
+    if not job:
+        return jsonify({"success": False, "msg": "Job no encontrado"}), 404
+    return jsonify({"success": True, "job": job})
+
+@app.route("/admin/proveedor/<int:provider_id>")
+def admin_provider_detail(provider_id):
+    # detalle completo de UN proveedor (pestaña "Información de proveedor"):
+    # el dashboard sólo trae el resumen (ProviderRow)
+    if "usuario" not in session or session.get("rol") != 1:
+        return jsonify({"success": False, "msg": "Acceso denegado"}), 403
+
+    with get_conn() as conn, conn.cursor(row_factory=psycopg.rows.dict_row) as cur:
+        cur.execute(
+            f"SELECT {', '.join(PROVIDER_DETAIL_COLUMNS)} FROM usuarios WHERE id=%s AND rol=2",
+            (provider_id,)
+        )
+        row = cur.fetchone()
+    if not row:
+        return jsonify({"success": False, "msg": "Proveedor no encontrado"}), 404
+    return jsonify({"success": True, "proveedor": jsonable(row)})
+
+@app.route("/admin/events")
+def admin_events():
+    # stream SSE con los cambios (triggers NOTIFY) para el dashboard abierto
+    if "usuario" not in session or session.get("rol") != 1:
+        return jsonify({"success": False, "msg": "Acceso denegado"}), 403
+    if not LIVE_ENABLED:
+        return jsonify({"success": False, "msg": "Actualizaciones en vivo desactivadas."}), 404
+
+    # Last-Event-ID: reconexión de EventSource; last_id: la del JS tras un 503
+    sub = subscribe(request.headers.get("Last-Event-ID") or request.args.get("last_id"))
+    if sub is None:
+        # tope de streams del worker: el dashboard reintenta después (EventSource
+        # no reconecta tras un 503; el JS usa el mismo retry)
+        resp = Response(f"retry: {LIVE_BUSY_RETRY_MS}\n\n", status=503, mimetype="text/event-stream")
+        resp.headers["Retry-After"] = str(max(1, LIVE_BUSY_RETRY_MS // 1000))
+        resp.headers["Cache-Control"] = "no-store"
+        return resp
+
+    resp = Response(stream_with_context(sse_stream(sub)), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-store"
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
+
+# ===================== DESCARGAS =====================
+@app.route("/doc/<int:id>/download")
+def download_doc(id):
+    """
+    Firma la URL de S3 SOLO cuando se da clic (no al renderizar el dashboard)
+    y redirige. Admin: cualquier documento; proveedor: solo los suyos.
+    """
+    if "usuario" not in session:
+        flash("Acceso denegado")
+        return redirect(url_for("login"))
+
+    with get_conn() as conn, conn.cursor(row_factory=psycopg.rows.dict_row) as cur:
+        cur.execute("SELECT usuario_id, nombre_archivo, ruta FROM documentos WHERE id=%s", (id,))
+        doc = cur.fetchone()
+
+    if not doc:
+        abort(404)
+    if session.get("rol") != 1 and doc["usuario_id"] != session.get("user_id"):
+        abort(403)
+
+    url = get_presigned_url(doc["ruta"], doc["nombre_archivo"])
+    if not url:
+        abort(502)
+
+    resp = redirect(url)
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
 
 # ===================== PROVEEDOR: MESES HABILITADOS =====================
 @app.route("/proveedor/meses")
 def meses_habilitados():
-    ensure_tables()
-
     if "usuario" not in session or session.get("rol") != 2:
         flash("Acceso denegado")
         return redirect(url_for("login"))
 
-    conn = get_conn()
-    cur = conn.cursor(row_factory=psycopg.rows.dict_row)
-    cur.execute("""
-        SELECT * FROM enabled_periods
-        WHERE provider_id=%s
-        ORDER BY periodo_year DESC, periodo_month DESC
-    """, (session["user_id"],))
-    periods = cur.fetchall()
-    cur.close()
-    conn.close()
+    with get_conn() as conn, conn.cursor(row_factory=row_factory(EnabledPeriodRow)) as cur:
+        cur.execute(f"""
+            SELECT {columns(EnabledPeriodRow)} FROM enabled_periods
+            WHERE provider_id=%s
+            ORDER BY periodo_year DESC, periodo_month DESC
+        """, (session["user_id"],))
+        periods = cur.fetchall()
 
     return render_template("meses_habilitados.html", periods=periods, months=MONTHS)
 
 # ===================== PROVEEDOR: REQUERIMIENTOS =====================
+# -------- alta masiva de pedidos (requerimientos) --------
+PEDIDOS_BULK_MAX = int(os.environ.get("PEDIDOS_BULK_MAX", 1000))
+PEDIDO_NO_MAX_LEN = 100
+# encabezados de la 1a columna al pegar desde Excel (sin acentos ni signos)
+PEDIDOS_HEADERS = {
+    "pedido", "pedidos", "no pedido", "no de pedido", "num pedido", "num de pedido",
+    "numero pedido", "numero de pedido", "numeros de pedido", "pedido no", "pedido num",
+    "pedido numero",
+}
+
+def _is_pedidos_header(cell: str) -> bool:
+    """
+    Sólo un encabezado claro ("Pedido", "No. de pedido", "Número de pedido"):
+    un renglón como "Pedido-7781" es un pedido y no se tira.
+    """
+    if any(ch.isdigit() for ch in cell):
+        return False
+    plain = unicodedata.normalize("NFKD", cell.lower())
+    plain = "".join(ch for ch in plain if not unicodedata.combining(ch))
+    return " ".join(re.sub(r"[^a-z]+", " ", plain).split()) in PEDIDOS_HEADERS
+
+def _parse_pedidos(form) -> list[tuple[str, str]]:
+    """
+    [(pedido_no, nombre), ...] en el orden capturado (los repetidos los
+    omite el INSERT y cuentan como omitidos). Junta:
+      - los campos pedido_no_1..pedido_no_N (captura uno por uno)
+      - el texto pegado en `pedidos_text`: un pedido por renglón; si el
+        renglón trae comas/tabs (CSV o Excel) la 1a columna es el pedido y la
+        2a, opcional, el nombre. Se ignora el 1er renglón sólo si es un
+        encabezado (_is_pedidos_header).
+    """
+    count = min(_safe_int(form.get("count")) or 0, PEDIDOS_BULK_MAX)
+    rows = [[form.get(f"pedido_no_{i}") or ""] for i in range(1, count + 1)]
+
+    text = (form.get("pedidos_text") or "").strip()
+    if text:
+        pasted = list(csv.reader(io.StringIO(text), dialect="excel-tab" if "\t" in text else "excel"))
+        if pasted and pasted[0] and _is_pedidos_header(pasted[0][0]):
+            pasted = pasted[1:]
+        rows.extend(pasted)
+
+    out = []
+    for row in rows:
+        cells = [c.strip() for c in row]
+        pedido = cells[0][:PEDIDO_NO_MAX_LEN] if cells else ""
+        if not pedido:
+            continue
+        name = cells[1] if len(cells) > 1 and cells[1] else f"Pedido {pedido}"
+        out.append((pedido, name))
+    return out
+
+def _bulk_insert_pedidos(conn, provider_id: int, year: int, month: int, pedidos) -> int:
+    """
+    Alta de todos los pedidos en UNA sentencia: los que ya existen en el
+    periodo (o vienen repetidos en la captura) se omiten (índice único projects_provider_pedido_periodo_uidx) y
+    a los nuevos se les crean sus project_docs por defecto. Regresa cuántos
+    pedidos se crearon.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            WITH new_projects AS (
+                INSERT INTO projects(provider_id, name, created_at, pedido_no, periodo_year, periodo_month)
+                SELECT %(provider)s, t.name, NOW(), t.pedido_no, %(year)s, %(month)s
+                FROM unnest(%(pedidos)s::text[], %(names)s::text[]) WITH ORDINALITY AS t(pedido_no, name, ord)
+                ORDER BY t.ord
+                ON CONFLICT (provider_id, pedido_no, periodo_year, periodo_month) DO NOTHING
+                RETURNING id
+            ), new_docs AS (
+                INSERT INTO project_docs(project_id, tipo_documento, aplica, completed)
+                SELECT np.id, d.tipo, FALSE, FALSE
+                FROM new_projects np CROSS JOIN unnest(%(tipos)s::text[]) AS d(tipo)
+                ON CONFLICT (project_id, tipo_documento) DO NOTHING
+            ), new_compliance AS (
+                -- recién creados: nada aplica todavía (todo en cero)
+                INSERT INTO project_compliance(project_id, provider_id)
+                SELECT np.id, %(provider)s FROM new_projects np
+            )
+            SELECT COUNT(*) FROM new_projects
+        """, {
+            "provider": provider_id,
+            "year": year,
+            "month": month,
+            "pedidos": [p for p, _ in pedidos],
+            "names": [n for _, n in pedidos],
+            "tipos": DOCUMENTOS_OBLIGATORIOS,
+        })
+        return cur.fetchone()[0]
+
 @app.route("/proveedor/requerimientos", methods=["GET", "POST"])
 def requerimientos():
-    ensure_tables()
-
     if "usuario" not in session or session.get("rol") != 2:
         flash("Acceso denegado")
         return redirect(url_for("login"))
@@ -549,195 +1135,268 @@ def requerimientos():
         flash("Periodo inválido.")
         return redirect(url_for("meses_habilitados"))
 
-    conn = get_conn()
-    cur = conn.cursor(row_factory=psycopg.rows.dict_row)
-
-    # verificar habilitado
-    cur.execute("""
-        SELECT 1 FROM enabled_periods
-        WHERE provider_id=%s AND periodo_year=%s AND periodo_month=%s
-        LIMIT 1
-    """, (session["user_id"], year, month))
-    ok = cur.fetchone()
-    if not ok:
-        cur.close()
-        conn.close()
-        flash("Ese mes no está habilitado.")
-        return redirect(url_for("meses_habilitados"))
+    with get_conn() as conn, conn.cursor(row_factory=psycopg.rows.dict_row) as cur:
+        # verificar habilitado
+        cur.execute("""
+            SELECT 1 FROM enabled_periods
+            WHERE provider_id=%s AND periodo_year=%s AND periodo_month=%s
+            LIMIT 1
+        """, (session["user_id"], year, month))
+        ok = cur.fetchone()
+        if not ok:
+            flash("Ese mes no está habilitado.")
+            return redirect(url_for("meses_habilitados"))
+
+        if request.method == "POST":
+            # botón "no se registraran nuevos pedidos"
+            if request.form.get("skip") == "1":
+                return redirect(url_for("dashboard_proveedor", year=year, month=month))
+
+            pedidos = _parse_pedidos(request.form)
+            if not pedidos:
+                flash("Captura o pega al menos un número de pedido.")
+            elif len(pedidos) > PEDIDOS_BULK_MAX:
+                flash(f"Máximo {PEDIDOS_BULK_MAX} pedidos por registro.")
+            else:
+                created = _bulk_insert_pedidos(conn, session["user_id"], year, month, pedidos)
+                conn.commit()
+                if created:
+                    _invalidate_dashboard()
 
-    if request.method == "POST":
-        # botón "no se registraran nuevos pedidos"
-        if request.form.get("skip") == "1":
-            cur.close()
-            conn.close()
-            return redirect(url_for("dashboard_proveedor", year=year, month=month))
-
-        count = _safe_int(request.form.get("count"))
-        if not count or count < 1:
-            flash("Indica cuántos pedidos registrarás.")
-            cur.close()
-            conn.close()
-            return render_template("requerimientos.html", months=MONTHS, year=year, month=month)
-
-        created = 0
-        for i in range(1, count + 1):
-            pedido = (request.form.get(f"pedido_no_{i}") or "").strip()
-            if not pedido:
-                continue
-
-            name = f"Pedido {pedido}"
-            cur.execute("""
-                INSERT INTO projects(provider_id, name, created_at, pedido_no, periodo_year, periodo_month)
-                VALUES(%s,%s,NOW(),%s,%s,%s)
-            """, (session["user_id"], name, pedido, year, month))
-            created += 1
+                skipped = len(pedidos) - created
+                msg = f"Se registraron {created} pedido(s) del periodo {MONTHS[month]} {year}."
+                if skipped:
+                    msg += f" {skipped} omitido(s) por estar repetidos o ya registrados."
+                flash(msg)
+                return redirect(url_for("dashboard_proveedor", year=year, month=month))
+
+    return render_template("requerimientos.html", months=MONTHS, year=year, month=month)
+
+# ===================== SUBIDA DIRECTA A S3 =====================
+# 1) presign: el server firma un POST a S3 (tipo y tamaño restringidos)
+# 2) el navegador sube el archivo directo a S3 (gunicorn no toca los bytes)
+# 3) confirm: HEAD al objeto y alta/reemplazo de la fila en documentos; el
+#    archivo queda en cas/<sha256> (blobs.py), una sola copia aunque varios
+#    proveedores suban el mismo PDF
+# El SHA-256 que manda el navegador va en el POST como x-amz-checksum-sha256:
+# S3 rechaza la subida si el contenido no coincide y el HEAD lo regresa, así
+# que confirm no lee el archivo. Sin checksum (navegador sin crypto.subtle o
+# endpoint sin soporte, S3_CHECKSUM_SHA256=0) se calcula leyéndolo en streaming.
+# Si el navegador manda el SHA-256 y coincide con el doc actual de ese tipo, el
+# paso 1 responde `unchanged` y no se sube nada. Sólo se compara contra el doc
+# del propio proveedor: un hash dicho por el cliente no da acceso a otro archivo.
+UPLOAD_CONTENT_TYPES = {
+    "pdf": "application/pdf",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+}
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", 15 * 1024 * 1024))
+UPLOAD_EXPIRES = int(os.environ.get("UPLOAD_EXPIRES", 600))
+UPLOAD_BUSY_RETRY_MS = 2000
+# las llaves de staging van en upload_staging y, si nadie las confirma,
+# jobs.sweep_staging las borra; el prefijo permite además una regla de
+# ciclo de vida del bucket (p. ej. expirar staging/ a 1 día) como respaldo
+UPLOAD_STAGING_PREFIX = "staging/"
+
+_SHA256_RE = re.compile(r"[0-9a-f]{64}")
+
+# token firmado con lo que se autorizó subir (usuario, tipo, llave)
+_upload_signer = URLSafeTimedSerializer(app.secret_key, salt="upload-global-doc")
 
+@app.route("/proveedor/upload/presign", methods=["POST"])
+def upload_presign():
+    if "usuario" not in session or session.get("rol") != 2:
+        return jsonify({"success": False, "msg": "Acceso denegado"}), 403
+
+    data = request.get_json() or {}
+    tipo = data.get("tipo_documento")
+    filename = data.get("filename") or ""
+    size = _safe_int(data.get("size"))
+    sha256 = (data.get("sha256") or "").lower()
+
+    if not tipo or tipo not in DOCUMENTOS_OBLIGATORIOS:
+        return jsonify({"success": False, "msg": "Tipo de documento inválido."}), 400
+    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    if ext not in ALLOWED_EXT:
+        return jsonify({"success": False, "msg": "Tipo de archivo no permitido."}), 400
+    if size is not None and not (0 < size <= UPLOAD_MAX_BYTES):
+        return jsonify({"success": False, "msg": f"El archivo debe pesar máximo {UPLOAD_MAX_BYTES // (1024 * 1024)} MB."}), 400
+
+    safe_original = clean_filename(filename)
+    if _SHA256_RE.fullmatch(sha256):
+        with get_conn() as conn:
+            unchanged = _touch_global_doc(conn, session["user_id"], tipo, safe_original, sha256)
+            conn.commit()
+        if unchanged:
+            _invalidate_dashboard()
+            return jsonify({"success": True, "unchanged": True,
+                            "msg": "El archivo es idéntico al actual: no se volvió a subir."})
+
+    key = (f"{UPLOAD_STAGING_PREFIX}{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
+           f"_u{session['user_id']}_GLOBAL_{safe_original}")
+    content_type = UPLOAD_CONTENT_TYPES[ext]
+
+    try:
+        post = presign_upload(key, content_type, UPLOAD_MAX_BYTES, UPLOAD_EXPIRES,
+                              sha256 if _SHA256_RE.fullmatch(sha256) else None)
+    except Exception as e:
+        return jsonify({"success": False, "msg": "Error firmando subida: " + str(e)}), 502
+
+    with get_conn() as conn:
+        conn.execute("""
+            INSERT INTO upload_staging(s3_key, usuario_id) VALUES(%s,%s)
+            ON CONFLICT (s3_key) DO UPDATE SET created_at = NOW()
+        """, (key, session["user_id"]))
         conn.commit()
-        cur.close()
-        conn.close()
 
-        flash(f"Se registraron {created} pedido(s) del periodo {MONTHS[month]} {year}.")
-        return redirect(url_for("dashboard_proveedor", year=year, month=month))
+    token = _upload_signer.dumps({
+        "u": session["user_id"], "tipo": tipo, "key": key,
+        "name": safe_original, "ct": content_type,
+    })
+    return jsonify({"success": True, "url": post["url"], "fields": post["fields"], "token": token})
 
-    cur.close()
-    conn.close()
-    return render_template("requerimientos.html", months=MONTHS, year=year, month=month)
+@app.route("/proveedor/upload/confirm", methods=["POST"])
+def upload_confirm():
+    if "usuario" not in session or session.get("rol") != 2:
+        return jsonify({"success": False, "msg": "Acceso denegado"}), 403
+
+    data = request.get_json() or {}
+    try:
+        # margen extra: la subida pudo empezar justo antes de expirar
+        info = _upload_signer.loads(data.get("token") or "", max_age=UPLOAD_EXPIRES + 300)
+    except BadSignature:
+        return jsonify({"success": False, "msg": "Token de subida inválido o vencido."}), 400
+    if info.get("u") != session["user_id"]:
+        return jsonify({"success": False, "msg": "Acceso denegado"}), 403
+
+    key = info["key"]
+    try:
+        head = head_object(key, checksum=True)
+    except Exception as e:
+        return jsonify({"success": False, "msg": "Error consultando S3: " + str(e)}), 502
+    if head is None:
+        return jsonify({"success": False, "msg": "El archivo no llegó a S3."}), 400
+
+    # la política del POST ya lo restringe; se verifica por si el bucket no la aplica
+    if head.get("ContentType") != info["ct"] or not (0 < head.get("ContentLength", 0) <= UPLOAD_MAX_BYTES):
+        s3_delete_key(key)
+        return jsonify({"success": False, "msg": "El archivo subido no es válido."}), 400
+
+    sha256, size = stored_sha256(head), head["ContentLength"]
+    if sha256 is None:
+        try:
+            sha256, size = hash_object(key)
+        except Exception as e:
+            return jsonify({"success": False, "msg": "Error leyendo el archivo en S3: " + str(e)}), 502
+
+    with get_conn() as conn:
+        try:
+            ruta = cas_key(sha256)
+            old_ruta, old_sha = _upsert_global_doc(conn, session["user_id"], info["tipo"], info["name"], ruta, sha256)
+            if old_sha != sha256:
+                retain_blob(conn, sha256, key, size, old_sha)
+            refresh_provider_tipo(conn, session["user_id"], info["tipo"])
+            conn.execute("DELETE FROM upload_staging WHERE s3_key=%s", (key,))
+            conn.commit()
+            _invalidate_dashboard()
+        except BlobBusy:
+            # el mismo contenido se está borrando de S3: la llave de staging se
+            # queda y el navegador repite confirm con el mismo token
+            conn.rollback()
+            return jsonify({"success": False, "retry_ms": UPLOAD_BUSY_RETRY_MS,
+                            "msg": "El archivo se está procesando, intenta de nuevo en unos segundos."}), 409
+        except Exception as e:
+            conn.rollback()
+            s3_delete_key(key)
+            return jsonify({"success": False, "msg": "Error guardando documento: " + str(e)}), 500
+
+    # la subida ya vive en cas/ (o el contenido ya existía): fuera la llave de
+    # staging; un anterior con llave propia (sin sha256) se borra como antes
+    s3_delete_key(key)
+    if old_ruta and old_sha is None:
+        s3_delete_key(old_ruta)
+    return jsonify({"success": True, "msg": "Documento subido correctamente.", "nombre_archivo": info["name"]})
 
 # ===================== PROVEEDOR DASHBOARD =====================
 @app.route("/proveedor/dashboard", methods=["GET", "POST"])
 def dashboard_proveedor():
-    ensure_tables()
-
     if "usuario" not in session or session.get("rol") != 2:
         flash("Acceso denegado")
         return redirect(url_for("login"))
 
-    conn = get_conn()
-    cur = conn.cursor(row_factory=psycopg.rows.dict_row)
-
     selected_year = _safe_int(request.args.get("year"))
     selected_month = _safe_int(request.args.get("month"))
     q = (request.args.get("q", "") or "").strip()
+    only_incomplete = request.args.get("incompletos") == "1"
+    after = _decode_cursor(request.args.get("after"))
+    per_page = _page_size(request.args.get("per_page"))
 
-    if request.method == "POST":
-        action = request.form.get("action")
+    with get_conn() as conn, conn.cursor(row_factory=psycopg.rows.dict_row) as cur:
+        if request.method == "POST":
+            action = request.form.get("action")
 
-        # -------- subir doc GLOBAL (una vez, reemplazable)
-        if action == "upload_global_doc":
-            tipo = request.form.get("tipo_documento")
-            archivo = request.files.get("documento")
+            # (los docs GLOBALES se suben directo a S3: /proveedor/upload/*)
 
-            if not tipo or tipo not in DOCUMENTOS_OBLIGATORIOS:
-                flash("Tipo de documento inválido.")
-            elif not archivo or not archivo.filename:
-                flash("Selecciona un archivo.")
-            else:
-                ext = archivo.filename.rsplit(".", 1)[-1].lower()
-                if ext not in ALLOWED_EXT:
-                    flash("Tipo de archivo no permitido.")
-                else:
-                    safe_original = _clean_filename(archivo.filename)
-                    key = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_u{session['user_id']}_GLOBAL_{safe_original}"
-
-                    try:
-                        # si ya existía ese tipo global, lo reemplazamos
-                        cur.execute("""
-                            SELECT id, ruta FROM documentos
-                            WHERE usuario_id=%s AND project_id IS NULL AND tipo_documento=%s
-                            ORDER BY fecha_subida DESC
-                            LIMIT 1
-                        """, (session["user_id"], tipo))
-                        old = cur.fetchone()
-                        if old and old["ruta"]:
-                            s3_delete_key(old["ruta"])
-                            cur.execute("DELETE FROM documentos WHERE id=%s", (old["id"],))
-
-                        s3.upload_fileobj(archivo, BUCKET_NAME, key, ExtraArgs={"ACL": "private"})
-
-                        cur.execute("""
-                            INSERT INTO documentos(usuario_id, nombre_archivo, ruta, tipo_documento, fecha_subida, project_id)
-                            VALUES(%s,%s,%s,%s,NOW(),NULL)
-                        """, (session["user_id"], safe_original, key, tipo))
-
-                        conn.commit()
-                        flash("Documento subido correctamente.")
-                    except Exception as e:
-                        conn.rollback()
-                        flash("Error subiendo a S3: " + str(e))
-
-        # -------- toggle aplica doc en pedido
-        elif action == "toggle_aplica":
+            # -------- sin JS: mismo cambio que /proveedor/pedido/<id>/* y la página completa
             project_id = _safe_int(request.form.get("project_id"))
-            tipo = request.form.get("tipo_documento")
-            aplica = request.form.get("aplica") == "1"
-
-            if project_id and tipo in DOCUMENTOS_OBLIGATORIOS:
-                cur.execute("""
-                    INSERT INTO project_docs(project_id, tipo_documento, aplica, completed)
-                    VALUES(%s,%s,%s,FALSE)
-                    ON CONFLICT(project_id, tipo_documento)
-                    DO UPDATE SET aplica=EXCLUDED.aplica
-                """, (project_id, tipo, aplica))
+            changed = False
+            if action == "toggle_aplica" and project_id:
+                tipo = request.form.get("tipo_documento")
+                if tipo in DOCUMENTOS_OBLIGATORIOS:
+                    changed = _set_project_aplica(
+                        conn, session["user_id"], project_id, tipo, request.form.get("aplica") == "1"
+                    )
+            elif action == "toggle_project_completed" and project_id:
+                changed = _set_project_completed(conn, session["user_id"], project_id) is not None
+            if changed:
                 conn.commit()
-
-        # -------- toggle pedido completado
-        elif action == "toggle_project_completed":
-            project_id = _safe_int(request.form.get("project_id"))
-            if project_id:
-                cur.execute("""
-                    SELECT completed FROM projects
-                    WHERE id=%s AND provider_id=%s
-                """, (project_id, session["user_id"]))
-                row = cur.fetchone()
-                if row:
-                    new_val = 0 if row["completed"] == 1 else 1
-                    cur.execute("UPDATE projects SET completed=%s WHERE id=%s", (new_val, project_id))
-                    conn.commit()
-
-    # -------- proyectos filtrables
-    where = ["provider_id=%s"]
-    params = [session["user_id"]]
-
-    if selected_year:
-        where.append("periodo_year=%s")
-        params.append(selected_year)
-    if selected_month:
-        where.append("periodo_month=%s")
-        params.append(selected_month)
-    if q:
-        where.append("(name ILIKE %s OR COALESCE(pedido_no,'') ILIKE %s)")
-        like = f"%{q}%"
-        params.extend([like, like])
-
-    sql_projects = "SELECT * FROM projects WHERE " + " AND ".join(where) + " ORDER BY created_at DESC"
-    cur.execute(sql_projects, params)
-    projects = cur.fetchall()
-    project_ids = [p["id"] for p in projects]
-
-    # docs globales (project_id NULL)
-    cur.execute("""
-        SELECT * FROM documentos
-        WHERE usuario_id=%s AND project_id IS NULL
-        ORDER BY fecha_subida DESC
-    """, (session["user_id"],))
-    global_docs = cur.fetchall()
+                _invalidate_dashboard()
+
+        # -------- proyectos filtrables
+        where = ["provider_id=%s"]
+        params = [session["user_id"]]
+
+        if selected_year:
+            where.append("periodo_year=%s")
+            params.append(selected_year)
+        if selected_month:
+            where.append("periodo_month=%s")
+            params.append(selected_month)
+        if q:
+            sql_q, params_q = _search_clause(q)
+            where.append(sql_q)
+            params.extend(params_q)
+        if only_incomplete:
+            where.append(INCOMPLETE_CLAUSE)
+
+        page_sql, page_params = _projects_page_query(where, params, after, per_page)
+
+        # página de pedidos + docs globales + project_docs + resumen: un solo viaje (pipeline)
+        projects, global_docs, project_docs_rows, compliance_rows = fetch_pipelined(conn, [
+            (page_sql, page_params, row_factory(ProjectRow)),
+            # docs globales (project_id NULL)
+            (f"""
+                SELECT {columns(GlobalDocRow)} FROM documentos
+                WHERE usuario_id=%s AND project_id IS NULL
+                ORDER BY fecha_subida DESC
+            """, (session["user_id"],), row_factory(GlobalDocRow)),
+            (*_project_docs_of_page_query(page_sql, page_params), row_factory(ProjectDocRow)),
+            (*_compliance_of_page_query(page_sql, page_params), row_factory(ComplianceRow)),
+        ])
+
+    projects, next_cursor = _split_page(projects, per_page)
 
     global_by_tipo = {}
     for d in global_docs:
-        t = d.get("tipo_documento")
+        t = d.tipo_documento
         if t and t not in global_by_tipo:
             global_by_tipo[t] = d
 
     # project_docs map
     project_docs_map = {}
-    if project_ids:
-        cur.execute("SELECT * FROM project_docs WHERE project_id = ANY(%s)", (project_ids,))
-        rows = cur.fetchall()
-        for r in rows:
-            project_docs_map.setdefault(r["project_id"], {})[r["tipo_documento"]] = r
-
-    cur.close()
-    conn.close()
+    for r in project_docs_rows:
+        project_docs_map.setdefault(r.project_id, {})[r.tipo_documento] = r
 
     return render_template(
         "dashboard_proveedor.html",
@@ -748,9 +1407,119 @@ def dashboard_proveedor():
         selected_month=selected_month,
         q=q,
         global_by_tipo=global_by_tipo,
-        project_docs_map=project_docs_map
+        project_docs_map=project_docs_map,
+        compliance={r.project_id: r for r in compliance_rows},
+        only_incomplete=only_incomplete,
+        next_cursor=next_cursor,
+        is_first_page=after is None,
+        per_page=per_page
     )
 
+# ===================== PROVEEDOR: TOGGLES (JSON) =====================
+# Un clic = un upsert + el resumen de ESE pedido; la página se actualiza en
+# su lugar (script al final de dashboard_proveedor.html) sin volver a pedir
+# ni renderizar la lista completa.
+def _set_project_aplica(conn, provider_id: int, project_id: int, tipo: str, aplica: bool) -> bool:
+    """
+    Marca si `tipo` aplica al pedido (sólo si el pedido es del proveedor).
+    Regresa False si el pedido no existe o es de otro.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO project_docs(project_id, tipo_documento, aplica, completed)
+            SELECT id, %s, %s, FALSE FROM projects WHERE id=%s AND provider_id=%s
+            ON CONFLICT(project_id, tipo_documento)
+            DO UPDATE SET aplica=EXCLUDED.aplica
+        """, (tipo, aplica, project_id, provider_id))
+        if not cur.rowcount:
+            return False
+    refresh_projects(conn, [project_id])
+    return True
+
+def _set_project_completed(conn, provider_id: int, project_id: int, completed: bool | None = None) -> int | None:
+    """
+    Fija (o invierte, con completed=None) el completado del pedido.
+    Regresa el valor nuevo (0/1) o None si el pedido no existe o es de otro.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE projects
+            SET completed = CASE WHEN %(val)s::boolean IS NULL
+                                 THEN CASE WHEN completed = 1 THEN 0 ELSE 1 END
+                                 ELSE %(val)s::boolean::int END
+            WHERE id=%(id)s AND provider_id=%(provider)s
+            RETURNING completed
+        """, {"val": completed, "id": project_id, "provider": provider_id})
+        row = cur.fetchone()
+    if row is None:
+        return None
+    refresh_projects(conn, [project_id])
+    return row[0]
+
+def _project_state(conn, project_id: int, tipo: str | None = None) -> dict:
+    """
+    Lo que la página necesita para repintar el pedido: completado, conteos del
+    resumen y, si viene `tipo`, si ese doc aplica y si el global está cargado.
+    """
+    with conn.cursor(row_factory=psycopg.rows.dict_row) as cur:
+        cur.execute("""
+            SELECT p.id AS project_id,
+                   COALESCE(p.completed, 0) = 1 AS completed,
+                   COALESCE(c.aplica_count, 0) AS aplica_count,
+                   COALESCE(c.uploaded_count, 0) AS uploaded_count,
+                   COALESCE(c.missing_count, 0) AS missing_count,
+                   COALESCE(pd.aplica, FALSE) AS aplica,
+                   EXISTS(
+                       SELECT 1 FROM documentos g
+                       WHERE g.usuario_id = p.provider_id AND g.project_id IS NULL
+                         AND g.tipo_documento = %(tipo)s
+                   ) AS uploaded
+            FROM projects p
+            LEFT JOIN project_compliance c ON c.project_id = p.id
+            LEFT JOIN project_docs pd ON pd.project_id = p.id AND pd.tipo_documento = %(tipo)s
+            WHERE p.id = %(id)s
+        """, {"id": project_id, "tipo": tipo})
+        state = cur.fetchone()
+    if tipo is None:
+        del state["aplica"], state["uploaded"]
+    else:
+        state["tipo_documento"] = tipo
+    return state
+
+@app.route("/proveedor/pedido/<int:project_id>/aplica", methods=["POST"])
+def project_toggle_aplica(project_id):
+    if "usuario" not in session or session.get("rol") != 2:
+        return jsonify({"success": False, "msg": "Acceso denegado"}), 403
+
+    data = request.get_json(silent=True) or {}
+    tipo = data.get("tipo_documento")
+    if tipo not in DOCUMENTOS_OBLIGATORIOS:
+        return jsonify({"success": False, "msg": "Tipo de documento inválido."}), 400
+
+    with get_conn() as conn:
+        if not _set_project_aplica(conn, session["user_id"], project_id, tipo, bool(data.get("aplica"))):
+            return jsonify({"success": False, "msg": "Pedido no encontrado."}), 404
+        state = _project_state(conn, project_id, tipo)
+        conn.commit()
+    _invalidate_dashboard()
+    return jsonify({"success": True, **state})
+
+@app.route("/proveedor/pedido/<int:project_id>/completado", methods=["POST"])
+def project_toggle_completed(project_id):
+    if "usuario" not in session or session.get("rol") != 2:
+        return jsonify({"success": False, "msg": "Acceso denegado"}), 403
+
+    data = request.get_json(silent=True) or {}
+    completed = data.get("completed")
+    with get_conn() as conn:
+        if _set_project_completed(conn, session["user_id"], project_id,
+                                  None if completed is None else bool(completed)) is None:
+            return jsonify({"success": False, "msg": "Pedido no encontrado."}), 404
+        state = _project_state(conn, project_id)
+        conn.commit()
+    _invalidate_dashboard()
+    return jsonify({"success": True, **state})
+
 # ===================== RUN =====================
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
@@ -0,0 +1 @@
+# bench: benchmarks locales (no se usan en producción)
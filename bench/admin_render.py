@@ -0,0 +1,114 @@
+# bench/admin_render.py
+"""
+Micro-benchmark del render de /admin/dashboard (sin DB ni S3):
+arma filas sintéticas, construye el view-model y renderiza el template.
+Tres casos del cache de fragmentos por proveedor: frío (todo se renderiza),
+tibio (nada cambió) y con UN proveedor cambiado (nueva versión).
+
+    python -m bench.admin_render
+    python -m bench.admin_render --providers 50 100 300 --projects 2 10 --repeat 5
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from flask import render_template
+
+import app as webapp
+from rows import GlobalDocRow, ProjectDocRow, ProjectRow, ProviderRow
+
+def make_rows(n_providers: int, projects_per_provider: int, aplica_ratio: float = 0.5, seed: int = 7):
+    rnd = random.Random(seed)
+    now = datetime(2026, 1, 31, 12, 0, 0)
+
+    proveedores = [
+        ProviderRow(i, f"Proveedor {i}", f"prov{i}", f"prov{i}@example.com", 2, None, None, None)
+        for i in range(1, n_providers + 1)
+    ]
+
+    projects = []
+    project_docs = []
+    pid = 0
+    for prov in proveedores:
+        for _ in range(projects_per_provider):
+            pid += 1
+            projects.append(ProjectRow(
+                id=pid, provider_id=prov.id, name=f"Pedido P{pid}",
+                pedido_no=f"P{pid}", periodo_year=2026, periodo_month=1,
+                created_at=now - timedelta(minutes=pid), completed=rnd.choice([0, 1]),
+            ))
+            for tipo in webapp.DOCUMENTOS_OBLIGATORIOS:
+                project_docs.append(ProjectDocRow(
+                    project_id=pid, tipo_documento=tipo,
+                    aplica=rnd.random() < aplica_ratio, completed=False,
+                ))
+    projects.sort(key=lambda p: p.created_at, reverse=True)
+
+    global_docs = []
+    did = 0
+    for prov in proveedores:
+        for tipo in webapp.DOCUMENTOS_OBLIGATORIOS:
+            if rnd.random() < 0.8:
+                did += 1
+                global_docs.append(GlobalDocRow(
+                    id=did, usuario_id=prov.id, tipo_documento=tipo,
+                    nombre_archivo=f"doc_{did}.pdf", fecha_subida=now - timedelta(days=did % 30),
+                ))
+    global_docs.sort(key=lambda d: d.fecha_subida, reverse=True)
+    return proveedores, projects, global_docs, project_docs
+
+def render_once(proveedores, projects, global_docs, project_docs, versions=None) -> float:
+    t0 = time.perf_counter()
+    view = webapp._build_admin_view(projects, global_docs, project_docs)
+    html = render_template(
+        "dashboard_admin.html",
+        pendientes=[],
+        proveedores_all=proveedores,
+        proveedores=proveedores,
+        provider_blocks=webapp._provider_blocks(proveedores, view, {}, versions or {}),
+        only_incomplete=False,
+        selected_provider_ids=[],
+        selected_year=None,
+        selected_month=None,
+        q="",
+        months=webapp.MONTHS,
+        enabled_periods=[],
+        next_cursor=None,
+        is_first_page=True,
+        per_page=len(projects),
+    )
+    assert html
+    return (time.perf_counter() - t0) * 1000
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--providers", type=int, nargs="+", default=[10, 50, 100, 300])
+    ap.add_argument("--projects", type=int, nargs="+", default=[1, 5, 10], help="pedidos por proveedor")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    cache = webapp._fragment_cache
+    print(f"{'proveedores':>12} {'pedidos/prov':>13} {'pedidos':>8} "
+          f"{'frío ms':>9} {'tibio ms':>9} {'1 cambio ms':>12} {'KB cache':>9}")
+    with webapp.app.test_request_context("/admin/dashboard"):
+        for n_prov in args.providers:
+            for per in args.projects:
+                rows = make_rows(n_prov, per)
+                render_once(*rows)  # warm-up (compila templates)
+
+                cold = []
+                for _ in range(args.repeat):
+                    cache.clear()
+                    cold.append(render_once(*rows))
+                warm = [render_once(*rows) for _ in range(args.repeat)]
+                # el proveedor 1 cambia antes de cada render
+                one = [render_once(*rows, versions={1: k + 1}) for k in range(args.repeat)]
+
+                print(f"{n_prov:>12} {per:>13} {n_prov * per:>8} "
+                      f"{statistics.median(cold):>9.1f} {statistics.median(warm):>9.1f} "
+                      f"{statistics.median(one):>12.1f} {cache.stats()['bytes'] / 1024:>9.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# bench/bulk_enable.py
+"""
+Habilitar meses a muchos proveedores: N requests a /admin/enable_month (uno
+por proveedor × mes, como hacía el dashboard) contra UN request a
+/admin/enable_months con la matriz completa, más el atajo
+/admin/enable_month_all. Usa los proveedores de bench.seed y un año que no
+choca con los datos sembrados (--year); al final borra lo que creó.
+Falla (exit 1) si los resultados por celda no cuadran.
+
+    DATABASE_URL=postgresql://localhost/repse_bench?sslmode=disable \\
+        python -m bench.bulk_enable --providers 200 --months 3
+"""
+import argparse
+import os
+import sys
+import time
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Meses hábiles: uno por uno contra lote")
+    parser.add_argument("--providers", type=int, default=100, help="proveedores sembrados a usar")
+    parser.add_argument("--months", type=int, default=3, help="meses por proveedor")
+    parser.add_argument("--year", type=int, default=2099, help="año de prueba (se borra al final)")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("S3_OUTBOX_WORKER", "0")
+    import app as webapp
+    from bench.seed import PREFIX
+    from db import get_conn, close_pool
+
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("SELECT id FROM usuarios WHERE usuario LIKE %s AND rol = 2 ORDER BY id LIMIT %s",
+                    (PREFIX + "%", args.providers))
+        provider_ids = [r[0] for r in cur.fetchall()]
+        cur.execute("DELETE FROM enabled_periods WHERE periodo_year IN (%s, %s)", (args.year, args.year + 1))
+        conn.commit()
+    if not provider_ids:
+        raise SystemExit("No hay proveedores sembrados: corre primero python -m bench.seed")
+
+    client = webapp.app.test_client()
+    client.post("/", data={"usuario": "admin", "contrasena": "admin123"})
+    months = list(range(1, args.months + 1))
+    cells = len(provider_ids) * len(months)
+    ok = True
+
+    # ---- uno por uno (año de prueba) ----
+    t0 = time.perf_counter()
+    trips = 0
+    for pid in provider_ids:
+        for m in months:
+            resp = client.post("/admin/enable_month", json={"provider_id": pid, "year": args.year, "month": m})
+            trips += int(resp.headers.get("X-DB-Round-Trips", 0))
+            ok &= resp.status_code == 200
+    single = time.perf_counter() - t0
+    print(f"uno por uno: {cells} requests, {trips} viajes a la BD, {single * 1000:.0f} ms")
+
+    # ---- lote (año siguiente, mismas celdas) + dos ids inválidos ----
+    year = args.year + 1
+    payload = {
+        "provider_ids": provider_ids + [-1, 2_000_000_000],
+        "periods": [{"year": year, "month": m} for m in months],
+    }
+    client.post("/admin/enable_months", json={"provider_ids": provider_ids[:1],
+                                               "periods": payload["periods"][:1]})
+    t0 = time.perf_counter()
+    resp = client.post("/admin/enable_months", json=payload)
+    batch = time.perf_counter() - t0
+    res = resp.get_json()
+    print(f"lote:        1 request, {resp.headers.get('X-DB-Round-Trips')} viaje(s) a la BD, "
+          f"{batch * 1000:.0f} ms  ({single / batch:.0f}x)")
+    print("  ", res["msg"])
+    expected = {"habilitado": cells - 1, "ya_habilitado": 1, "proveedor_invalido": 2 * len(months)}
+    if res["counts"] != expected:
+        print(f"ERROR: counts={res['counts']} esperado={expected}")
+        ok = False
+
+    # repetir el lote no crea nada
+    res = client.post("/admin/enable_months", json=payload).get_json()
+    if res["counts"].get("habilitado", 0) != 0:
+        print(f"ERROR: el lote repetido habilitó {res['counts']}")
+        ok = False
+
+    # ---- atajo: todos los aprobados ----
+    t0 = time.perf_counter()
+    resp = client.post("/admin/enable_month_all", json={"year": args.year, "month": 12})
+    res = resp.get_json()
+    print(f"todos los aprobados: {len(res['results'])} proveedores, "
+          f"{(time.perf_counter() - t0) * 1000:.0f} ms  ({res['msg']})")
+
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("""
+            SELECT COUNT(*) FROM usuarios u
+            WHERE u.rol = 2 AND u.estado = 'aprobado'
+              AND NOT EXISTS (SELECT 1 FROM enabled_periods ep
+                              WHERE ep.provider_id = u.id AND ep.periodo_year = %s AND ep.periodo_month = 12)
+        """, (args.year,))
+        missing = cur.fetchone()[0]
+        cur.execute("DELETE FROM enabled_periods WHERE periodo_year IN (%s, %s)", (args.year, year))
+        conn.commit()
+    if missing:
+        print(f"ERROR: {missing} aprobados sin el mes")
+        ok = False
+
+    close_pool()
+    print("OK" if ok else "ERROR")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+# bench/compare.py
+"""
+Compara dos resultados de bench.dashboards (antes / después):
+
+    python -m bench.compare bench/results/dashboards-abc1234-....json \\
+                            bench/results/dashboards-def5678-....json
+"""
+import argparse
+import json
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "queries_per_request")
+
+def _delta(a, b) -> str:
+    if a is None or b is None:
+        return "-"
+    if not a:
+        return f"{b}"
+    return f"{(b - a) / a * 100:+.0f}%"
+
+def compare(before: dict, after: dict) -> list[str]:
+    lines = [f"{before['meta']['commit']} -> {after['meta']['commit']}"]
+    if before["meta"].get("dataset") != after["meta"].get("dataset"):
+        lines.append("OJO: los datos sembrados no son los mismos")
+
+    for mode, scenarios in after["results"].items():
+        base = before["results"].get(mode, {})
+        lines.append(f"\n[{mode}]")
+        lines.append(f"{'escenario':32s} " + " ".join(f"{m:>26s}" for m in METRICS))
+        for name, res in scenarios.items():
+            old = base.get(name, {})
+            cells = []
+            for m in METRICS:
+                a, b = old.get(m), res.get(m)
+                cells.append(f"{str(a):>8s} -> {str(b):>8s} {_delta(a, b):>5s}")
+            lines.append(f"{name:32s} " + " ".join(f"{c:>26s}" for c in cells))
+
+    for mode, rss in after.get("peak_rss_mb", {}).items():
+        lines.append(f"peak RSS [{mode}]: {before.get('peak_rss_mb', {}).get(mode)} -> {rss} MB")
+    return lines
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara dos corridas de bench.dashboards")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args(argv)
+
+    with open(args.before, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(args.after, encoding="utf-8") as f:
+        after = json.load(f)
+    print("\n".join(compare(before, after)))
+
+if __name__ == "__main__":
+    main()
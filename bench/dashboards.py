@@ -0,0 +1,363 @@
+# bench/dashboards.py
+"""
+Benchmark de carga de los dashboards sobre datos sembrados con bench.seed:
+/admin/dashboard (sin filtros, con filtros y "solo incompletos"),
+/proveedor/dashboard y /proveedor/requerimientos.
+
+Dos modos (por defecto ambos):
+  - test:  Flask test client, secuencial, en el mismo proceso (costo de la app
+           sin red ni servidor).
+  - http:  generador de carga con N threads contra un servidor real: el
+           werkzeug threaded de este proceso o, con --url, uno externo
+           (p. ej. gunicorn; ahí S3 y la caché los configura ese servidor).
+
+S3 apunta a un stub local (bench/s3stub.py) y la caché del dashboard admin se
+apaga (DASHBOARD_CACHE_TTL=0) salvo --cache, para medir la BD en cada request.
+
+Por escenario: p50/p95/p99 (ms), req/s, consultas y viajes a la BD por request
+(headers Server-Timing y X-DB-Round-Trips) y errores. Además el pico de RSS del
+proceso. Todo se guarda en JSON para comparar commits con bench.compare:
+
+    DATABASE_URL=postgresql://localhost/repse_bench?sslmode=disable \\
+        python -m bench.dashboards --requests 300 --concurrency 8
+    python -m bench.compare bench/results/a.json bench/results/b.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.cookiejar import CookieJar
+
+from bench import s3stub
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+_DB_TIMING = re.compile(r'db;dur=([\d.]+);desc="(\d+) consultas"')
+
+# ===================== ESCENARIOS =====================
+# nombre -> (rol, función(ctx, rnd) -> (path, form; None = GET))
+def _admin_plain(ctx, rnd):
+    return "/admin/dashboard", None
+
+def _admin_filtered(ctx, rnd):
+    y, m = rnd.choice(ctx["periods"])
+    ids = rnd.sample(ctx["provider_ids"], min(5, len(ctx["provider_ids"])))
+    query = [("providers", i) for i in ids] + [("year", y), ("month", m), ("q", "B0")]
+    return "/admin/dashboard?" + urllib.parse.urlencode(query), None
+
+def _admin_incomplete(ctx, rnd):
+    return "/admin/dashboard?incompletos=1", None
+
+def _proveedor_dashboard(ctx, rnd):
+    y, m = rnd.choice(ctx["periods"])
+    return f"/proveedor/dashboard?year={y}&month={m}", None
+
+def _proveedor_requerimientos(ctx, rnd):
+    y, m = rnd.choice(ctx["periods"])
+    return f"/proveedor/requerimientos?year={y}&month={m}", None
+
+def _proveedor_requerimientos_post(ctx, rnd):
+    # 5 pedidos nuevos por request (escribe en la BD: sólo con --writes)
+    y, m = rnd.choice(ctx["periods"])
+    base = f"W{os.getpid()}{rnd.getrandbits(40):x}"
+    text = "\n".join(f"{base}-{i}" for i in range(5))
+    return f"/proveedor/requerimientos?year={y}&month={m}", {"pedidos_text": text}
+
+SCENARIOS = {
+    "admin_dashboard": ("admin", _admin_plain),
+    "admin_dashboard_filtros": ("admin", _admin_filtered),
+    "admin_dashboard_incompletos": ("admin", _admin_incomplete),
+    "proveedor_dashboard": ("proveedor", _proveedor_dashboard),
+    "proveedor_requerimientos": ("proveedor", _proveedor_requerimientos),
+}
+WRITE_SCENARIOS = {
+    "proveedor_requerimientos_post": ("proveedor", _proveedor_requerimientos_post),
+}
+
+# ===================== DATOS / METADATOS =====================
+def load_context(get_conn, prefix: str, password: str, n_users: int) -> dict:
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("""
+            SELECT id, usuario FROM usuarios
+            WHERE usuario LIKE %s AND rol=2 AND estado='aprobado'
+            ORDER BY id
+        """, (prefix + "%",))
+        providers = cur.fetchall()
+        if not providers:
+            raise SystemExit("No hay proveedores sembrados: corre primero python -m bench.seed")
+        cur.execute("""
+            SELECT DISTINCT periodo_year, periodo_month FROM enabled_periods
+            WHERE provider_id=%s
+        """, (providers[0][0],))
+        periods = cur.fetchall()
+
+        dataset = {}
+        for table in ("usuarios", "enabled_periods", "projects", "project_docs", "documentos"):
+            cur.execute(f"SELECT COUNT(*) FROM {table}")
+            dataset[table] = cur.fetchone()[0]
+
+    step = max(1, len(providers) // max(1, n_users))
+    return {
+        "provider_ids": [p[0] for p in providers],
+        "users": [p[1] for p in providers[::step][:n_users]],
+        "password": password,
+        "periods": periods,
+        "dataset": dataset,
+    }
+
+def git_commit() -> str:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                               capture_output=True, text=True).stdout.strip()
+        return sha + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+def peak_rss_mb() -> float:
+    # ru_maxrss: KB en Linux, bytes en macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+# ===================== ESTADÍSTICAS =====================
+def _parse_db_headers(headers) -> tuple[int | None, int | None]:
+    queries = None
+    m = _DB_TIMING.search(headers.get("Server-Timing") or "")
+    if m:
+        queries = int(m.group(2))
+    rt = headers.get("X-DB-Round-Trips")
+    return queries, int(rt) if rt and rt.isdigit() else None
+
+def summarize(samples: list[tuple], elapsed: float) -> dict:
+    """
+    samples: [(ms, ok, consultas, viajes), ...]
+    """
+    lat = sorted(s[0] for s in samples)
+    queries = [s[2] for s in samples if s[2] is not None]
+    trips = [s[3] for s in samples if s[3] is not None]
+    out = {
+        "requests": len(samples),
+        "errors": sum(1 for s in samples if not s[1]),
+        "rps": round(len(samples) / elapsed, 1) if elapsed else None,
+        "mean_ms": round(statistics.fmean(lat), 2) if lat else None,
+    }
+    if len(lat) >= 2:
+        q = statistics.quantiles(lat, n=100, method="inclusive")
+        out.update(p50_ms=round(q[49], 2), p95_ms=round(q[94], 2), p99_ms=round(q[98], 2))
+    else:
+        out.update(p50_ms=lat[0] if lat else None, p95_ms=None, p99_ms=None)
+    out["queries_per_request"] = round(statistics.fmean(queries), 2) if queries else None
+    out["round_trips_per_request"] = round(statistics.fmean(trips), 2) if trips else None
+    return out
+
+# ===================== MODO: TEST CLIENT =====================
+def _login_client(app, usuario: str, password: str):
+    client = app.test_client()
+    client.post("/", data={"usuario": usuario, "contrasena": password})
+    with client.session_transaction() as s:
+        if "user_id" not in s:
+            raise SystemExit(f"No se pudo iniciar sesión como {usuario}")
+    return client
+
+def run_test_client(app, ctx, scenarios, n_requests: int, warmup: int, seed: int) -> dict:
+    admin = _login_client(app, "admin", "admin123")
+    providers = [_login_client(app, u, ctx["password"]) for u in ctx["users"]]
+
+    results = {}
+    for name, (role, build) in scenarios.items():
+        rnd = random.Random(seed)
+        samples = []
+        t_start = None
+        for i in range(warmup + n_requests):
+            if i == warmup:
+                t_start = time.perf_counter()
+            client = admin if role == "admin" else providers[i % len(providers)]
+            path, form = build(ctx, rnd)
+            t0 = time.perf_counter()
+            resp = client.post(path, data=form) if form else client.get(path)
+            resp.get_data()
+            ms = (time.perf_counter() - t0) * 1000
+            if i >= warmup:
+                # 302 sin formulario = acceso denegado / periodo inválido
+                ok = resp.status_code < 400 and not (resp.status_code == 302 and form is None)
+                samples.append((ms, ok, *_parse_db_headers(resp.headers)))
+        results[name] = summarize(samples, time.perf_counter() - t_start)
+        print(f"  [test] {name:32s} p50={results[name]['p50_ms']}ms "
+              f"p95={results[name]['p95_ms']}ms consultas={results[name]['queries_per_request']}")
+    return results
+
+# ===================== MODO: HTTP =====================
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+def _login_opener(base_url: str, usuario: str, password: str):
+    jar = CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar), _NoRedirect())
+    data = urllib.parse.urlencode({"usuario": usuario, "contrasena": password}).encode()
+    try:
+        opener.open(base_url + "/", data=data, timeout=30)
+    except urllib.error.HTTPError as e:
+        if e.code != 302:
+            raise
+    if not any(c.name == "session" for c in jar):
+        raise SystemExit(f"No se pudo iniciar sesión como {usuario} en {base_url}")
+    return opener
+
+def _http_request(opener, url: str, form) -> tuple:
+    data = urllib.parse.urlencode(form).encode() if form else None
+    t0 = time.perf_counter()
+    try:
+        with opener.open(url, data=data, timeout=60) as resp:
+            resp.read()
+            status, headers = resp.status, resp.headers
+    except urllib.error.HTTPError as e:
+        e.read()
+        status, headers = e.code, e.headers
+    except OSError:
+        return (time.perf_counter() - t0) * 1000, False, None, None
+    ms = (time.perf_counter() - t0) * 1000
+    # 302 sin formulario = la sesión se perdió (redirige al login)
+    ok = status < 400 and not (status == 302 and form is None)
+    return (ms, ok, *_parse_db_headers(headers))
+
+def run_http(base_url: str, ctx, scenarios, n_requests: int, warmup: int,
+             concurrency: int, seed: int) -> dict:
+    admin = _login_opener(base_url, "admin", "admin123")
+    providers = [_login_opener(base_url, u, ctx["password"]) for u in ctx["users"]]
+
+    results = {}
+    for name, (role, build) in scenarios.items():
+        rnd = random.Random(seed)
+        jobs = []
+        for i in range(warmup + n_requests):
+            opener = admin if role == "admin" else providers[i % len(providers)]
+            path, form = build(ctx, rnd)
+            jobs.append((opener, base_url + path, form))
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(lambda j: _http_request(*j), jobs[:warmup]))
+            t_start = time.perf_counter()
+            samples = list(pool.map(lambda j: _http_request(*j), jobs[warmup:]))
+            elapsed = time.perf_counter() - t_start
+
+        results[name] = summarize(samples, elapsed)
+        print(f"  [http] {name:32s} p50={results[name]['p50_ms']}ms "
+              f"p95={results[name]['p95_ms']}ms rps={results[name]['rps']}")
+    return results
+
+def _start_local_server(app) -> tuple:
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, name="bench-http", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+# ===================== CLI =====================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de carga de los dashboards")
+    parser.add_argument("--mode", choices=("test", "http", "both"), default="both")
+    parser.add_argument("--requests", type=int, default=200, help="requests medidos por escenario")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=8, help="threads del generador HTTP")
+    parser.add_argument("--users", type=int, default=10, help="proveedores distintos que se turnan")
+    parser.add_argument("--url", help="servidor externo para el modo http (no arranca uno local)")
+    parser.add_argument("--cache", action="store_true", help="deja prendida la caché del dashboard admin")
+    parser.add_argument("--writes", action="store_true",
+                        help="incluye POST /proveedor/requerimientos (inserta pedidos)")
+    parser.add_argument("--only", nargs="*", help="sólo estos escenarios")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="archivo JSON (default: bench/results/dashboards-<commit>-<fecha>.json)")
+    args = parser.parse_args(argv)
+
+    # -------- entorno ANTES de importar la app (se lee al importar; bench.seed
+    # también la importa)
+    os.environ["S3_ENDPOINT_URL"] = s3stub.start()
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+    os.environ.setdefault("METRICS_ENABLED", "1")
+    os.environ.setdefault("S3_OUTBOX_WORKER", "0")
+    os.environ.pop("SMTP_HOST", None)
+    if not args.cache:
+        os.environ["DASHBOARD_CACHE_TTL"] = "0"
+
+    import app as webapp
+    from bench.seed import BENCH_PASSWORD, PREFIX
+    from db import DATABASE_URL, get_conn, close_pool
+
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL no está definido en variables de entorno.")
+
+    scenarios = dict(SCENARIOS)
+    if args.writes:
+        scenarios.update(WRITE_SCENARIOS)
+    if args.only:
+        scenarios = {k: v for k, v in scenarios.items() if k in args.only}
+
+    ctx = load_context(get_conn, PREFIX, BENCH_PASSWORD, args.users)
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "dataset": ctx["dataset"],
+            "args": vars(args),
+        },
+        "results": {},
+        "peak_rss_mb": {},
+    }
+    print(f"commit {commit} | " + ", ".join(f"{k}={v}" for k, v in ctx["dataset"].items()))
+
+    if args.mode in ("test", "both"):
+        report["results"]["test_client"] = run_test_client(
+            webapp.app, ctx, scenarios, args.requests, args.warmup, args.seed)
+        report["peak_rss_mb"]["test_client"] = peak_rss_mb()
+
+    if args.mode in ("http", "both"):
+        server = None
+        base_url = (args.url or "").rstrip("/")
+        if not base_url:
+            server, base_url = _start_local_server(webapp.app)
+        try:
+            report["results"]["http"] = run_http(
+                base_url, ctx, scenarios, args.requests, args.warmup, args.concurrency, args.seed)
+        finally:
+            if server is not None:
+                server.shutdown()
+        # con --url el servidor es otro proceso: su RSS no se ve desde aquí
+        report["peak_rss_mb"]["http"] = None if args.url else peak_rss_mb()
+
+    close_pool()
+
+    out = args.out
+    if not out:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        out = os.path.join(RESULTS_DIR, f"dashboards-{commit}-{stamp}.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"peak RSS: {report['peak_rss_mb']} MB")
+    print(f"Resultados: {out}")
+
+if __name__ == "__main__":
+    main()
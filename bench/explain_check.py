@@ -0,0 +1,94 @@
+# bench/explain_check.py
+"""
+Chequeo de regresión de índices: corre EXPLAIN sobre las consultas calientes
+de los dashboards y falla (exit 1) si alguna hace Seq Scan sobre una tabla
+grande. Se desactiva enable_seqscan para que el planner use un índice SI
+existe uno aplicable, aunque las tablas de prueba sean chicas.
+
+    DATABASE_URL=postgresql://localhost/repse_dev?sslmode=disable \\
+        python -m bench.explain_check
+"""
+import json
+import sys
+from datetime import datetime
+
+import app as webapp
+from db import DATABASE_URL, get_conn
+from rows import EnabledPeriodRow, GlobalDocRow, columns
+
+# tablas donde un Seq Scan es una regresión (usuarios es chica: se tolera)
+CHECKED_TABLES = {"projects", "documentos", "project_docs", "enabled_periods"}
+
+_NOW = datetime(2026, 1, 31, 12, 0, 0)
+
+def _projects_page_sql(where, params, after=None):
+    return webapp._projects_page_query(where, params, after, 50)
+
+def hot_queries():
+    """
+    (nombre, sql, params) con parámetros representativos.
+    """
+    q_sql, q_params = webapp._search_clause("P0001")
+    exact_sql, exact_params = webapp._search_clause("#P0001")
+
+    yield ("admin: proyectos sin filtros",
+           *_projects_page_sql([], []))
+    yield ("admin: proyectos por proveedor + periodo",
+           *_projects_page_sql(["provider_id = ANY(%s)", "periodo_year = %s", "periodo_month = %s"], [[1, 2], 2026, 1]))
+    yield ("admin: proyectos por periodo",
+           *_projects_page_sql(["periodo_year = %s", "periodo_month = %s"], [2026, 1]))
+    yield ("admin: proyectos página 2 (keyset)",
+           *_projects_page_sql([], [], after=(_NOW, 1000)))
+    yield ("admin/proveedor: búsqueda q",
+           *_projects_page_sql([q_sql], q_params))
+    yield ("admin/proveedor: pedido exacto (#)",
+           *_projects_page_sql([exact_sql], exact_params))
+    yield ("proveedor: proyectos del proveedor",
+           *_projects_page_sql(["provider_id=%s"], [1]))
+    yield ("proveedor: proyectos del periodo",
+           *_projects_page_sql(["provider_id=%s", "periodo_year=%s", "periodo_month=%s"], [1, 2026, 1]))
+    yield ("admin: documentos globales",
+           f"SELECT {columns(GlobalDocRow)} FROM documentos WHERE project_id IS NULL ORDER BY fecha_subida DESC", [])
+    yield ("proveedor: documentos globales",
+           f"SELECT {columns(GlobalDocRow)} FROM documentos WHERE usuario_id=%s AND project_id IS NULL ORDER BY fecha_subida DESC", [1])
+    yield ("proveedor: doc global por tipo",
+           "SELECT id, ruta FROM documentos WHERE usuario_id=%s AND project_id IS NULL AND tipo_documento=%s", [1, "Constancia RFC"])
+    yield ("project_docs de la página",
+           *webapp._project_docs_of_page_query(*_projects_page_sql(["provider_id=%s"], [1])))
+    yield ("meses habilitados del proveedor",
+           f"SELECT {columns(EnabledPeriodRow)} FROM enabled_periods WHERE provider_id=%s ORDER BY periodo_year DESC, periodo_month DESC", [1])
+    yield ("admin: meses hábiles",
+           """SELECT ep.id, ep.provider_id, ep.periodo_year, ep.periodo_month, u.nombre, u.usuario, u.correo
+              FROM enabled_periods ep JOIN usuarios u ON u.id = ep.provider_id
+              ORDER BY ep.periodo_year DESC, ep.periodo_month DESC""", [])
+
+def _seq_scans(plan: dict) -> list[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in CHECKED_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+def main() -> int:
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL no está definido en variables de entorno.")
+
+    failures = 0
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("SET LOCAL enable_seqscan = off")
+        for name, sql, params in hot_queries():
+            cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            raw = cur.fetchone()[0]
+            plan = (raw if isinstance(raw, list) else json.loads(raw))[0]["Plan"]
+            seq = _seq_scans(plan)
+            status = "OK  " if not seq else "FAIL"
+            failures += bool(seq)
+            print(f"{status} {name}" + (f"  (Seq Scan: {', '.join(seq)})" if seq else ""))
+        conn.rollback()
+
+    print(f"\n{failures} consulta(s) con Seq Scan." if failures else "\nSin Seq Scans en consultas calientes.")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
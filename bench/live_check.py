@@ -0,0 +1,186 @@
+# bench/live_check.py
+"""
+Prueba del dashboard admin en vivo contra un PostgreSQL local: levanta la app
+en un server con threads, abre /admin/events como admin, hace escrituras en
+las tablas con trigger (migración 0013) y verifica que llegan los avisos, su
+latencia, que un rollback no avisa, que un stream de más recibe 503 + retry,
+que al reconectar con Last-Event-ID llegan los avisos del hueco entre streams
+(o `resync` si ese id ya no está) y que tras matar la conexión LISTEN llega
+`resync`. Falla (exit 1) si algo no cuadra.
+
+    DATABASE_URL=postgresql://localhost/repse_dev?sslmode=disable \\
+        python -m bench.live_check
+"""
+import http.cookiejar
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+def _events(resp, out: list, stop: threading.Event):
+    # parser SSE mínimo: (evento, data, hora de llegada, último id)
+    event, data, last_id = None, None, None
+    try:
+        for raw in resp:
+            if stop.is_set():
+                return
+            line = raw.decode().rstrip("\n")
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: "):
+                data = line[6:]
+            elif line.startswith("id: "):
+                last_id = line[4:]
+            elif not line and event:
+                out.append((event, json.loads(data or "{}"), time.perf_counter(), last_id))
+                event, data = None, None
+    except Exception:
+        if not stop.is_set():
+            raise
+
+def _wait(events: list, pred, timeout: float = 5.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        for ev in events:
+            if pred(ev):
+                return ev
+        time.sleep(0.01)
+    return None
+
+def main(argv=None) -> int:
+    os.environ.setdefault("S3_OUTBOX_WORKER", "0")
+    os.environ["LIVE_KEEPALIVE"] = "1"   # reconexión rápida en la prueba
+    os.environ["LIVE_MAX_STREAMS"] = "1"  # el 2º stream debe recibir 503 + retry
+
+    from werkzeug.serving import make_server
+    import app as webapp
+    from db import get_conn
+
+    server = make_server("127.0.0.1", 0, webapp.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    opener.open(base + "/", urllib.parse.urlencode({"usuario": "admin", "contrasena": "admin123"}).encode())
+
+    def open_stream(last_id=None):
+        req = urllib.request.Request(base + "/admin/events")
+        if last_id is not None:
+            req.add_header("Last-Event-ID", last_id)
+        resp = opener.open(req)
+        events, stop = [], threading.Event()
+        threading.Thread(target=_events, args=(resp, events, stop), daemon=True).start()
+        return resp, events, stop
+
+    def close_stream(resp, stop):
+        stop.set()
+        resp.close()
+        time.sleep(2 * float(os.environ["LIVE_KEEPALIVE"]))   # el server lo nota en el siguiente ping
+
+    resp, events, stop = open_stream()
+    time.sleep(0.3)   # el listener arranca con la primera suscripción
+
+    failures = []
+    def check(name, ev, t0=None):
+        if ev is None:
+            failures.append(name)
+            print(f"  FALLA {name}")
+        else:
+            lat = f" ({(ev[2] - t0) * 1000:.1f} ms)" if t0 else ""
+            print(f"  ok    {name}{lat}")
+
+    # tope de streams: 503 con retry (SSE) y Retry-After
+    try:
+        opener.open(base + "/admin/events").close()
+        busy = None
+    except urllib.error.HTTPError as e:
+        body = e.read().decode()
+        busy = e.code == 503 and body.startswith("retry: ") and e.headers.get("Retry-After")
+        busy = (None, None, time.perf_counter()) if busy else None
+    check("2º stream con el tope lleno -> 503 + retry", busy)
+    check("stream nuevo -> ready con id", _wait(events, lambda e: e[0] == "ready" and e[3]))
+
+    usuario = f"live_{int(time.time())}"
+    with get_conn() as conn:
+        # alta pendiente -> INSERT usuarios con nombre/estado
+        t0 = time.perf_counter()
+        uid = conn.execute("""
+            INSERT INTO usuarios(nombre, usuario, correo, password, rol, estado)
+            VALUES(%s,%s,%s,'x',2,'pendiente') RETURNING id
+        """, ("Live Check", usuario, usuario + "@x.com")).fetchone()[0]
+        conn.commit()
+        check("alta pendiente", _wait(events, lambda e: e[1].get("t") == "usuarios"
+                                       and e[1].get("id") == uid and e[1].get("estado") == "pendiente"), t0)
+
+        # rollback: no debe avisar
+        conn.execute("UPDATE usuarios SET estado='aprobado' WHERE id=%s", (uid,))
+        conn.rollback()
+        time.sleep(0.3)
+        if any(e[1].get("id") == uid and e[1].get("estado") == "aprobado" for e in events):
+            failures.append("rollback avisó")
+            print("  FALLA rollback avisó")
+        else:
+            print("  ok    rollback sin aviso")
+
+        t0 = time.perf_counter()
+        conn.execute("UPDATE usuarios SET estado='aprobado' WHERE id=%s", (uid,))
+        conn.commit()
+        check("aprobación", _wait(events, lambda e: e[1].get("id") == uid and e[1].get("estado") == "aprobado"), t0)
+
+        t0 = time.perf_counter()
+        pid = conn.execute("""
+            INSERT INTO projects(provider_id, name, created_at, completed) VALUES(%s,'live',NOW(),0) RETURNING id
+        """, (uid,)).fetchone()[0]
+        conn.execute("UPDATE projects SET completed=1 WHERE id=%s", (pid,))
+        conn.commit()
+        check("pedido completado", _wait(events, lambda e: e[1].get("t") == "projects"
+                                          and e[1].get("id") == pid and e[1].get("op") == "UPDATE"), t0)
+
+        # fin del stream (como al llegar a LIVE_STREAM_MAX_SECONDS): lo escrito en
+        # el hueco llega al reconectar con Last-Event-ID, sin resync
+        last_id = events[-1][3]
+        close_stream(resp, stop)
+        conn.execute("UPDATE projects SET completed=0 WHERE id=%s", (pid,))
+        conn.commit()
+        t0 = time.perf_counter()
+        resp, events, stop = open_stream(last_id)
+        check("reconexión con Last-Event-ID -> aviso del hueco",
+              _wait(events, lambda e: e[0] == "change" and e[1].get("id") == pid
+                    and e[1].get("completed") == 0 and int(e[3]) > int(last_id)), t0)
+        time.sleep(0.3)
+        if any(e[0] == "resync" for e in events):
+            failures.append("reconexión con resync")
+            print("  FALLA reconexión con resync")
+
+        # un id que ya no está en el historial (y la secuencia avanzó) -> resync
+        close_stream(resp, stop)
+        resp, events, stop = open_stream("0")
+        check("Last-Event-ID fuera del historial -> resync", _wait(events, lambda e: e[0] == "resync"))
+
+        # la conexión LISTEN se cae -> resync al reconectar
+        events.clear()
+        n = conn.execute("""
+            SELECT COUNT(pg_terminate_backend(pid)) FROM pg_stat_activity
+            WHERE application_name = %s
+        """, (f"repse-live-{os.getpid()}",)).fetchone()[0]
+        conn.commit()
+        check(f"resync tras reconectar ({n} conexión terminada)",
+              _wait(events, lambda e: e[0] == "resync", timeout=10))
+
+        # limpieza (también avisa: DELETE)
+        conn.execute("DELETE FROM projects WHERE id=%s", (pid,))
+        conn.execute("DELETE FROM usuarios WHERE id=%s", (uid,))
+        conn.commit()
+
+    stop.set()
+    resp.close()
+    server.shutdown()
+    print("OK" if not failures else f"ERROR: {', '.join(failures)}")
+    return 0 if not failures else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+# bench/outbox_check.py
+"""
+Prueba del borrado en cascada (jobs.py) contra un S3 local (moto server,
+MinIO) y un PostgreSQL local: un proveedor temporal con documentos de llave
+propia y uno en cas/ se borra con start_cascade y el outbox se drena en lotes
+chicos. Verifica:
+
+  - delete_objects por lotes (nunca más de --batch llaves por llamada)
+  - los objetos borrados ya no están en el bucket; el blob cas/ y su fila tampoco
+  - una llave con error parcial (Errors de delete_objects, inyectado) queda
+    pending con backoff, se reintenta y al llegar a S3_OUTBOX_MAX_ATTEMPTS
+    queda failed; el job pasa de running a failed con sus conteos
+  - un job sin errores termina en done
+  - durante la llamada a S3 ninguna conexión del pool está tomada, las filas
+    del outbox no están bloqueadas y retain_blob no reutiliza el blob que se
+    está borrando (BlobBusy)
+
+Falla (exit 1) si algo no cuadra. Borra lo que creó.
+
+    moto_server -p 5055 &
+    S3_ENDPOINT_URL=http://127.0.0.1:5055 AWS_ACCESS_KEY_ID=x AWS_SECRET_ACCESS_KEY=x \\
+    DATABASE_URL=postgresql://localhost/repse_dev?sslmode=disable \\
+        python -m bench.outbox_check
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+
+STUCK_ERROR = {"Code": "AccessDenied", "Message": "inyectado por outbox_check"}
+
+class _Probe:
+    """
+    Hooks de botocore sobre delete_objects: anota cada lote y el estado de la
+    BD durante la llamada, e inyecta un error parcial para `stuck`.
+    """
+
+    def __init__(self, prefix: str, stuck: str, cas: str, cas_sha: str):
+        self.prefix = prefix
+        self.stuck = stuck
+        self.cas = cas
+        self.cas_sha = cas_sha
+        self.calls = []          # llaves de cada lote que tocan la prueba
+        self.sizes = []          # tamaño de cada lote
+        self.during_call = []    # (conexiones en uso, filas bloqueadas)
+        self.blob_busy = None
+
+    def register(self, client):
+        client.meta.events.register("before-parameter-build.s3.DeleteObjects", self.before)
+        client.meta.events.register("after-call.s3.DeleteObjects", self.after)
+
+    def before(self, params, **kwargs):
+        from blobs import BlobBusy, retain_blob
+        from db import get_conn, pool_stats
+
+        keys = [o["Key"] for o in params["Delete"]["Objects"]]
+        self.sizes.append(len(keys))
+        mine = [k for k in keys if k.startswith(self.prefix) or k == self.cas]
+        if not mine:
+            return
+        self.calls.append(mine)
+
+        in_use = pool_stats().get("in_use", 0)
+        with get_conn() as conn, conn.cursor() as cur:
+            # NOWAIT: si el drain tuviera las filas con FOR UPDATE esto fallaría
+            try:
+                cur.execute("SELECT id FROM s3_delete_outbox WHERE s3_key = ANY(%s) FOR UPDATE NOWAIT", (mine,))
+                locked = False
+            except Exception:
+                locked = True
+            conn.rollback()
+            if self.cas in mine:
+                try:
+                    retain_blob(conn, self.cas_sha, "no-existe", 1)
+                    self.blob_busy = False
+                except BlobBusy:
+                    self.blob_busy = True
+                conn.rollback()
+        self.during_call.append((in_use, locked))
+
+    def after(self, parsed, **kwargs):
+        if any(k == self.stuck for call in self.calls[-1:] for k in call):
+            parsed.setdefault("Errors", []).append({"Key": self.stuck, **STUCK_ERROR})
+
+def _make_provider(cur, tag: str, keys: list[str], cas=None) -> int:
+    cur.execute("""
+        INSERT INTO usuarios(nombre, usuario, correo, password, rol, estado)
+        VALUES(%s, %s, %s, 'x', 2, 'aprobado') RETURNING id
+    """, (tag, tag, f"{tag}@bench.test"))
+    uid = cur.fetchone()[0]
+    cur.execute("""
+        INSERT INTO documentos(usuario_id, nombre_archivo, ruta, tipo_documento)
+        SELECT %s, 'doc.pdf', k, 'Documento ' || n
+        FROM unnest(%s::text[]) WITH ORDINALITY AS t(k, n)
+    """, (uid, keys))
+    if cas:
+        sha, key, size = cas
+        cur.execute("""
+            INSERT INTO s3_blobs(sha256, s3_key, size_bytes, refcount) VALUES(%s, %s, %s, 1)
+        """, (sha, key, size))
+        cur.execute("""
+            INSERT INTO documentos(usuario_id, nombre_archivo, ruta, tipo_documento, sha256)
+            VALUES(%s, 'acta.pdf', %s, 'Acta constitutiva', %s)
+        """, (uid, key, sha))
+    return uid
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Prueba del outbox de borrado contra un S3 local")
+    parser.add_argument("--docs", type=int, default=25, help="documentos de llave propia del proveedor")
+    parser.add_argument("--batch", type=int, default=10, help="llaves por delete_objects")
+    args = parser.parse_args(argv)
+
+    if not os.environ.get("S3_ENDPOINT_URL"):
+        raise SystemExit("Define S3_ENDPOINT_URL (S3 local): este script sube y borra objetos.")
+    os.environ.update({
+        "S3_OUTBOX_WORKER": "0",          # sólo los drain_once de esta prueba
+        "S3_OUTBOX_MAX_ATTEMPTS": "3",
+        "S3_OUTBOX_BACKOFF_BASE": "30",
+    })
+    import jobs
+    from blobs import cas_key
+    from db import get_conn, close_pool
+    from storage import BUCKET_NAME, get_s3, on_s3_client
+
+    tag = f"outboxcheck{int(time.time())}"
+    prefix = f"bench/{tag}/"
+    keys = [f"{prefix}{i:03d}.pdf" for i in range(args.docs)]
+    stuck = keys[len(keys) // 2]
+    body = f"%PDF-1.4 {tag}".encode()
+    sha = hashlib.sha256(body).hexdigest()
+    cas = cas_key(sha)
+
+    probe = _Probe(prefix, stuck, cas, sha)
+    on_s3_client(probe.register)
+    s3 = get_s3()
+    region = s3.meta.region_name
+    config = {} if region in (None, "us-east-1") else {
+        "CreateBucketConfiguration": {"LocationConstraint": region}}
+    try:
+        s3.create_bucket(Bucket=BUCKET_NAME, **config)
+    except (s3.exceptions.BucketAlreadyOwnedByYou, s3.exceptions.BucketAlreadyExists):
+        pass
+    clean_keys = [f"{prefix}limpio/{i}.pdf" for i in range(3)]
+    for key in keys + clean_keys + [cas]:
+        s3.put_object(Bucket=BUCKET_NAME, Key=key, Body=body)
+
+    with get_conn() as conn, conn.cursor() as cur:
+        uid = _make_provider(cur, tag, keys, (sha, cas, len(body)))
+        clean_uid = _make_provider(cur, tag + "_limpio", clean_keys)
+        job_id = jobs.start_cascade(conn, "user", uid)
+        clean_job = jobs.start_cascade(conn, "user", clean_uid)
+        conn.commit()
+
+    def drain():
+        while jobs.drain_once(args.batch) >= args.batch:
+            pass
+
+    def stuck_row():
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT status, attempts, last_error, locked_until,
+                       EXTRACT(EPOCH FROM next_attempt_at - NOW())
+                FROM s3_delete_outbox WHERE job_id = %s AND s3_key = %s
+            """, (job_id, stuck))
+            return cur.fetchone()
+
+    def due():
+        with get_conn() as conn:
+            conn.execute("""
+                UPDATE s3_delete_outbox SET next_attempt_at = NOW() - INTERVAL '1 second'
+                WHERE job_id = %s AND status = 'pending'
+            """, (job_id,))
+            conn.commit()
+
+    def job(jid):
+        with get_conn() as conn:
+            return jobs.get_job(conn, jid)
+
+    def remaining():
+        listed = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=prefix).get("Contents", [])
+        cas_left = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=cas).get("Contents", [])
+        return sorted(o["Key"] for o in listed + cas_left)
+
+    failures = []
+    def check(name, cond, detail=""):
+        print(f"  {'ok   ' if cond else 'FALLA'} {name}{'  ' + str(detail) if detail else ''}")
+        if not cond:
+            failures.append(name)
+
+    try:
+        # ---- 1a pasada: todo se borra salvo la llave con error ----
+        drain()
+        total = len(keys) + 1
+        mine = sum(len(c) for c in probe.calls)
+        check("delete_objects por lotes", max(probe.sizes, default=0) <= args.batch
+              and len(probe.calls) < mine, (len(probe.calls), probe.sizes))
+        # el error es inyectado en la respuesta: moto sí borró esa llave
+        check("borrados en S3", set(remaining()) <= {stuck}, remaining() or "")
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM s3_blobs WHERE sha256 = %s", (sha,))
+            check("fila del blob cas/ borrada", cur.fetchone()[0] == 0)
+
+        st, att, err, locked, wait = stuck_row()
+        check("error parcial -> pending con backoff", st == "pending" and att == 1 and locked is None
+              and "AccessDenied" in (err or "") and 25 <= float(wait) <= 35, (st, att, err, wait))
+        j = job(job_id)
+        check("job en progreso", j["status"] == "running" and j["total_keys"] == total
+              and j["deleted_keys"] == total - 1 and j["pending_keys"] == 1, j)
+        check("job sin errores -> done", job(clean_job)["status"] == "done", job(clean_job))
+
+        # ---- reintentos hasta failed ----
+        due()
+        drain()
+        st, att, _, _, wait = stuck_row()
+        check("2o intento -> backoff doble", st == "pending" and att == 2 and 55 <= float(wait) <= 65, (st, att, wait))
+        due()
+        drain()
+        st, att, _, _, _ = stuck_row()
+        check("al máximo de intentos -> failed", st == "failed" and att == 3, (st, att))
+        j = job(job_id)
+        check("job terminado en failed", j["status"] == "failed" and j["failed_keys"] == 1
+              and j["deleted_keys"] == total - 1 and j["finished_at"], j)
+
+        check("envío sin conexión del pool ni filas bloqueadas",
+              bool(probe.during_call) and all(n == 0 and not lk for n, lk in probe.during_call),
+              probe.during_call)
+        check("blob en borrado no se reutiliza (BlobBusy)", probe.blob_busy is True, probe.blob_busy)
+    finally:
+        for key in remaining():
+            s3.delete_object(Bucket=BUCKET_NAME, Key=key)
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("DELETE FROM s3_delete_outbox WHERE job_id = ANY(%s)", ([job_id, clean_job],))
+            cur.execute("DELETE FROM delete_jobs WHERE id = ANY(%s)", ([job_id, clean_job],))
+            cur.execute("DELETE FROM s3_blobs WHERE sha256 = %s", (sha,))
+            conn.commit()
+        close_pool()
+
+    print("OK" if not failures else f"ERROR: {', '.join(failures)}")
+    return 0 if not failures else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+# bench/reminders_check.py
+"""
+Prueba del worker de recordatorios contra un SMTP local (aiosmtpd) y un
+PostgreSQL local: encola recordatorios de proveedores temporales, corre
+drain_once y verifica el resultado de cada caso:
+
+  - entregado             -> sent, el servidor recibió el correo
+  - 550 (RCPT)            -> failed de inmediato (rechazo definitivo)
+  - 451 (RCPT)            -> pending, attempts=1, reintento en REMINDER_BACKOFF_BASE
+  - conexión rechazada    -> pending con backoff, error de conexión
+
+y que durante el envío ninguna conexión del pool está tomada y las filas ya
+no están bloqueadas. Falla (exit 1) si algo no cuadra. Borra lo que creó.
+
+    pip install aiosmtpd
+    DATABASE_URL=postgresql://localhost/repse_dev?sslmode=disable \\
+        python -m bench.reminders_check
+"""
+import os
+import socket
+import sys
+import time
+
+def _closed_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class _Handler:
+    """
+    RCPT a perm@ -> 550, temp@ -> 451; el resto se acepta. En DATA anota
+    cuántas conexiones del pool están en uso y si la fila sigue bloqueada.
+    """
+
+    def __init__(self):
+        self.delivered = []
+        self.during_send = []   # (conexiones en uso, fila bloqueada)
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("perm"):
+            return "550 5.1.1 Usuario inexistente"
+        if address.startswith("temp"):
+            return "451 4.3.0 Intente más tarde"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        from db import get_conn, pool_stats
+        in_use = pool_stats().get("in_use", 0)
+        # NOWAIT: si el worker tuviera la fila con FOR UPDATE esto fallaría
+        with get_conn() as conn, conn.cursor() as cur:
+            try:
+                cur.execute("SELECT id FROM reminders WHERE to_email = ANY(%s) FOR UPDATE NOWAIT",
+                            (envelope.rcpt_tos,))
+                locked = False
+            except Exception:
+                locked = True
+            conn.rollback()
+        self.during_send.append((in_use, locked))
+        self.delivered.extend(envelope.rcpt_tos)
+        return "250 Message accepted"
+
+def main(argv=None) -> int:
+    from aiosmtpd.controller import Controller
+
+    handler = _Handler()
+    port = _closed_port()   # libre ahora; Controller no acepta port=0
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+
+    os.environ.update({
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": str(port),
+        "SMTP_STARTTLS": "0",
+        "SMTP_USER": "",
+        "REMINDER_WORKERS": "0",   # sólo drain_once de esta prueba
+    })
+    import reminders
+    from db import get_conn, close_pool
+
+    tag = f"remcheck{int(time.time())}"
+    cases = ["ok", "perm", "temp", "refused"]
+    ids = {}
+    with get_conn() as conn, conn.cursor() as cur:
+        for case in cases:
+            cur.execute("""
+                INSERT INTO usuarios(nombre, usuario, correo, password, rol, estado)
+                VALUES(%s, %s, %s, 'x', 2, 'aprobado') RETURNING id
+            """, (f"Rem {case}", f"{tag}_{case}", f"{case}@{tag}.test"))
+            uid = cur.fetchone()[0]
+            cur.execute("""
+                INSERT INTO reminders(provider_id, to_email, subject, body, next_attempt_at)
+                VALUES(%s, %s, 'Prueba', 'cuerpo', NOW() + INTERVAL '1 hour') RETURNING id
+            """, (uid, f"{case}@{tag}.test"))
+            ids[case] = (uid, cur.fetchone()[0])
+        conn.commit()
+
+    def due(*which):
+        # sólo los casos de esta fase quedan vencidos (no toca otros de la cola)
+        with get_conn() as conn:
+            conn.execute("UPDATE reminders SET next_attempt_at = NOW() - INTERVAL '1 second' WHERE id = ANY(%s)",
+                         ([ids[c][1] for c in which],))
+            conn.commit()
+
+    smtp = reminders.SmtpSession()
+    try:
+        due("ok", "perm", "temp")
+        n1 = reminders.drain_once(smtp)
+        smtp.close()
+
+        # servidor caído: puerto sin nadie escuchando
+        reminders.SMTP_PORT = _closed_port()
+        due("refused")
+        n2 = reminders.drain_once(smtp)
+    finally:
+        smtp.close()
+        controller.stop()
+
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("""
+            SELECT id, status, attempts, last_error, locked_until,
+                   EXTRACT(EPOCH FROM next_attempt_at - NOW())
+            FROM reminders WHERE id = ANY(%s)
+        """, ([r for _, r in ids.values()],))
+        rows = {r[0]: r[1:] for r in cur.fetchall()}
+
+        cur.execute("DELETE FROM reminders WHERE id = ANY(%s)", ([r for _, r in ids.values()],))
+        cur.execute("DELETE FROM usuarios WHERE id = ANY(%s)", ([u for u, _ in ids.values()],))
+        conn.commit()
+    close_pool()
+
+    failures = []
+    def check(name, cond, detail=""):
+        print(f"  {'ok   ' if cond else 'FALLA'} {name}{'  ' + str(detail) if detail else ''}")
+        if not cond:
+            failures.append(name)
+
+    base = reminders.REMINDER_BACKOFF_BASE
+    status = {case: rows[ids[case][1]] for case in cases}
+    check("lotes procesados", n1 == 3 and n2 == 1, (n1, n2))
+
+    st, att, err, locked, wait = status["ok"]
+    check("entregado -> sent", st == "sent" and att == 1 and err is None and locked is None, status["ok"])
+    check("el servidor recibió el correo", f"ok@{tag}.test" in handler.delivered, handler.delivered)
+
+    st, att, err, locked, wait = status["perm"]
+    check("550 -> failed", st == "failed" and att == 1 and "550" in (err or ""), status["perm"])
+
+    st, att, err, locked, wait = status["temp"]
+    check("451 -> pending con backoff", st == "pending" and att == 1 and "451" in (err or "")
+          and locked is None and base - 5 <= float(wait) <= base + 5, status["temp"])
+
+    st, att, err, locked, wait = status["refused"]
+    check("conexión rechazada -> pending con backoff", st == "pending" and att == 1
+          and "Refused" in (err or "") and locked is None and base - 5 <= float(wait) <= base + 5,
+          status["refused"])
+
+    check("envío sin conexión del pool ni filas bloqueadas",
+          bool(handler.during_send) and all(in_use == 0 and not lk for in_use, lk in handler.during_send),
+          handler.during_send)
+
+    print("OK" if not failures else f"ERROR: {', '.join(failures)}")
+    return 0 if not failures else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
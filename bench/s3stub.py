@@ -0,0 +1,70 @@
+# bench/s3stub.py
+"""
+Stub HTTP de S3 para los benchmarks: responde OK a todo sin guardar nada, de
+modo que ninguna llamada salga a AWS ni mida la red. Se usa apuntando el
+cliente con S3_ENDPOINT_URL ANTES de importar storage/app:
+
+    url = s3stub.start()
+    os.environ["S3_ENDPOINT_URL"] = url
+
+Cubre lo que usa la app: HEAD/GET/PUT/DELETE de objetos, POST de formulario
+(subida directa) y POST ?delete (delete_objects).
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BODY = b"%PDF-1.4\n% bench\n"
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, status: int, body: bytes = b"", content_type: str = "application/xml"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", '"bench"')
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _drain(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        if n:
+            self.rfile.read(n)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.send_header("ETag", '"bench"')
+        self.end_headers()
+
+    def do_GET(self):
+        self._reply(200, BODY, "application/pdf")
+
+    def do_PUT(self):
+        self._drain()
+        self._reply(200)
+
+    def do_DELETE(self):
+        self._reply(204)
+
+    def do_POST(self):
+        self._drain()
+        if "delete" in self.path.split("?", 1)[-1]:
+            # delete_objects con Quiet=True: sin errores = todo borrado
+            self._reply(200, b'<?xml version="1.0" encoding="UTF-8"?><DeleteResult/>')
+        else:
+            self._reply(204)
+
+    def log_message(self, *args):
+        pass
+
+def start(host: str = "127.0.0.1", port: int = 0) -> str:
+    """
+    Arranca el stub en un thread daemon; regresa su URL (port=0: uno libre).
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="s3-stub", daemon=True).start()
+    return f"http://{host}:{server.server_address[1]}"
@@ -0,0 +1,122 @@
+# bench/search.py
+"""
+Benchmark de la búsqueda de pedidos (filtro q) a escala: crea un esquema
+temporal con N projects sintéticos, mide la latencia SIN índices y luego
+CON los índices de migrations/0006 (pg_trgm + btree pedido_no).
+
+    DATABASE_URL=postgresql://localhost/repse_bench?sslmode=disable \\
+        python -m bench.search --rows 1000000
+
+Necesita un PostgreSQL local con la extensión pg_trgm disponible.
+"""
+import argparse
+import os
+import statistics
+import time
+
+import app as webapp
+from db import DATABASE_URL, get_conn
+from migrate import MIGRATIONS_DIR
+
+SCHEMA = "bench_search"
+
+# (etiqueta, q) — mismas cláusulas que usan los dashboards
+QUERIES = [
+    ("substring raro", "P0777"),
+    ("substring común", "Pedido 12"),
+    ("sin resultados", "zzz-no-existe"),
+    ("pedido exacto (#)", "#P0123456"),
+]
+
+def seed(cur, rows: int):
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+    cur.execute(f"""
+        CREATE TABLE {SCHEMA}.projects(
+            id SERIAL PRIMARY KEY,
+            provider_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            completed INTEGER DEFAULT 0,
+            pedido_no TEXT,
+            periodo_year INT,
+            periodo_month INT
+        )
+    """)
+    cur.execute(f"""
+        INSERT INTO {SCHEMA}.projects(provider_id, name, created_at, pedido_no, periodo_year, periodo_month)
+        SELECT (g % 500) + 1,
+               'Pedido P' || lpad(g::text, 7, '0'),
+               NOW() - (g || ' minutes')::interval,
+               'P' || lpad(g::text, 7, '0'),
+               2020 + (g % 7),
+               (g % 12) + 1
+        FROM generate_series(1, %s) AS g
+    """, (rows,))
+    cur.execute(f"ANALYZE {SCHEMA}.projects")
+
+def create_indexes(cur):
+    cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with open(os.path.join(MIGRATIONS_DIR, "0006_projects_search_trgm.sql"), encoding="utf-8") as f:
+        sql = f.read()
+    # mismo DDL que la migración, aplicado al esquema del benchmark
+    sql = sql.replace("CREATE EXTENSION IF NOT EXISTS pg_trgm;", "")
+    cur.execute(f"SET search_path TO {SCHEMA}, public")
+    cur.execute(sql)
+    cur.execute("RESET search_path")
+    cur.execute(f"ANALYZE {SCHEMA}.projects")
+
+def time_query(cur, q: str, repeat: int) -> tuple[float, str]:
+    clause, params = webapp._search_clause(q)
+    sql = f"SELECT * FROM {SCHEMA}.projects WHERE {clause} ORDER BY created_at DESC, id DESC LIMIT 51"
+
+    cur.execute("EXPLAIN " + sql, params)
+    plan = " / ".join(r[0].strip() for r in cur.fetchall()[:3])
+
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        cur.execute(sql, params)
+        cur.fetchall()
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times), plan
+
+def run(cur, label: str, repeat: int) -> dict:
+    print(f"\n== {label} ==")
+    out = {}
+    for name, q in QUERIES:
+        ms, plan = time_query(cur, q, repeat)
+        out[name] = ms
+        print(f"{name:>20}: {ms:9.1f} ms   {plan[:90]}")
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--keep", action="store_true", help="no borrar el esquema al terminar")
+    args = ap.parse_args()
+
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL no está definido en variables de entorno.")
+
+    with get_conn() as conn:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            print(f"Sembrando {args.rows:,} projects en {SCHEMA}...")
+            seed(cur, args.rows)
+
+            before = run(cur, "SIN índices", args.repeat)
+            create_indexes(cur)
+            after = run(cur, "CON índices (0006)", args.repeat)
+
+            print("\n== speed-up ==")
+            for name, _ in QUERIES:
+                print(f"{name:>20}: x{before[name] / max(after[name], 0.001):.1f}")
+
+            if not args.keep:
+                cur.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+        conn.autocommit = False
+
+if __name__ == "__main__":
+    main()
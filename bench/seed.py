@@ -0,0 +1,167 @@
+# bench/seed.py
+"""
+Datos sintéticos para los benchmarks de dashboards: proveedores aprobados,
+meses habilitados, pedidos por periodo (con sus project_docs) y documentos
+globales. Usa el esquema real (migraciones de init_db.py) y carga con COPY.
+
+Los proveedores se llaman bench_prov_<n> (contraseña BENCH_PASSWORD); el admin
+es el de init_db (admin / admin123).
+
+    DATABASE_URL=postgresql://localhost/repse_bench?sslmode=disable \\
+        python -m bench.seed --providers 300 --periods 6 --pedidos 10 --docs 4
+
+--reset vacía TODAS las tablas de la app antes de sembrar: sólo contra una
+base de pruebas.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+import init_db
+from app import DOCUMENTOS_OBLIGATORIOS
+from compliance import rebuild
+from db import DATABASE_URL, get_conn, close_pool
+from migrate import run_migrations
+
+PREFIX = "bench_prov_"
+BENCH_PASSWORD = "bench"
+
+# orden de dependencias (las de hasta arriba referencian a las de abajo)
+APP_TABLES = [
+    "reminders", "s3_delete_outbox", "delete_jobs", "project_compliance",
+    "project_docs", "documentos", "projects", "enabled_periods", "usuarios",
+]
+
+_NOW = datetime(2026, 1, 31, 12, 0, 0)
+
+def last_periods(n: int, until: datetime = _NOW) -> list[tuple[int, int]]:
+    """
+    Los n meses que terminan en `until`, del más reciente al más viejo.
+    """
+    y, m = until.year, until.month
+    out = []
+    for _ in range(n):
+        out.append((y, m))
+        y, m = (y - 1, 12) if m == 1 else (y, m - 1)
+    return out
+
+def reset(cur):
+    cur.execute(f"TRUNCATE {', '.join(APP_TABLES)} RESTART IDENTITY CASCADE")
+
+def seed(conn, providers: int, periods: int, pedidos: int, docs: int,
+         aplica_ratio: float = 0.6, completed_ratio: float = 0.2, seed: int = 7) -> dict:
+    """
+    Inserta los datos en la transacción de `conn` (el que llama hace commit).
+    Regresa los conteos insertados.
+    """
+    rnd = random.Random(seed)
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    tipos_globales = DOCUMENTOS_OBLIGATORIOS[:docs]
+    counts = {}
+
+    with conn.cursor() as cur:
+        # sin avisos al dashboard en vivo por cada fila cargada (migración 0013)
+        cur.execute("SET LOCAL repse.notify = 'off'")
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM usuarios")
+        first = cur.fetchone()[0] + 1
+
+        # -------- proveedores
+        with cur.copy("COPY usuarios(nombre, usuario, correo, password, rol, estado, empresa, rfc, repse) FROM STDIN") as cp:
+            for n in range(first, first + providers):
+                cp.write_row((
+                    f"Proveedor {n}", f"{PREFIX}{n}", f"{PREFIX}{n}@example.com",
+                    password_hash, 2, "aprobado", f"Empresa {n} SA de CV",
+                    f"BEN{n:06d}XX0", f"REPSE-{n:06d}",
+                ))
+        cur.execute("SELECT id FROM usuarios WHERE usuario LIKE %s AND id >= %s ORDER BY id",
+                    (PREFIX + "%", first))
+        provider_ids = [r[0] for r in cur.fetchall()]
+        counts["providers"] = len(provider_ids)
+
+        # -------- meses habilitados
+        months = last_periods(periods)
+        with cur.copy("COPY enabled_periods(provider_id, periodo_year, periodo_month) FROM STDIN") as cp:
+            for pid in provider_ids:
+                for y, m in months:
+                    cp.write_row((pid, y, m))
+        counts["enabled_periods"] = len(provider_ids) * len(months)
+
+        # -------- pedidos (ids asignados por la secuencia: se leen de regreso)
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM projects")
+        first_project = cur.fetchone()[0] + 1
+        seq = 0
+        with cur.copy("COPY projects(provider_id, name, created_at, completed, pedido_no, periodo_year, periodo_month) FROM STDIN") as cp:
+            for pid in provider_ids:
+                for y, m in months:
+                    for _ in range(pedidos):
+                        seq += 1
+                        pedido_no = f"B{pid:05d}{seq:07d}"
+                        cp.write_row((
+                            pid, f"Pedido {pedido_no}",
+                            datetime(y, m, 1) + timedelta(minutes=rnd.randrange(28 * 24 * 60)),
+                            1 if rnd.random() < completed_ratio else 0,
+                            pedido_no, y, m,
+                        ))
+        cur.execute("SELECT id FROM projects WHERE id >= %s ORDER BY id", (first_project,))
+        project_ids = [r[0] for r in cur.fetchall()]
+        counts["projects"] = len(project_ids)
+
+        # -------- docs por pedido (todos los tipos; "aplica" al azar)
+        with cur.copy("COPY project_docs(project_id, tipo_documento, aplica, completed) FROM STDIN") as cp:
+            for project_id in project_ids:
+                for tipo in DOCUMENTOS_OBLIGATORIOS:
+                    cp.write_row((project_id, tipo, rnd.random() < aplica_ratio, False))
+        counts["project_docs"] = len(project_ids) * len(DOCUMENTOS_OBLIGATORIOS)
+
+        # -------- documentos globales (las llaves no existen en S3: el bench usa un stub)
+        with cur.copy("COPY documentos(usuario_id, nombre_archivo, ruta, fecha_subida, tipo_documento) FROM STDIN") as cp:
+            for pid in provider_ids:
+                for i, tipo in enumerate(tipos_globales):
+                    cp.write_row((
+                        pid, f"{i + 1:02d}.pdf", f"bench/u{pid}/global/{i + 1:02d}.pdf",
+                        _NOW - timedelta(days=rnd.randrange(90)), tipo,
+                    ))
+        counts["documentos"] = len(provider_ids) * len(tipos_globales)
+
+    counts["project_compliance"] = rebuild(conn)
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Siembra datos sintéticos para los benchmarks")
+    parser.add_argument("--providers", type=int, default=200)
+    parser.add_argument("--periods", type=int, default=6, help="meses habilitados por proveedor")
+    parser.add_argument("--pedidos", type=int, default=10, help="pedidos por proveedor y periodo")
+    parser.add_argument("--docs", type=int, default=4,
+                        help=f"documentos globales por proveedor (máx. {len(DOCUMENTOS_OBLIGATORIOS)})")
+    parser.add_argument("--aplica-ratio", type=float, default=0.6)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--reset", action="store_true", help="vacía las tablas de la app antes de sembrar")
+    args = parser.parse_args(argv)
+
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL no está definido en variables de entorno.")
+
+    t0 = time.perf_counter()
+    with get_conn() as conn:
+        run_migrations(conn)
+        with conn.cursor() as cur:
+            if args.reset:
+                reset(cur)
+            init_db._create_admin(cur)
+        counts = seed(conn, args.providers, args.periods, args.pedidos,
+                      min(args.docs, len(DOCUMENTOS_OBLIGATORIOS)), args.aplica_ratio, seed=args.seed)
+        conn.commit()
+        with conn.cursor() as cur:
+            for table in APP_TABLES:
+                cur.execute(f"ANALYZE {table}")
+        conn.commit()
+    close_pool()
+
+    print(", ".join(f"{k}={v}" for k, v in counts.items()))
+    print(f"Sembrado en {time.perf_counter() - t0:.1f}s")
+
+if __name__ == "__main__":
+    main()
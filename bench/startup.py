@@ -0,0 +1,126 @@
+# bench/startup.py
+"""
+Arranque de un worker: tiempo de `import app`, del primer request y de la
+primera llamada a S3, cada corrida en un proceso NUEVO (como un worker recién
+creado). Sirve para comparar dos árboles (antes/después):
+
+    git worktree add /tmp/antes HEAD~1
+    DATABASE_URL=... python -m bench.startup --tree /tmp/antes --out antes.json
+    DATABASE_URL=... python -m bench.startup --out despues.json
+    python -m bench.startup --compare antes.json despues.json
+
+Necesita la BD (ensure_schema corre al importar) y un usuario admin; S3 no se
+contacta (sólo se firma una URL, que ya crea el cliente).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# corre dentro del árbol medido; imprime un json en la última línea
+_CHILD = r"""
+import json, resource, sys, time
+t0 = time.perf_counter()
+import app as webapp
+t_import = time.perf_counter() - t0
+boto_loaded = "boto3" in sys.modules
+
+client = webapp.app.test_client()
+t0 = time.perf_counter()
+client.get("/")
+t_first = time.perf_counter() - t0
+
+client.post("/", data={"usuario": "admin", "contrasena": "admin123"})
+t0 = time.perf_counter()
+client.get("/admin/dashboard")
+t_dashboard = time.perf_counter() - t0
+
+import storage
+t0 = time.perf_counter()
+get_s3 = getattr(storage, "get_s3", None)
+(get_s3() if get_s3 else storage.s3).generate_presigned_url(
+    "get_object", Params={"Bucket": storage.BUCKET_NAME, "Key": "bench/startup"}, ExpiresIn=60)
+t_s3 = time.perf_counter() - t0
+
+print(json.dumps({
+    "import_ms": t_import * 1000,
+    "first_request_ms": t_first * 1000,
+    "first_dashboard_ms": t_dashboard * 1000,
+    "first_s3_ms": t_s3 * 1000,
+    "boto3_at_import": boto_loaded,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+METRICS = ("import_ms", "first_request_ms", "first_dashboard_ms", "first_s3_ms", "rss_mb")
+
+def run_once(tree: str) -> dict:
+    env = dict(os.environ, PYTHONPATH=tree, S3_OUTBOX_WORKER="0", PYTHONDONTWRITEBYTECODE="0")
+    env.setdefault("AWS_ACCESS_KEY_ID", "bench")
+    env.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+    out = subprocess.run([sys.executable, "-c", _CHILD], cwd=tree, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def summarize(runs: list[dict]) -> dict:
+    out = {}
+    for m in METRICS:
+        values = [r[m] for r in runs]
+        out[m] = {"p50": statistics.median(values), "min": min(values), "max": max(values)}
+    out["boto3_at_import"] = runs[0]["boto3_at_import"]
+    return out
+
+def _git_rev(tree: str) -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=tree,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "?"
+
+def compare(before: dict, after: dict):
+    print(f"{'métrica (p50)':22} {'antes':>10} {'después':>10} {'delta':>8}")
+    for m in METRICS:
+        a, b = before["summary"][m]["p50"], after["summary"][m]["p50"]
+        delta = (b - a) / a * 100 if a else 0.0
+        print(f"{m:22} {a:10.1f} {b:10.1f} {delta:+7.1f}%")
+    total_a = sum(before["summary"][m]["p50"] for m in METRICS if m.endswith("_ms"))
+    total_b = sum(after["summary"][m]["p50"] for m in METRICS if m.endswith("_ms"))
+    print(f"{'total hasta S3 (ms)':22} {total_a:10.1f} {total_b:10.1f} {(total_b - total_a) / total_a * 100:+7.1f}%")
+    print(f"boto3 al importar: {before['summary']['boto3_at_import']} -> {after['summary']['boto3_at_import']}")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Tiempo de arranque de un worker")
+    parser.add_argument("--tree", default=ROOT, help="árbol a medir (p. ej. un git worktree)")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--out", help="guardar el resultado (json)")
+    parser.add_argument("--compare", nargs=2, metavar=("ANTES", "DESPUES"))
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f1, open(args.compare[1]) as f2:
+            compare(json.load(f1), json.load(f2))
+        return 0
+
+    if not os.environ.get("DATABASE_URL"):
+        raise SystemExit("Define DATABASE_URL.")
+
+    run_once(args.tree)   # calentamiento: .pyc y caché de disco
+    runs = [run_once(args.tree) for _ in range(args.runs)]
+    result = {"tree": args.tree, "commit": _git_rev(args.tree), "runs": runs, "summary": summarize(runs)}
+
+    for m in METRICS:
+        s = result["summary"][m]
+        print(f"{m:22} p50 {s['p50']:8.1f}   min {s['min']:8.1f}   max {s['max']:8.1f}")
+    print(f"boto3 al importar: {result['summary']['boto3_at_import']}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
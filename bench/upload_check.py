@@ -0,0 +1,228 @@
+# bench/upload_check.py
+"""
+Prueba de la subida directa (/proveedor/upload/presign -> POST a S3 ->
+/proveedor/upload/confirm) contra un S3 local (moto server, MinIO) y un
+PostgreSQL local, con dos proveedores temporales. Verifica:
+
+  - el POST firmado lleva x-amz-checksum-sha256 (base64 del hash del navegador)
+  - confirm guarda el doc en cas/<sha256> con refcount 1 y borra el staging
+  - si S3 regresa ChecksumSHA256 en el HEAD, confirm no lee el objeto (sin
+    GetObject); si no lo regresa (moto), lo calcula leyéndolo
+  - contenido repetido (otro proveedor, mismo PDF): refcount 2, sin otra copia
+  - hash mentido: S3 rechaza el POST o, si el endpoint no lo verifica, el doc
+    queda con el hash REAL del contenido
+  - mismo archivo otra vez: presign responde `unchanged`
+  - staging sin confirmar: sweep_staging lo pasa al outbox y el drain lo borra
+
+Falla (exit 1) si algo no cuadra. Borra lo que creó.
+
+    moto_server -p 5055 &
+    S3_ENDPOINT_URL=http://127.0.0.1:5055 AWS_ACCESS_KEY_ID=x AWS_SECRET_ACCESS_KEY=x \\
+    DATABASE_URL=postgresql://localhost/repse_dev?sslmode=disable \\
+        python -m bench.upload_check
+"""
+import base64
+import hashlib
+import os
+import sys
+import time
+from collections import Counter
+
+class _S3Calls:
+    """
+    Cuenta las llamadas a S3 por operación y, con `checksums`, agrega
+    ChecksumSHA256 al HEAD como lo haría AWS (moto no lo guarda en el POST).
+    """
+
+    def __init__(self):
+        self.calls = Counter()
+        self.checksums = {}   # llave -> sha256 hex
+
+    def register(self, client):
+        client.meta.events.register("before-call.s3.*", self.count)
+        client.meta.events.register("before-parameter-build.s3.HeadObject", self.tag_key)
+        client.meta.events.register("after-call.s3.HeadObject", self.head)
+
+    def count(self, model, **kwargs):
+        self.calls[model.name] += 1
+
+    def tag_key(self, params, context, **kwargs):
+        context["upload_check_key"] = params.get("Key")
+
+    def head(self, parsed, context, **kwargs):
+        sha = self.checksums.get(context.get("upload_check_key"))
+        if sha and "ChecksumSHA256" not in parsed:
+            parsed["ChecksumSHA256"] = base64.b64encode(bytes.fromhex(sha)).decode()
+
+def main(argv=None) -> int:
+    if not os.environ.get("S3_ENDPOINT_URL"):
+        raise SystemExit("Define S3_ENDPOINT_URL (S3 local): este script sube y borra objetos.")
+    os.environ["S3_OUTBOX_WORKER"] = "0"   # sólo los drain de esta prueba
+
+    import requests
+    from werkzeug.security import generate_password_hash
+
+    import app as webapp
+    import jobs
+    from blobs import cas_key
+    from db import get_conn, close_pool
+    from storage import BUCKET_NAME, get_s3, on_s3_client
+
+    s3calls = _S3Calls()
+    on_s3_client(s3calls.register)
+    s3 = get_s3()
+    region = s3.meta.region_name
+    config = {} if region in (None, "us-east-1") else {
+        "CreateBucketConfiguration": {"LocationConstraint": region}}
+    try:
+        s3.create_bucket(Bucket=BUCKET_NAME, **config)
+    except (s3.exceptions.BucketAlreadyOwnedByYou, s3.exceptions.BucketAlreadyExists):
+        pass
+
+    tag = f"upcheck{int(time.time())}"
+    uids = []
+    clients = []
+    with get_conn() as conn, conn.cursor() as cur:
+        for n in (1, 2):
+            cur.execute("""
+                INSERT INTO usuarios(nombre, usuario, correo, password, rol, estado)
+                VALUES(%s, %s, %s, %s, 2, 'aprobado') RETURNING id
+            """, (f"{tag}_{n}", f"{tag}_{n}", f"{tag}_{n}@bench.test", generate_password_hash("pw")))
+            uids.append(cur.fetchone()[0])
+        conn.commit()
+    for n in (1, 2):
+        client = webapp.app.test_client()
+        client.post("/", data={"usuario": f"{tag}_{n}", "contrasena": "pw"})
+        clients.append(client)
+
+    tipos = webapp.DOCUMENTOS_OBLIGATORIOS
+    doc_a = b"%PDF-1.4 A " + os.urandom(4096)
+    doc_b = b"%PDF-1.4 B " + os.urandom(4096)
+    doc_c = b"%PDF-1.4 C " + os.urandom(4096)
+    sha = {k: hashlib.sha256(v).hexdigest() for k, v in (("a", doc_a), ("b", doc_b), ("c", doc_c))}
+
+    def presign(client, tipo, body, claimed=None, send_hash=True):
+        claimed = claimed or hashlib.sha256(body).hexdigest()
+        return client.post("/proveedor/upload/presign", json={
+            "tipo_documento": tipo, "filename": "doc.pdf", "size": len(body),
+            "sha256": claimed if send_hash else None,
+        }).get_json()
+
+    def post(data, body):
+        return requests.post(data["url"], data=data["fields"], files={"file": ("doc.pdf", body, "application/pdf")})
+
+    def confirm(client, data):
+        return client.post("/proveedor/upload/confirm", json={"token": data["token"]}).get_json()
+
+    def staging_key(data):
+        return data["fields"]["key"]
+
+    def exists(key):
+        return bool(s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=key).get("Contents"))
+
+    def doc(uid, tipo):
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT d.sha256, d.ruta, b.refcount FROM documentos d
+                LEFT JOIN s3_blobs b ON b.sha256 = d.sha256
+                WHERE d.usuario_id=%s AND d.project_id IS NULL AND d.tipo_documento=%s
+            """, (uid, tipo))
+            return cur.fetchone()
+
+    def staged(key):
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("SELECT 1 FROM upload_staging WHERE s3_key=%s", (key,))
+            return cur.fetchone() is not None
+
+    failures = []
+    def check(name, cond, detail=""):
+        print(f"  {'ok   ' if cond else 'FALLA'} {name}{'  ' + str(detail) if detail else ''}")
+        if not cond:
+            failures.append(name)
+
+    p1, p2 = clients
+    try:
+        # ---- A: checksum en el POST; moto no lo guarda -> confirm lee el objeto ----
+        data = presign(p1, tipos[0], doc_a)
+        expected = base64.b64encode(bytes.fromhex(sha["a"])).decode()
+        check("POST firmado con x-amz-checksum-sha256",
+              data["fields"].get("x-amz-checksum-sha256") == expected, data["fields"].get("x-amz-checksum-sha256"))
+        key = staging_key(data)
+        check("llave de staging registrada", key.startswith(webapp.UPLOAD_STAGING_PREFIX) and staged(key), key)
+        check("POST a S3", post(data, doc_a).ok)
+        s3calls.calls.clear()
+        res = confirm(p1, data)
+        check("confirm sin checksum en el HEAD -> lee el objeto",
+              res["success"] and s3calls.calls["GetObject"] == 1, (res["msg"], dict(s3calls.calls)))
+        check("doc en cas/ con refcount 1", doc(uids[0], tipos[0]) == (sha["a"], cas_key(sha["a"]), 1),
+              doc(uids[0], tipos[0]))
+        check("staging borrado", not exists(key) and not staged(key))
+
+        # ---- B: S3 regresa ChecksumSHA256 (como AWS) -> confirm no lee el objeto ----
+        data = presign(p1, tipos[1], doc_b)
+        s3calls.checksums[staging_key(data)] = sha["b"]
+        post(data, doc_b)
+        s3calls.calls.clear()
+        res = confirm(p1, data)
+        check("confirm con ChecksumSHA256 -> sin GetObject",
+              res["success"] and s3calls.calls["GetObject"] == 0 and s3calls.calls["HeadObject"] == 1,
+              dict(s3calls.calls))
+        check("doc B con el hash de S3", doc(uids[0], tipos[1]) == (sha["b"], cas_key(sha["b"]), 1),
+              doc(uids[0], tipos[1]))
+
+        # ---- contenido repetido: otro proveedor sube A ----
+        data = presign(p2, tipos[0], doc_a)
+        post(data, doc_a)
+        s3calls.calls.clear()
+        res = confirm(p2, data)
+        check("contenido repetido -> refcount 2, sin copia",
+              res["success"] and doc(uids[1], tipos[0]) == (sha["a"], cas_key(sha["a"]), 2)
+              and s3calls.calls["CopyObject"] == 0, (doc(uids[1], tipos[0]), dict(s3calls.calls)))
+
+        # ---- mismo archivo otra vez: unchanged, no se sube ----
+        data = presign(p1, tipos[0], doc_a)
+        check("mismo archivo -> unchanged", data.get("unchanged") is True, data.get("msg"))
+
+        # ---- hash mentido: dice A, sube C ----
+        data = presign(p2, tipos[2], doc_c, claimed=sha["a"])
+        up = post(data, doc_c)
+        if not up.ok:
+            check("hash mentido -> S3 rechaza el POST", up.status_code == 400, up.status_code)
+        else:
+            res = confirm(p2, data)
+            check("hash mentido -> el doc queda con el hash real",
+                  res["success"] and doc(uids[1], tipos[2]) == (sha["c"], cas_key(sha["c"]), 1),
+                  doc(uids[1], tipos[2]))
+
+        # ---- staging sin confirmar: sweep -> outbox -> borrado ----
+        data = presign(p2, tipos[3], doc_b, send_hash=False)
+        post(data, doc_b)
+        key = staging_key(data)
+        with get_conn() as conn:
+            conn.execute("UPDATE upload_staging SET created_at = NOW() - INTERVAL '2 hours' WHERE s3_key=%s", (key,))
+            conn.commit()
+        queued = jobs.sweep_staging()
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("SELECT id FROM s3_delete_outbox WHERE s3_key=%s AND status='pending'", (key,))
+            outbox_ids = [r[0] for r in cur.fetchall()]
+        jobs.drain_all()
+        check("staging sin confirmar -> outbox -> borrado",
+              queued >= 1 and len(outbox_ids) == 1 and not staged(key) and not exists(key),
+              (queued, outbox_ids, exists(key)))
+    finally:
+        with get_conn() as conn, conn.cursor() as cur:
+            job_ids = [jobs.start_cascade(conn, "user", uid) for uid in uids]
+            conn.commit()
+        jobs.drain_all()
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("DELETE FROM upload_staging WHERE usuario_id = ANY(%s)", (uids,))
+            cur.execute("DELETE FROM s3_delete_outbox WHERE job_id = ANY(%s)", (job_ids,))
+            cur.execute("DELETE FROM delete_jobs WHERE id = ANY(%s)", (job_ids,))
+            conn.commit()
+        close_pool()
+
+    print("OK" if not failures else f"ERROR: {', '.join(failures)}")
+    return 0 if not failures else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
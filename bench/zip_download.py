@@ -0,0 +1,159 @@
+# bench/zip_download.py
+"""
+Prueba de /admin/documentos.zip contra un S3 local (moto server, MinIO):
+sube objetos sintéticos para los documentos globales de los proveedores
+sembrados con bench.seed, descarga el ZIP en streaming con el test client,
+lo valida (CRC de cada entrada) y reporta tiempo, tamaño y pico de RSS.
+Falla (exit 1) si el ZIP no cuadra.
+
+    moto_server -p 5055 &
+    S3_ENDPOINT_URL=http://127.0.0.1:5055 AWS_ACCESS_KEY_ID=x AWS_SECRET_ACCESS_KEY=x \\
+    DATABASE_URL=postgresql://localhost/repse_bench?sslmode=disable \\
+        python -m bench.zip_download --providers 20 --size-kb 512
+
+Con --max-mb menor al total se prueba el tope (_OMITIDOS.txt). También
+revisa que un proveedor con documentos pero sin pedidos tenga su ZIP (botón
+del bloque del proveedor) y que con filtro de periodo no entre.
+"""
+import argparse
+import io
+import os
+import resource
+import sys
+import tempfile
+import time
+import zipfile
+
+def _check_without_pedidos(client) -> bool:
+    """
+    Proveedor temporal con un doc global y ningún pedido: ?providers=<id>
+    da un ZIP con su doc; con ?year= (filtro de pedidos) no hay documentos.
+    """
+    from db import get_conn
+    from storage import BUCKET_NAME, get_s3
+
+    tag = f"zipcheck{int(time.time())}"
+    key = f"bench/{tag}/acta.pdf"
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO usuarios(nombre, usuario, correo, password, rol, estado)
+            VALUES(%s, %s, %s, 'x', 2, 'aprobado') RETURNING id
+        """, (tag, tag, f"{tag}@bench.test"))
+        uid = cur.fetchone()[0]
+        cur.execute("""
+            INSERT INTO documentos(usuario_id, nombre_archivo, ruta, tipo_documento)
+            VALUES(%s, 'acta.pdf', %s, 'Acta constitutiva')
+        """, (uid, key))
+        conn.commit()
+    get_s3().put_object(Bucket=BUCKET_NAME, Key=key, Body=b"%PDF-1.4 zipcheck")
+
+    try:
+        resp = client.get(f"/admin/documentos.zip?providers={uid}")
+        names = []
+        if resp.status_code == 200:
+            with zipfile.ZipFile(io.BytesIO(resp.data)) as zf:
+                names = zf.namelist()
+        only_providers = names == [f"{tag}/Acta constitutiva - acta.pdf"]
+        resp = client.get(f"/admin/documentos.zip?providers={uid}&year=2099")
+        with_period = resp.status_code == 302
+    finally:
+        get_s3().delete_object(Bucket=BUCKET_NAME, Key=key)
+        with get_conn() as conn:
+            conn.execute("DELETE FROM documentos WHERE usuario_id=%s", (uid,))
+            conn.execute("DELETE FROM usuarios WHERE id=%s", (uid,))
+            conn.commit()
+
+    print(f"Proveedor sin pedidos: ZIP {'ok' if only_providers else 'ERROR ' + str(names)}, "
+          f"con periodo {'sin documentos' if with_period else 'ERROR: dio ZIP'}")
+    return only_providers and with_period
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Prueba del ZIP de documentos contra un S3 local")
+    parser.add_argument("--providers", type=int, default=10, help="proveedores sembrados a incluir")
+    parser.add_argument("--size-kb", type=int, default=256, help="tamaño de cada objeto")
+    parser.add_argument("--max-mb", type=float, help="ZIP_MAX_BYTES para esta corrida")
+    parser.add_argument("--skip-upload", action="store_true", help="los objetos ya están en el bucket")
+    args = parser.parse_args(argv)
+
+    if not os.environ.get("S3_ENDPOINT_URL"):
+        raise SystemExit("Define S3_ENDPOINT_URL (S3 local): este script sube objetos al bucket.")
+    if args.max_mb is not None:
+        os.environ["ZIP_MAX_BYTES"] = str(int(args.max_mb * 1024 * 1024))
+    os.environ.setdefault("S3_OUTBOX_WORKER", "0")
+
+    import app as webapp
+    from bench.seed import PREFIX
+    from db import get_conn, close_pool
+    from storage import BUCKET_NAME, get_s3
+
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("""
+            SELECT u.id, d.ruta FROM usuarios u
+            JOIN documentos d ON d.usuario_id = u.id AND d.project_id IS NULL
+            WHERE u.id IN (SELECT id FROM usuarios WHERE usuario LIKE %s ORDER BY id LIMIT %s)
+            ORDER BY u.id, d.id
+        """, (PREFIX + "%", args.providers))
+        rows = cur.fetchall()
+    if not rows:
+        raise SystemExit("No hay documentos sembrados: corre primero python -m bench.seed")
+    provider_ids = sorted({pid for pid, _ in rows})
+
+    if not args.skip_upload:
+        s3 = get_s3()
+        region = s3.meta.region_name
+        # us-east-1 no acepta LocationConstraint
+        config = {} if region in (None, "us-east-1") else {
+            "CreateBucketConfiguration": {"LocationConstraint": region}}
+        try:
+            s3.create_bucket(Bucket=BUCKET_NAME, **config)
+        except (s3.exceptions.BucketAlreadyOwnedByYou, s3.exceptions.BucketAlreadyExists):
+            pass
+        payload = os.urandom(args.size_kb * 1024)   # aleatorio: no se comprime
+        for _, key in rows:
+            s3.put_object(Bucket=BUCKET_NAME, Key=key, Body=payload)
+        print(f"Subidos {len(rows)} objetos de {args.size_kb} KB")
+
+    client = webapp.app.test_client()
+    client.post("/", data={"usuario": "admin", "contrasena": "admin123"})
+    query = "&".join(f"providers={pid}" for pid in provider_ids)
+
+    rss0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    first_byte = None
+    size = 0
+    # el ZIP va a un archivo temporal: en memoria se mediría el buffer de la prueba
+    with tempfile.TemporaryFile() as out:
+        resp = client.get(f"/admin/documentos.zip?{query}", buffered=False)
+        if resp.status_code != 200:
+            print("HTTP", resp.status_code, resp.headers.get("Location"))
+            return 1
+        for chunk in resp.response:
+            if first_byte is None:
+                first_byte = time.perf_counter() - t0
+            size += len(chunk)
+            out.write(chunk)
+        resp.close()
+        elapsed = time.perf_counter() - t0
+        rss1 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        out.seek(0)
+        with zipfile.ZipFile(out) as zf:
+            bad = zf.testzip()
+            names = zf.namelist()
+            omitted = zf.read("_OMITIDOS.txt").decode() if "_OMITIDOS.txt" in names else ""
+    without_pedidos = _check_without_pedidos(client)
+    close_pool()
+
+    files = [n for n in names if n != "_OMITIDOS.txt"]
+    print(f"ZIP: {size / 1024 / 1024:.1f} MB, {len(files)} archivos, "
+          f"primer byte {first_byte * 1000:.0f} ms, total {elapsed:.2f} s")
+    print(f"RSS pico: {rss0 // 1024} -> {rss1 // 1024} MB")
+    if omitted:
+        print(f"Omitidos: {len(omitted.splitlines())}")
+
+    ok = bad is None and len(files) + len(omitted.splitlines()) == len(rows) and without_pedidos
+    print("OK" if ok else f"ERROR: entrada dañada={bad}, esperados={len(rows)}")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# blobs.py  (documentos por contenido: llave = SHA-256, con conteo de referencias)
+#
+#   sha = stored_sha256(head)                       # checksum que S3 ya verificó
+#   sha, size = hash_object(staging_key)            # si no hay: lee el objeto en streaming
+#   retain_blob(conn, sha, staging_key, size, old)  # +1 al nuevo, -1 al anterior
+#   release_blobs(cur, [sha, ...], job_id)          # cascada: -1 por documento
+#
+# El mismo archivo (la misma Acta constitutiva subida por varios proveedores,
+# o resubida igual) se guarda UNA vez en S3 bajo cas/xx/<sha256>. s3_blobs
+# cuenta cuántas filas de documentos lo usan; al llegar a 0 la llave va al
+# outbox de jobs.py, que revisa el conteo otra vez antes de borrar (pudo
+# reutilizarse mientras esperaba). Los documentos de antes (sha256 NULL)
+# conservan su llave propia y se borran como siempre.
+#
+# Mientras jobs.py borra una llave cas/ en 0 (deleting_until vigente), ésta no
+# se reutiliza: retain_blob lanza BlobBusy. Si el borrado quedó a medias
+# (deleting_until vencido) se vuelve a copiar antes de contarla.
+#
+# Orden de bloqueo: filas de s3_blobs por sha256 ascendente (evita deadlocks
+# entre dos reemplazos cruzados A->B / B->A).
+import base64
+import hashlib
+import os
+
+from storage import copy_object, open_object
+
+CAS_PREFIX = "cas/"
+HASH_CHUNK_BYTES = int(os.environ.get("HASH_CHUNK_BYTES", 256 * 1024))
+
+def cas_key(sha: str) -> str:
+    # dos caracteres de prefijo: reparte las llaves en el bucket
+    return f"{CAS_PREFIX}{sha[:2]}/{sha}"
+
+def stored_sha256(head: dict) -> str | None:
+    """
+    SHA-256 (hex) que S3 verificó al recibir el objeto, de un head_object con
+    checksum=True; None si la subida no lo traía o el endpoint no lo guarda.
+    Un checksum de multipart ("<b64>-N") no es el SHA-256 del archivo.
+    """
+    value = head.get("ChecksumSHA256") or ""
+    try:
+        raw = base64.b64decode(value, validate=True)
+    except ValueError:
+        return None
+    return raw.hex() if len(raw) == 32 else None
+
+def hash_object(key: str) -> tuple[str, int]:
+    """
+    SHA-256 y tamaño del objeto, leyéndolo por bloques (sin juntarlo en memoria).
+    """
+    h = hashlib.sha256()
+    n = 0
+    _, body = open_object(key)
+    try:
+        for chunk in body.iter_chunks(HASH_CHUNK_BYTES):
+            h.update(chunk)
+            n += len(chunk)
+    finally:
+        body.close()
+    return h.hexdigest(), n
+
+class BlobBusy(RuntimeError):
+    """
+    El contenido se está borrando de S3 en este momento: reintentar en unos segundos.
+    """
+
+def _lock(cur, shas):
+    """
+    Bloquea las filas y regresa {sha: estado del borrado}: None (ninguno),
+    'borrando' (deleting_until vigente) o 'vencido' (pudo quedar a medias).
+    """
+    cur.execute("""
+        SELECT sha256,
+               CASE WHEN deleting_until > NOW() THEN 'borrando'
+                    WHEN deleting_until IS NOT NULL THEN 'vencido' END
+        FROM s3_blobs WHERE sha256 = ANY(%s) ORDER BY sha256 FOR UPDATE
+    """, (sorted(set(shas)),))
+    return dict(cur.fetchall())
+
+def retain_blob(conn, sha: str, staging_key: str, size: int, old_sha: str | None = None) -> str:
+    """
+    Suma una referencia al contenido `sha` (si es nuevo, copia staging_key a
+    su llave cas/) y suelta `old_sha`, en la transacción actual de `conn`.
+    La llave de staging la borra el que llama DESPUÉS del commit.
+    Regresa la llave cas/ del contenido; BlobBusy si se está borrando.
+    """
+    key = cas_key(sha)
+    with conn.cursor() as cur:
+        existing = _lock(cur, [sha] + ([old_sha] if old_sha else []))
+        if existing.get(sha) == "borrando":
+            raise BlobBusy(key)
+        if sha not in existing or existing[sha] == "vencido":
+            # dos subidas iguales a la vez copian a la misma llave: inofensivo
+            copy_object(staging_key, key)
+        cur.execute("""
+            INSERT INTO s3_blobs(sha256, s3_key, size_bytes, refcount)
+            VALUES(%s,%s,%s,1)
+            ON CONFLICT (sha256) DO UPDATE SET refcount = s3_blobs.refcount + 1, deleting_until = NULL
+        """, (sha, key, size))
+        if old_sha:
+            release_blobs(cur, [old_sha])
+    return key
+
+def release_blobs(cur, shas: list[str], job_id: int | None = None) -> int:
+    """
+    Resta una referencia por cada sha de la lista (puede repetirse: uno por
+    documento borrado). Los que quedan en 0 pasan a s3_delete_outbox con
+    `job_id`. Regresa cuántas llaves se encolaron.
+    """
+    if not shas:
+        return 0
+    _lock(cur, shas)
+    cur.execute("""
+        WITH released AS (
+            UPDATE s3_blobs b
+            SET refcount = GREATEST(b.refcount - d.n, 0)
+            FROM (
+                SELECT sha, COUNT(*) AS n FROM unnest(%(shas)s::text[]) AS sha GROUP BY sha
+            ) d
+            WHERE b.sha256 = d.sha
+            RETURNING b.s3_key, b.refcount
+        )
+        INSERT INTO s3_delete_outbox(job_id, s3_key)
+        SELECT %(job)s, s3_key FROM released WHERE refcount = 0
+    """, {"shas": list(shas), "job": job_id})
+    return cur.rowcount
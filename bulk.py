@@ -0,0 +1,112 @@
+# bulk.py  (operaciones del admin en lote: meses hábiles y alta de usuarios)
+#
+#   enable_periods(conn, [(2026, 11), (2026, 12)], [3, 8, 15])  # proveedores × meses
+#   enable_periods(conn, [(2026, 11)])                          # todos los aprobados
+#   approve_users(conn, ids) / reject_users(conn, ids)
+#
+# Cada lote es UNA sentencia (INSERT ... SELECT ... ON CONFLICT DO NOTHING,
+# UPDATE / DELETE ... WHERE id = ANY) en la transacción del que llama (él hace
+# commit) y regresa el resultado de cada elemento, no sólo un total.
+# Los triggers de 0013 avisan fila por fila: un lote grande desborda la cola
+# de cada dashboard abierto y éste recibe `resync` (recargar), que es lo que
+# conviene después de cientos de cambios.
+import os
+
+BULK_MAX_ITEMS = int(os.environ.get("BULK_MAX_ITEMS", 5000))   # celdas / usuarios por lote
+
+# ===================== MESES HÁBILES =====================
+def enable_periods(conn, periods, provider_ids=None) -> list[dict]:
+    """
+    Habilita cada (año, mes) de `periods` para cada proveedor de `provider_ids`
+    (None = todos los proveedores aprobados). Una entrada por celda:
+      {"provider_id", "year", "month", "estado"}
+    estado: 'habilitado', 'ya_habilitado' o 'proveedor_invalido' (no existe o
+    no es proveedor).
+    """
+    periods = sorted({(int(y), int(m)) for y, m in periods})
+    params = {"years": [y for y, _ in periods], "months": [m for _, m in periods]}
+
+    if provider_ids is None:
+        providers = "(SELECT id FROM usuarios WHERE rol = 2 AND estado = 'aprobado') AS p(id)"
+    else:
+        params["ids"] = sorted({int(x) for x in provider_ids})
+        providers = "unnest(%(ids)s::int[]) AS p(id)"
+        if not params["ids"]:
+            return []
+    if not periods:
+        return []
+
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            WITH req AS (
+                SELECT p.id AS provider_id, m.y, m.m, u.id IS NOT NULL AS valido
+                FROM {providers}
+                LEFT JOIN usuarios u ON u.id = p.id AND u.rol = 2
+                CROSS JOIN unnest(%(years)s::int[], %(months)s::int[]) AS m(y, m)
+            ), ins AS (
+                INSERT INTO enabled_periods(provider_id, periodo_year, periodo_month)
+                SELECT provider_id, y, m FROM req WHERE valido
+                ON CONFLICT(provider_id, periodo_year, periodo_month) DO NOTHING
+                RETURNING provider_id, periodo_year, periodo_month
+            )
+            SELECT r.provider_id, r.y, r.m,
+                   CASE WHEN NOT r.valido THEN 'proveedor_invalido'
+                        WHEN i.provider_id IS NULL THEN 'ya_habilitado'
+                        ELSE 'habilitado' END
+            FROM req r
+            LEFT JOIN ins i ON i.provider_id = r.provider_id
+                           AND i.periodo_year = r.y AND i.periodo_month = r.m
+            ORDER BY r.provider_id, r.y, r.m
+        """, params)
+        rows = cur.fetchall()
+
+    return [
+        {"provider_id": pid, "year": y, "month": m, "estado": estado}
+        for pid, y, m, estado in rows
+    ]
+
+# ===================== USUARIOS PENDIENTES =====================
+def approve_users(conn, user_ids) -> list[dict]:
+    """
+    Aprueba los usuarios PENDIENTES de la lista. Una entrada por id:
+    {"id", "estado"} con 'aprobado', 'no_pendiente' o 'no_encontrado'.
+    """
+    return _pending_users_action(conn, user_ids, "aprobado", """
+        UPDATE usuarios SET estado = 'aprobado'
+        WHERE id = ANY(%(ids)s) AND estado = 'pendiente'
+        RETURNING id
+    """)
+
+def reject_users(conn, user_ids) -> list[dict]:
+    """
+    Borra los usuarios PENDIENTES de la lista (nunca entraron: no tienen
+    documentos ni pedidos). Estados: 'rechazado', 'no_pendiente', 'no_encontrado'.
+    """
+    return _pending_users_action(conn, user_ids, "rechazado", """
+        DELETE FROM usuarios
+        WHERE id = ANY(%(ids)s) AND estado = 'pendiente'
+        RETURNING id
+    """)
+
+def _pending_users_action(conn, user_ids, done: str, dml: str) -> list[dict]:
+    ids = sorted({int(x) for x in user_ids})
+    if not ids:
+        return []
+
+    # `usuarios` del SELECT externo es la foto ANTES del cambio: sólo distingue
+    # ids inexistentes de los que ya no estaban pendientes
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            WITH done AS ({dml})
+            SELECT r.id,
+                   CASE WHEN d.id IS NOT NULL THEN %(done)s
+                        WHEN u.id IS NULL THEN 'no_encontrado'
+                        ELSE 'no_pendiente' END
+            FROM unnest(%(ids)s::int[]) AS r(id)
+            LEFT JOIN done d ON d.id = r.id
+            LEFT JOIN usuarios u ON u.id = r.id
+            ORDER BY r.id
+        """, {"ids": ids, "done": done})
+        rows = cur.fetchall()
+
+    return [{"id": uid, "estado": estado} for uid, estado in rows]
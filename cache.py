@@ -0,0 +1,174 @@
+# cache.py  (caches locales: memoria del proceso / archivo compartido)
+import fcntl
+import os
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+class TTLCache:
+    """
+    LRU acotado por número de entradas, con expiración (TTL) por entrada.
+    Thread-safe: gunicorn puede correr varios threads por worker.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()   # key -> (expira_en, valor)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = item
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return  # TTL 0 = caché apagada: no guardar entradas ya vencidas
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, _MISSING)
+        return default if item is _MISSING else item[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+class ByteLRUCache:
+    """
+    LRU de textos (HTML renderizado) acotado por BYTES, no por entradas: los
+    fragmentos varían mucho de tamaño. TTL por entrada como TTLCache (0 =
+    apagada); un valor más grande que maxbytes no se guarda.
+    """
+
+    def __init__(self, maxbytes: int = 8 * 1024 * 1024, ttl: float = 600.0):
+        self.maxbytes = maxbytes
+        self.ttl = ttl
+        self._data = OrderedDict()   # key -> (expira_en, tamaño, valor)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, size, value = item
+            if expires_at <= now:
+                del self._data[key]
+                self._bytes -= size
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value: str, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else ttl
+        size = len(value.encode("utf-8"))
+        if ttl <= 0 or size > self.maxbytes:
+            return
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            old = self._data.pop(key, _MISSING)
+            if old is not _MISSING:
+                self._bytes -= old[1]
+            self._data[key] = (expires_at, size, value)
+            self._bytes += size
+            while self._bytes > self.maxbytes:
+                _, (_, evicted, _) = self._data.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data), "bytes": self._bytes, "maxbytes": self.maxbytes,
+            "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+        }
+
+class VersionCounter:
+    """
+    Contador de versión para invalidar caches: quien escribe hace bump() y
+    las llaves del cache incluyen get(), así las entradas viejas ya no se leen.
+
+    Sin `path` vive en memoria del proceso. Con `path` (archivo local) lo
+    comparten todos los workers de gunicorn de la máquina.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self._value = 0
+        self._lock = threading.Lock()
+        if path:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            os.close(fd)
+
+    def get(self) -> int:
+        if not self.path:
+            return self._value
+        try:
+            with open(self.path, "rb") as f:
+                return int(f.read() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def bump(self) -> int:
+        if not self.path:
+            with self._lock:
+                self._value += 1
+                return self._value
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            raw = os.pread(fd, 32, 0)
+            value = int(raw or 0) + 1
+            # ancho fijo: se sobrescribe en su lugar, sin truncar (un lector
+            # nunca ve el archivo vacío)
+            os.pwrite(fd, f"{value:020d}".encode(), 0)
+            return value
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
@@ -0,0 +1,132 @@
+# compliance.py  (resumen de cumplimiento por pedido: tabla project_compliance)
+#
+# Por pedido: cuántos documentos aplican, cuántos ya tiene cargados el
+# proveedor (doc global de ese tipo), cuántos faltan y si está completado.
+# Se mantiene al escribir (toggle_aplica, subida de doc global, completado,
+# alta y borrado de pedidos) recalculando SÓLO los pedidos afectados:
+#
+#   refresh_projects(conn, [project_id])            # dentro de la transacción
+#   refresh_provider_tipo(conn, provider_id, tipo)  # doc global nuevo/reemplazado
+#
+# CLI:  python compliance.py rebuild   -> recalcula todo
+#       python compliance.py check     -> compara contra el cálculo en vivo
+import sys
+
+from db import DATABASE_URL, get_conn
+
+# cálculo "en vivo" desde project_docs + doc global vigente (único por tipo)
+_SUMMARY_SQL = """
+    SELECT p.id AS project_id,
+           p.provider_id,
+           COUNT(pd.id) AS aplica_count,
+           COUNT(g.id) AS uploaded_count,
+           COUNT(pd.id) - COUNT(g.id) AS missing_count,
+           COALESCE(p.completed, 0) = 1 AS completed
+    FROM projects p
+    LEFT JOIN project_docs pd
+           ON pd.project_id = p.id AND pd.aplica
+    LEFT JOIN documentos g
+           ON g.usuario_id = p.provider_id
+          AND g.project_id IS NULL
+          AND g.tipo_documento = pd.tipo_documento
+    {where}
+    GROUP BY p.id, p.provider_id, p.completed
+"""
+
+_UPSERT_SQL = """
+    INSERT INTO project_compliance(project_id, provider_id, aplica_count, uploaded_count,
+                                   missing_count, completed, updated_at)
+    SELECT s.project_id, s.provider_id, s.aplica_count, s.uploaded_count,
+           s.missing_count, s.completed, NOW()
+    FROM ({summary}) s
+    ON CONFLICT (project_id) DO UPDATE
+    SET provider_id=EXCLUDED.provider_id,
+        aplica_count=EXCLUDED.aplica_count,
+        uploaded_count=EXCLUDED.uploaded_count,
+        missing_count=EXCLUDED.missing_count,
+        completed=EXCLUDED.completed,
+        updated_at=EXCLUDED.updated_at
+"""
+
+def _upsert(conn, where: str, params) -> int:
+    with conn.cursor() as cur:
+        cur.execute(_UPSERT_SQL.format(summary=_SUMMARY_SQL.format(where=where)), params)
+        return cur.rowcount
+
+def refresh_projects(conn, project_ids) -> int:
+    """
+    Recalcula el resumen de esos pedidos (toggle_aplica, completado).
+    """
+    project_ids = [int(x) for x in project_ids]
+    if not project_ids:
+        return 0
+    return _upsert(conn, "WHERE p.id = ANY(%s)", (project_ids,))
+
+def refresh_provider_tipo(conn, provider_id: int, tipo: str) -> int:
+    """
+    Un doc global nuevo/reemplazado sólo cambia los pedidos del proveedor
+    donde ese tipo aplica.
+    """
+    return _upsert(conn, """
+        WHERE p.provider_id = %s
+          AND EXISTS (
+              SELECT 1 FROM project_docs x
+              WHERE x.project_id = p.id AND x.aplica AND x.tipo_documento = %s
+          )
+    """, (provider_id, tipo))
+
+def rebuild(conn) -> int:
+    """
+    Recalcula la tabla completa (después de cargas manuales, restores, etc.).
+    """
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM project_compliance")
+    return _upsert(conn, "", None)
+
+def check(conn, limit: int = 50) -> list[tuple]:
+    """
+    Pedidos cuyo resumen guardado difiere del cálculo en vivo (incluye
+    faltantes y sobrantes). Lista vacía = consistente.
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT COALESCE(s.project_id, c.project_id) AS project_id,
+                   (s.aplica_count, s.uploaded_count, s.missing_count, s.completed) AS esperado,
+                   (c.aplica_count, c.uploaded_count, c.missing_count, c.completed) AS guardado
+            FROM ({_SUMMARY_SQL.format(where="")}) s
+            FULL OUTER JOIN project_compliance c ON c.project_id = s.project_id
+            WHERE (s.provider_id, s.aplica_count, s.uploaded_count, s.missing_count, s.completed)
+                  IS DISTINCT FROM
+                  (c.provider_id, c.aplica_count, c.uploaded_count, c.missing_count, c.completed)
+            ORDER BY 1
+            LIMIT %s
+        """, (limit,))
+        return cur.fetchall()
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    cmd = argv[0] if argv else ""
+    if cmd not in ("rebuild", "check"):
+        print("Uso: python compliance.py rebuild|check")
+        return 2
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL no está definido en variables de entorno.")
+
+    with get_conn() as conn:
+        if cmd == "rebuild":
+            n = rebuild(conn)
+            conn.commit()
+            print(f"Resumen recalculado: {n} pedido(s).")
+            return 0
+
+        diffs = check(conn)
+    if not diffs:
+        print("project_compliance consistente.")
+        return 0
+    for project_id, esperado, guardado in diffs:
+        print(f"pedido {project_id}: esperado={esperado} guardado={guardado}")
+    print(f"{len(diffs)} pedido(s) inconsistentes (python compliance.py rebuild para corregir).")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
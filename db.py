@@ -0,0 +1,205 @@
+# db.py  (psycopg v3 + psycopg_pool)
+import os
+import threading
+import time
+
+import psycopg
+from psycopg_pool import ConnectionPool
+
+DATABASE_URL = os.environ.get("DATABASE_URL", "")
+
+# Tamaño del pool POR PROCESO (cada worker de gunicorn tiene el suyo)
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", 5))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 10))          # seg. esperando conexión libre
+DB_POOL_MAX_LIFETIME = float(os.environ.get("DB_POOL_MAX_LIFETIME", 1800))  # seg. antes de reciclar
+DB_POOL_MAX_IDLE = float(os.environ.get("DB_POOL_MAX_IDLE", 300))        # seg. ociosa antes de cerrar
+
+def _normalize_db_url(url: str) -> str:
+    if not url:
+        return url
+    if "sslmode=" in url:
+        return url
+    joiner = "&" if "?" in url else "?"
+    return url + f"{joiner}sslmode=require"
+
+# -------- conteo por request (por thread): viajes de red, consultas y tiempo --------
+_local = threading.local()
+
+def reset_round_trips():
+    _local.round_trips = 0
+    _local.queries = 0
+    _local.query_time = 0.0
+
+def add_round_trips(n: int = 1):
+    _local.round_trips = getattr(_local, "round_trips", 0) + n
+
+def round_trips() -> int:
+    return getattr(_local, "round_trips", 0)
+
+def _add_queries(n: int, seconds: float):
+    _local.queries = getattr(_local, "queries", 0) + n
+    _local.query_time = getattr(_local, "query_time", 0.0) + seconds
+
+def query_stats() -> tuple[int, float]:
+    """
+    (consultas, segundos acumulados en PostgreSQL) del request actual.
+    """
+    return getattr(_local, "queries", 0), getattr(_local, "query_time", 0.0)
+
+class CountingCursor(psycopg.Cursor):
+    """
+    Cursor que cuenta cada execute() como un viaje de red, salvo dentro de
+    fetch_pipelined() (ahí todo el lote cuenta como uno), y acumula cuántas
+    consultas se hicieron y cuánto tardaron.
+    """
+
+    def execute(self, query, params=None, **kwargs):
+        if getattr(_local, "in_pipeline", False):
+            return super().execute(query, params, **kwargs)
+        add_round_trips()
+        t0 = time.perf_counter()
+        try:
+            return super().execute(query, params, **kwargs)
+        finally:
+            _add_queries(1, time.perf_counter() - t0)
+
+def _configure(conn):
+    conn.cursor_factory = CountingCursor
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """
+    Pool del proceso actual. Se crea en el primer uso; si el proceso
+    cambió (fork de gunicorn) se crea uno nuevo en lugar de heredar sockets.
+    """
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            if not DATABASE_URL:
+                raise RuntimeError("DATABASE_URL no está definido en variables de entorno.")
+            _pool = ConnectionPool(
+                _normalize_db_url(DATABASE_URL),
+                min_size=DB_POOL_MIN,
+                max_size=DB_POOL_MAX,
+                timeout=DB_POOL_TIMEOUT,
+                max_lifetime=DB_POOL_MAX_LIFETIME,
+                max_idle=DB_POOL_MAX_IDLE,
+                # health check al entregar la conexión (descarta las rotas)
+                check=ConnectionPool.check_connection,
+                configure=_configure,
+                name=f"repse-{pid}",
+                open=True,
+            )
+            _pool_pid = pid
+    return _pool
+
+def get_conn():
+    """
+    Context manager con una conexión del pool:
+
+        with get_conn() as conn:
+            ...
+
+    Al salir hace commit (o rollback si hubo excepción) y la regresa al pool.
+    """
+    return get_pool().connection()
+
+def dedicated_conn(**kwargs) -> psycopg.Connection:
+    """
+    Conexión propia, FUERA del pool (p. ej. LISTEN de live.py, que vive tanto
+    como el proceso y no debe ocupar una conexión de los requests).
+    """
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL no está definido en variables de entorno.")
+    return psycopg.connect(_normalize_db_url(DATABASE_URL), **kwargs)
+
+def fetch_pipelined(conn, queries, row_factory=None) -> list[list]:
+    """
+    Ejecuta consultas INDEPENDIENTES en modo pipeline de psycopg: se envían
+    todas juntas y se sincroniza una sola vez (un viaje de red).
+
+        pendientes, proveedores = fetch_pipelined(conn, [
+            ("SELECT ...", None),
+            ("SELECT ... WHERE x=%s", (x,)),
+        ], row_factory=psycopg.rows.dict_row)
+
+    Una consulta puede traer su propio row_factory como 3er elemento:
+    (sql, params, row_factory). Regresa los fetchall() en el mismo orden.
+    Sin soporte de pipeline en la libpq instalada, cae a ejecución secuencial.
+    """
+    if not psycopg.Pipeline.is_supported():
+        out = []
+        for sql, params, *own in queries:
+            with conn.cursor(row_factory=own[0] if own else row_factory) as cur:
+                cur.execute(sql, params)
+                out.append(cur.fetchall())
+        return out
+
+    cursors = []
+    _local.in_pipeline = True
+    t0 = time.perf_counter()
+    try:
+        with conn.pipeline():
+            for sql, params, *own in queries:
+                cur = conn.cursor(row_factory=own[0] if own else row_factory)
+                cur.execute(sql, params)
+                cursors.append(cur)
+        # al salir del bloque ya se sincronizó y los resultados están disponibles
+        return [cur.fetchall() for cur in cursors]
+    finally:
+        _local.in_pipeline = False
+        add_round_trips()
+        _add_queries(len(queries), time.perf_counter() - t0)
+        for cur in cursors:
+            cur.close()
+
+def close_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.close()
+        _pool = None
+        _pool_pid = None
+
+def pool_stats() -> dict:
+    """
+    Estado del pool (tamaño, disponibles, en espera) y contadores de espera/saturación.
+    """
+    if _pool is None or _pool_pid != os.getpid():
+        return {"pool_open": False}
+
+    stats = _pool.get_stats()
+    size = stats.get("pool_size", 0)
+    available = stats.get("pool_available", 0)
+    in_use = size - available
+    requests = stats.get("requests_num", 0)
+    waiting_total = stats.get("requests_queued", 0)
+
+    return {
+        "pool_open": True,
+        "pid": _pool_pid,
+        "pool_min": stats.get("pool_min"),
+        "pool_max": stats.get("pool_max"),
+        "pool_size": size,
+        "pool_available": available,
+        "in_use": in_use,
+        "requests_waiting": stats.get("requests_waiting", 0),
+        # saturación = conexiones ocupadas / máximo permitido
+        "saturation": round(in_use / DB_POOL_MAX, 3) if DB_POOL_MAX else 0.0,
+        "requests_num": requests,
+        "requests_queued": waiting_total,
+        "requests_wait_ms": stats.get("requests_wait_ms", 0),
+        "avg_wait_ms": round(stats.get("requests_wait_ms", 0) / waiting_total, 2) if waiting_total else 0.0,
+        "requests_errors": stats.get("requests_errors", 0),
+        "usage_ms": stats.get("usage_ms", 0),
+        "connections_num": stats.get("connections_num", 0),
+        "connections_lost": stats.get("connections_lost", 0),
+    }
@@ -0,0 +1,202 @@
+# docs_zip.py  (ZIP de documentos globales armado al vuelo desde S3)
+#
+#   docs = provider_docs(where, params, provider_ids, by_pedidos)
+#   Response(stream_with_context(zip_stream(docs)), mimetype="application/zip")
+#
+# - zipfile de la stdlib escribiendo a un destino NO seekable: cada entrada
+#   lleva data descriptor (CRC y tamaños al final), así los bytes salen en
+#   cuanto se comprimen; nada se junta completo en memoria ni en disco.
+# - Prefetch acotado: hasta ZIP_PREFETCH objetos se descargan en paralelo
+#   (threads), cada uno a una cola de ZIP_QUEUE_CHUNKS bloques; la memoria
+#   queda en ~ZIP_PREFETCH * ZIP_QUEUE_CHUNKS * ZIP_CHUNK_BYTES.
+# - Tope de tamaño (ZIP_MAX_BYTES, suma de los originales): al llegar a él no
+#   se agregan más archivos y se listan en _OMITIDOS.txt dentro del ZIP, igual
+#   que los que fallaron en S3.
+import io
+import os
+import queue
+import re
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from db import get_conn
+from rows import ZipDocRow, row_factory
+from storage import open_object
+
+ZIP_MAX_BYTES = int(os.environ.get("ZIP_MAX_BYTES", 2 * 1024 ** 3))
+ZIP_MAX_FILES = int(os.environ.get("ZIP_MAX_FILES", 5000))
+ZIP_PREFETCH = int(os.environ.get("ZIP_PREFETCH", 4))
+ZIP_CHUNK_BYTES = int(os.environ.get("ZIP_CHUNK_BYTES", 256 * 1024))
+ZIP_QUEUE_CHUNKS = 4
+# PDFs e imágenes ya vienen comprimidos: nivel 1 = poco CPU
+ZIP_COMPRESSLEVEL = int(os.environ.get("ZIP_COMPRESSLEVEL", 1))
+
+_END = object()
+
+class _Failed:
+    def __init__(self, reason: str):
+        self.reason = reason
+
+def provider_docs(where, params, provider_ids, by_pedidos: bool) -> list[ZipDocRow]:
+    """
+    Docs globales a empaquetar. Con filtros de pedidos (by_pedidos: periodo,
+    búsqueda, incompletos) entran los proveedores con algún pedido que cumpla
+    `where`; si sólo hay proveedores seleccionados, esos (aunque no tengan
+    pedidos). `where` siempre trae el filtro de proveedores si lo hay: no
+    sirve para decidir.
+    """
+    sql = """
+        SELECT d.id, u.usuario, d.tipo_documento, d.nombre_archivo, d.ruta
+        FROM documentos d
+        JOIN usuarios u ON u.id = d.usuario_id
+        WHERE d.project_id IS NULL AND d.ruta <> '' AND {scope}
+        ORDER BY u.usuario, d.tipo_documento, d.id
+    """
+    if by_pedidos:
+        scope = "d.usuario_id IN (SELECT provider_id FROM projects WHERE " + " AND ".join(where) + ")"
+        args = list(params)
+    elif provider_ids:
+        scope, args = "d.usuario_id = ANY(%s)", [provider_ids]
+    else:
+        scope, args = "TRUE", []
+
+    with get_conn() as conn, conn.cursor(row_factory=row_factory(ZipDocRow)) as cur:
+        cur.execute(sql.format(scope=scope), args)
+        return cur.fetchall()
+
+# ===================== DESCARGA (threads de prefetch) =====================
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _fetch(key: str, q: queue.Queue, stop: threading.Event):
+    """
+    Manda a la cola: tamaño, bloques..., _END (o _Failed en cualquier punto).
+    """
+    body = None
+    try:
+        size, body = open_object(key)
+        if not _put(q, size, stop):
+            return
+        for chunk in body.iter_chunks(ZIP_CHUNK_BYTES):
+            if not _put(q, chunk, stop):
+                return
+        _put(q, _END, stop)
+    except Exception as e:
+        _put(q, _Failed(f"{type(e).__name__}: {e}"), stop)
+    finally:
+        if body is not None:
+            body.close()
+
+# ===================== ZIP =====================
+class _Sink(io.RawIOBase):
+    """
+    Destino no seekable: zipfile escribe aquí y el generador lo vacía.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _entry_name(doc: ZipDocRow, used: set) -> str:
+    base = re.sub(r'[\\/:*?"<>|]+', "_", f"{doc.tipo_documento or 'Documento'} - {doc.nombre_archivo}")
+    stem, dot, ext = base.rpartition(".")
+    if not dot:
+        stem, ext = base, ""
+    name = f"{doc.usuario}/{base}"
+    n = 1
+    while name in used:
+        n += 1
+        name = f"{doc.usuario}/{stem} ({n}){dot}{ext}"
+    used.add(name)
+    return name
+
+def zip_stream(docs, max_bytes: int = ZIP_MAX_BYTES):
+    """
+    Generador de bytes del ZIP. Si el cliente corta la descarga, el
+    generador se cierra y los threads de prefetch se detienen.
+    """
+    sink = _Sink()
+    zf = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESSLEVEL)
+    pool = ThreadPoolExecutor(max_workers=ZIP_PREFETCH, thread_name_prefix="zip-prefetch")
+    pending = deque()   # (doc, cola, stop) en el orden del ZIP
+    stops = []          # de TODAS las descargas: se detienen al cerrar
+    remaining = iter(docs)
+    omitted = []
+    used = set()
+    total = 0
+
+    def prefetch_next():
+        doc = next(remaining, None)
+        if doc is not None:
+            q, stop = queue.Queue(maxsize=ZIP_QUEUE_CHUNKS), threading.Event()
+            pool.submit(_fetch, doc.ruta, q, stop)
+            pending.append((doc, q, stop))
+            stops.append(stop)
+
+    try:
+        for _ in range(ZIP_PREFETCH):
+            prefetch_next()
+
+        while pending:
+            doc, q, stop = pending.popleft()
+            prefetch_next()
+
+            first = q.get()
+            if isinstance(first, _Failed):
+                omitted.append((doc, first.reason))
+                continue
+            if total + first > max_bytes:
+                # tope alcanzado: éste y los que siguen se quedan fuera
+                stop.set()
+                omitted.append((doc, "excede el tamaño máximo del ZIP"))
+                for d, _, s in pending:
+                    s.set()
+                    omitted.append((d, "excede el tamaño máximo del ZIP"))
+                omitted.extend((d, "excede el tamaño máximo del ZIP") for d in remaining)
+                pending.clear()
+                break
+
+            with zf.open(_entry_name(doc, used), "w", force_zip64=first >= zipfile.ZIP64_LIMIT) as entry:
+                while True:
+                    item = q.get()
+                    if item is _END:
+                        break
+                    if isinstance(item, _Failed):
+                        # ya hay bytes escritos: la entrada queda incompleta
+                        omitted.append((doc, f"incompleto: {item.reason}"))
+                        break
+                    entry.write(item)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            total += first
+            yield sink.drain()
+
+        if omitted:
+            lines = [f"{d.usuario}\t{d.tipo_documento}\t{d.nombre_archivo}\t{reason}" for d, reason in omitted]
+            zf.writestr("_OMITIDOS.txt", "\n".join(lines) + "\n")
+        zf.close()
+        yield sink.drain()
+    finally:
+        for stop in stops:
+            stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
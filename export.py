@@ -0,0 +1,143 @@
+# export.py  (exportación de cumplimiento REPSE: CSV / XLSX en streaming)
+#
+#   rows = export_rows(where, params, DOCUMENTOS_OBLIGATORIOS)   # generador
+#   Response(stream_with_context(csv_chunks(rows)), mimetype="text/csv")
+#
+# Una fila por (pedido, tipo de documento). Las filas salen de un cursor del
+# lado del servidor (named cursor, EXPORT_FETCH_SIZE por viaje) y se escriben
+# conforme llegan: la memoria no crece con el número de filas.
+#
+# XLSX (opcional: pip install XlsxWriter) se escribe en modo constant_memory a
+# un archivo temporal y luego se manda por partes; un .xlsx es un zip y su
+# índice va al final, así que no puede salir antes de la última fila.
+import csv
+import io
+import os
+import tempfile
+
+from db import get_conn
+from rows import ExportRow, row_factory
+
+try:
+    import xlsxwriter
+except ImportError:   # sin XlsxWriter sólo hay CSV
+    xlsxwriter = None
+
+EXPORT_FETCH_SIZE = int(os.environ.get("EXPORT_FETCH_SIZE", 2000))   # filas por viaje
+EXPORT_CHUNK_ROWS = 500        # filas CSV por chunk de la respuesta
+FILE_CHUNK_BYTES = 64 * 1024
+XLSX_MAX_ROWS = 1_048_576 - 2  # límite de Excel (menos encabezado y aviso)
+
+HEADERS = [
+    "Proveedor", "Usuario", "RFC", "Pedido", "Nombre del pedido", "Año", "Mes",
+    "Documento", "Aplica", "Archivo", "Fecha de subida", "Pedido completado",
+]
+
+def _export_sql(where) -> str:
+    # los filtros de _admin_project_filters usan columnas de projects sin alias
+    where_sql = (" WHERE " + " AND ".join(where)) if where else ""
+    return f"""
+        SELECT u.nombre AS proveedor, u.usuario, u.rfc,
+               p.pedido_no, p.name AS pedido, p.periodo_year, p.periodo_month,
+               t.tipo AS tipo_documento, COALESCE(pd.aplica, FALSE) AS aplica,
+               g.nombre_archivo, g.fecha_subida,
+               COALESCE(p.completed, 0) = 1 AS pedido_completado
+        FROM (
+            SELECT id, provider_id, name, pedido_no, periodo_year, periodo_month, completed
+            FROM projects{where_sql}
+        ) p
+        JOIN usuarios u ON u.id = p.provider_id
+        CROSS JOIN unnest(%s::text[]) WITH ORDINALITY AS t(tipo, ord)
+        LEFT JOIN project_docs pd
+               ON pd.project_id = p.id AND pd.tipo_documento = t.tipo
+        LEFT JOIN documentos g
+               ON g.usuario_id = p.provider_id AND g.project_id IS NULL AND g.tipo_documento = t.tipo
+        ORDER BY u.nombre, u.id, p.periodo_year, p.periodo_month, p.pedido_no, p.id, t.ord
+    """
+
+def export_rows(where, params, tipos):
+    """
+    Generador de ExportRow. Toma una conexión del pool mientras se consume
+    (el cursor del servidor vive en esa transacción) y la regresa al terminar
+    o si el cliente corta la descarga.
+    """
+    sql = _export_sql(where)
+    with get_conn() as conn:
+        with conn.cursor(name="export_cumplimiento", row_factory=row_factory(ExportRow)) as cur:
+            cur.itersize = EXPORT_FETCH_SIZE
+            cur.execute(sql, [*params, list(tipos)])
+            yield from cur
+
+def _values(r: ExportRow) -> list:
+    return [
+        r.proveedor, r.usuario, r.rfc or "", r.pedido_no or "", r.pedido,
+        r.periodo_year or "", r.periodo_month or "", r.tipo_documento,
+        "Sí" if r.aplica else "No", r.nombre_archivo or "",
+        r.fecha_subida.strftime("%Y-%m-%d %H:%M") if r.fecha_subida else "",
+        "Sí" if r.pedido_completado else "No",
+    ]
+
+# ===================== CSV =====================
+def csv_chunks(rows):
+    """
+    CSV en UTF-8 con BOM (Excel lo abre con acentos), por chunks de
+    EXPORT_CHUNK_ROWS filas.
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    buf.write("\ufeff")
+    writer.writerow(HEADERS)
+
+    n = 0
+    for r in rows:
+        writer.writerow(_values(r))
+        n += 1
+        if n % EXPORT_CHUNK_ROWS == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode("utf-8")
+
+# ===================== XLSX =====================
+def xlsx_available() -> bool:
+    return xlsxwriter is not None
+
+def xlsx_chunks(rows):
+    """
+    Escribe el libro fila por fila (constant_memory: cada fila se baja a disco
+    al pasar a la siguiente) y manda el archivo en bloques de 64 KB.
+    """
+    with tempfile.TemporaryFile(suffix=".xlsx") as tmp:
+        wb = xlsxwriter.Workbook(tmp, {"constant_memory": True})
+        ws = wb.add_worksheet("Cumplimiento")
+        bold = wb.add_format({"bold": True})
+        date_fmt = wb.add_format({"num_format": "yyyy-mm-dd hh:mm"})
+
+        ws.write_row(0, 0, HEADERS, bold)
+        ws.freeze_panes(1, 0)
+        ws.set_column(0, 0, 30)
+        ws.set_column(3, 4, 18)
+        ws.set_column(7, 7, 30)
+        ws.set_column(9, 10, 24)
+
+        i = 0
+        for r in rows:
+            if i >= XLSX_MAX_ROWS:
+                ws.write(i + 1, 0, "Límite de filas de Excel alcanzado: usa CSV o más filtros.", bold)
+                break
+            i += 1
+            values = _values(r)
+            values[5] = r.periodo_year
+            values[6] = r.periodo_month
+            ws.write_row(i, 0, values[:10])
+            if r.fecha_subida:
+                ws.write_datetime(i, 10, r.fecha_subida, date_fmt)
+            ws.write(i, 11, values[11])
+        wb.close()
+
+        tmp.seek(0)
+        while True:
+            chunk = tmp.read(FILE_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
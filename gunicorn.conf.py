@@ -0,0 +1,61 @@
+# gunicorn.conf.py  (Procfile: gunicorn app:app -c gunicorn.conf.py)
+#
+# - gthread: cada worker atiende `threads` requests a la vez; un stream largo
+#   (SSE del dashboard, ZIP, exportación) ocupa un thread, no el worker.
+# - preload_app: app.py se importa una vez en el master y los workers se
+#   crean por fork; lifecycle.py crea el pool, el cliente S3 y los threads de
+#   cada worker después del fork.
+# Todo se puede ajustar por variables de entorno sin tocar este archivo.
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+# Streams SSE (/admin/events): cada uno toma un thread hasta
+# LIVE_STREAM_MAX_SECONDS. live.py limita por default a threads // 4 (mín. 1)
+# por worker y responde 503 + retry al pasarse; si se sube LIVE_MAX_STREAMS,
+# subir threads igual para que queden threads para requests normales:
+#   threads >= LIVE_MAX_STREAMS + requests concurrentes esperados
+os.environ.setdefault("GUNICORN_THREADS", str(threads))
+
+# Pool de BD por worker (se lee al importar db.py, con preload):
+#   threads (cada request toma a lo más una; las exportaciones CSV/XLSX la
+#            tienen todo el stream)
+#   + threads de fondo que usan el MISMO pool: outbox de S3 (jobs.py, 1 si
+#     S3_OUTBOX_WORKER) y REMINDER_WORKERS (reminders.py, si hay SMTP_HOST)
+#   + DB_POOL_HEADROOM de holgura
+# El LISTEN de live.py usa su propia conexión, fuera del pool. En total son
+# workers * (DB_POOL_MAX + 1) conexiones: debe caber en max_connections.
+_background = (
+    (1 if os.environ.get("S3_OUTBOX_WORKER", "1").lower() in ("1", "true") else 0)
+    + (int(os.environ.get("REMINDER_WORKERS", 2)) if os.environ.get("SMTP_HOST") else 0)
+)
+os.environ.setdefault(
+    "DB_POOL_MAX", str(threads + _background + int(os.environ.get("DB_POOL_HEADROOM", 2)))
+)
+
+# gthread: el timeout vigila el latido del worker, no la duración del request
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1").lower() in ("1", "true")
+
+# reciclar workers de vez en cuando (memoria); el jitter evita que todos
+# reinicien a la vez
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 200))
+
+def pre_fork(server, worker):
+    from lifecycle import before_fork
+    before_fork()
+
+def post_fork(server, worker):
+    from lifecycle import init_worker
+    init_worker()
+
+def worker_exit(server, worker):
+    from lifecycle import shutdown_worker
+    shutdown_worker()
@@ -0,0 +1,360 @@
+# jobs.py  (borrado en cascada: BD en una transacción + outbox de S3 en segundo plano)
+#
+#   job_id = start_cascade(conn, "user", user_id)   # DELETEs + llaves al outbox
+#   conn.commit(); wake_worker()                     # el worker borra en S3
+#
+# El worker es un thread por proceso que drena s3_delete_outbox en lotes de
+# delete_objects (máx. 1000 llaves), con reintentos y backoff exponencial.
+# Varios procesos pueden drenar a la vez: cada lote se aparta con SKIP LOCKED
+# + locked_until y commit, se borra en S3 sin conexión a la BD y el resultado
+# se guarda en otra transacción corta. Si el worker muere a medio lote, éste
+# vuelve a la cola al vencer locked_until (borrar dos veces es inofensivo).
+# Las llaves cas/ (blobs.py) pueden estar compartidas: la cascada sólo encola
+# las que quedan sin referencias y el drain no borra las que se reutilizaron.
+# El mismo worker pasa al outbox, cada STAGING_SWEEP_INTERVAL, las llaves de
+# staging de subidas directas que nadie confirmó (sweep_staging).
+import os
+import sys
+import threading
+import time
+
+import psycopg.rows
+
+from blobs import release_blobs
+from db import get_conn
+from storage import S3_DELETE_BATCH, s3_delete_keys
+
+OUTBOX_WORKER = os.environ.get("S3_OUTBOX_WORKER", "1").lower() in ("1", "true")
+OUTBOX_POLL_INTERVAL = float(os.environ.get("S3_OUTBOX_POLL_INTERVAL", 5))   # seg. entre revisiones
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("S3_OUTBOX_MAX_ATTEMPTS", 8))
+OUTBOX_BACKOFF_BASE = float(os.environ.get("S3_OUTBOX_BACKOFF_BASE", 2))     # seg.; se duplica por intento
+OUTBOX_BACKOFF_MAX = float(os.environ.get("S3_OUTBOX_BACKOFF_MAX", 600))
+# un lote apartado vuelve a la cola si el worker no reporta en este tiempo;
+# cubre una llamada a delete_objects con los reintentos de botocore
+OUTBOX_LEASE = float(os.environ.get("S3_OUTBOX_LEASE", 300))
+# staging de subidas sin confirmar: más viejas que esto van al outbox. Debe
+# pasar de UPLOAD_EXPIRES + 300 (vigencia del token de confirm en app.py)
+STAGING_MAX_AGE = float(os.environ.get("UPLOAD_STAGING_MAX_AGE", 3600))
+STAGING_SWEEP_INTERVAL = float(os.environ.get("UPLOAD_STAGING_SWEEP_INTERVAL", 300))
+
+# kind -> (documentos que se borran, DELETEs en orden de dependencias)
+_CASCADES = {
+    "user": (
+        "SELECT ruta, sha256 FROM documentos WHERE usuario_id=%(id)s",
+        [
+            "DELETE FROM documentos WHERE usuario_id=%(id)s",
+            "DELETE FROM project_docs WHERE project_id IN (SELECT id FROM projects WHERE provider_id=%(id)s)",
+            "DELETE FROM project_compliance WHERE provider_id=%(id)s",
+            "DELETE FROM projects WHERE provider_id=%(id)s",
+            "DELETE FROM enabled_periods WHERE provider_id=%(id)s",
+            "DELETE FROM reminders WHERE provider_id=%(id)s",
+            "DELETE FROM usuarios WHERE id=%(id)s",
+        ],
+    ),
+    "project": (
+        "SELECT ruta, sha256 FROM documentos WHERE project_id=%(id)s",
+        [
+            "DELETE FROM project_docs WHERE project_id=%(id)s",
+            "DELETE FROM documentos WHERE project_id=%(id)s",
+            "DELETE FROM project_compliance WHERE project_id=%(id)s",
+            "DELETE FROM projects WHERE id=%(id)s",
+        ],
+    ),
+}
+
+# ===================== CASCADA (BD) =====================
+def start_cascade(conn, kind: str, target_id: int, created_by: int | None = None) -> int:
+    """
+    Crea el job, pasa las llaves de S3 al outbox y borra las filas, todo en la
+    transacción actual de `conn` (el que llama hace commit). Regresa el job_id.
+    """
+    docs_sql, deletes = _CASCADES[kind]
+    params = {"id": target_id}
+
+    with conn.cursor() as cur:
+        cur.execute(
+            "INSERT INTO delete_jobs(kind, target_id, created_by) VALUES(%s,%s,%s) RETURNING id",
+            (kind, target_id, created_by)
+        )
+        job_id = cur.fetchone()[0]
+
+        # llave propia (sha256 NULL): directo al outbox
+        cur.execute(f"""
+            INSERT INTO s3_delete_outbox(job_id, s3_key)
+            SELECT DISTINCT %(job)s, ruta FROM ({docs_sql}) d
+            WHERE ruta IS NOT NULL AND ruta <> '' AND sha256 IS NULL
+        """, {**params, "job": job_id})
+        total = cur.rowcount
+
+        # llave cas/: una referencia menos por documento; encola las que llegan a 0
+        cur.execute(f"SELECT sha256 FROM ({docs_sql}) d WHERE sha256 IS NOT NULL", params)
+        total += release_blobs(cur, [r[0] for r in cur.fetchall()], job_id)
+
+        for sql in deletes:
+            cur.execute(sql, params)
+
+        # sin archivos no hay nada que esperar
+        cur.execute("""
+            UPDATE delete_jobs
+            SET total_keys=%(total)s,
+                status=CASE WHEN %(total)s = 0 THEN 'done' ELSE 'running' END,
+                finished_at=CASE WHEN %(total)s = 0 THEN NOW() END
+            WHERE id=%(job)s
+        """, {"total": total, "job": job_id})
+
+    return job_id
+
+def get_job(conn, job_id: int) -> dict | None:
+    with conn.cursor(row_factory=psycopg.rows.dict_row) as cur:
+        cur.execute("""
+            SELECT id, kind, target_id, status, total_keys, deleted_keys, failed_keys,
+                   created_at, finished_at
+            FROM delete_jobs WHERE id=%s
+        """, (job_id,))
+        job = cur.fetchone()
+    if not job:
+        return None
+
+    job["pending_keys"] = job["total_keys"] - job["deleted_keys"] - job["failed_keys"]
+    for col in ("created_at", "finished_at"):
+        if job[col]:
+            job[col] = job[col].isoformat()
+    return job
+
+# ===================== OUTBOX (S3) =====================
+def _claim(limit: int) -> tuple[list, dict]:
+    """
+    Toma un lote de llaves vencidas (SKIP LOCKED) y lo aparta (locked_until)
+    en una transacción CORTA. Las llaves cas/ que siguen en 0 se marcan con
+    deleting_until: retain_blob no las reutiliza mientras se borran.
+    Regresa (filas, {llave cas/: refcount}).
+    """
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("""
+            UPDATE s3_delete_outbox o
+            SET locked_until = NOW() + %(lease)s * INTERVAL '1 second'
+            FROM (
+                SELECT id FROM s3_delete_outbox
+                WHERE status='pending' AND next_attempt_at <= NOW()
+                  AND (locked_until IS NULL OR locked_until <= NOW())
+                ORDER BY next_attempt_at, id
+                LIMIT %(limit)s
+                FOR UPDATE SKIP LOCKED
+            ) c
+            WHERE o.id = c.id
+            RETURNING o.id, o.job_id, o.s3_key
+        """, {"lease": OUTBOX_LEASE, "limit": limit})
+        rows = sorted(cur.fetchall())
+
+        blobs = {}
+        if rows:
+            cur.execute("""
+                UPDATE s3_blobs b
+                SET deleting_until = CASE WHEN b.refcount = 0
+                                          THEN NOW() + %(lease)s * INTERVAL '1 second' END
+                FROM (
+                    SELECT sha256 FROM s3_blobs
+                    WHERE s3_key = ANY(%(keys)s) ORDER BY sha256 FOR UPDATE
+                ) l
+                WHERE b.sha256 = l.sha256
+                RETURNING b.s3_key, b.refcount
+            """, {"lease": OUTBOX_LEASE, "keys": list({k for _, _, k in rows})})
+            blobs = dict(cur.fetchall())
+        conn.commit()
+    return rows, blobs
+
+def _record(rows: list, blobs: dict, errors: dict):
+    """
+    Guarda el resultado del lote (otra transacción corta): outbox, s3_blobs
+    de las llaves cas/ ya borradas y progreso de los jobs.
+    """
+    with get_conn() as conn, conn.cursor() as cur:
+        done_blobs = [k for k in blobs if k not in errors]
+        if done_blobs:
+            cur.execute("""
+                SELECT sha256 FROM s3_blobs
+                WHERE s3_key = ANY(%s) ORDER BY sha256 FOR UPDATE
+            """, (done_blobs,))
+            # ya no está en S3; las que se reutilizaron antes del lote
+            # (refcount > 0) se quedan
+            cur.execute("DELETE FROM s3_blobs WHERE s3_key = ANY(%s) AND refcount = 0", (done_blobs,))
+        failed_blobs = [k for k in blobs if k in errors]
+        if failed_blobs:
+            cur.execute("""
+                UPDATE s3_blobs b SET deleting_until = NULL
+                FROM (
+                    SELECT sha256 FROM s3_blobs
+                    WHERE s3_key = ANY(%s) ORDER BY sha256 FOR UPDATE
+                ) l
+                WHERE b.sha256 = l.sha256
+            """, (failed_blobs,))
+
+        ok_ids = [i for i, _, k in rows if k not in errors]
+        failed = [(i, errors[k]) for i, _, k in rows if k in errors]
+
+        if ok_ids:
+            cur.execute("""
+                UPDATE s3_delete_outbox
+                SET status='done', attempts=attempts+1, done_at=NOW(), last_error=NULL, locked_until=NULL
+                WHERE id = ANY(%s)
+            """, (ok_ids,))
+
+        if failed:
+            cur.execute("""
+                UPDATE s3_delete_outbox o
+                SET attempts=o.attempts+1,
+                    last_error=f.err,
+                    locked_until=NULL,
+                    status=CASE WHEN o.attempts+1 >= %(max)s THEN 'failed' ELSE 'pending' END,
+                    next_attempt_at=NOW() + LEAST(%(base)s * power(2, o.attempts), %(cap)s) * INTERVAL '1 second'
+                FROM unnest(%(ids)s::bigint[], %(errs)s::text[]) AS f(id, err)
+                WHERE o.id=f.id
+            """, {
+                "max": OUTBOX_MAX_ATTEMPTS,
+                "base": OUTBOX_BACKOFF_BASE,
+                "cap": OUTBOX_BACKOFF_MAX,
+                "ids": [i for i, _ in failed],
+                "errs": [err for _, err in failed],
+            })
+
+        job_ids = sorted({j for _, j, _ in rows if j is not None})
+        if job_ids:
+            _refresh_jobs(cur, job_ids)
+        conn.commit()
+
+def drain_once(limit: int = S3_DELETE_BATCH) -> int:
+    """
+    Aparta un lote de llaves pendientes, las borra con un solo delete_objects
+    SIN tener conexión a la BD y guarda el resultado. Regresa cuántas filas
+    procesó.
+    """
+    rows, blobs = _claim(limit)
+    if not rows:
+        return 0
+
+    # llaves cas/ que se volvieron a usar desde que se encolaron: no se borran
+    keys = [k for k in dict.fromkeys(k for _, _, k in rows) if not blobs.get(k)]
+    try:
+        errors = s3_delete_keys(keys)
+    except Exception as e:
+        print("S3 delete_objects error:", e)
+        errors = {k: f"{type(e).__name__}: {e}" for k in keys}
+
+    _record(rows, blobs, errors)
+    return len(rows)
+
+def _refresh_jobs(cur, job_ids: list[int]):
+    cur.execute("""
+        UPDATE delete_jobs j
+        SET deleted_keys=c.done,
+            failed_keys=c.failed,
+            status=CASE WHEN c.pending > 0 THEN 'running'
+                        WHEN c.failed > 0 THEN 'failed'
+                        ELSE 'done' END,
+            finished_at=CASE WHEN c.pending > 0 THEN NULL ELSE NOW() END
+        FROM (
+            SELECT job_id,
+                   COUNT(*) FILTER (WHERE status='done') AS done,
+                   COUNT(*) FILTER (WHERE status='failed') AS failed,
+                   COUNT(*) FILTER (WHERE status='pending') AS pending
+            FROM s3_delete_outbox
+            WHERE job_id = ANY(%s)
+            GROUP BY job_id
+        ) c
+        WHERE j.id=c.job_id
+    """, (job_ids,))
+
+def sweep_staging(max_age: float = STAGING_MAX_AGE) -> int:
+    """
+    Pasa al outbox las llaves de staging (upload_staging) que nadie confirmó
+    en `max_age` segundos. Regresa cuántas encoló.
+    """
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("""
+            WITH stale AS (
+                DELETE FROM upload_staging
+                WHERE created_at < NOW() - %s * INTERVAL '1 second'
+                RETURNING s3_key
+            )
+            INSERT INTO s3_delete_outbox(s3_key) SELECT s3_key FROM stale
+        """, (max_age,))
+        n = cur.rowcount
+        conn.commit()
+    return n
+
+def drain_all() -> int:
+    """
+    Drena hasta que no quedan llaves vencidas (CLI / pruebas). Las que siguen
+    en backoff se quedan para el siguiente intento.
+    """
+    total = 0
+    while True:
+        n = drain_once()
+        total += n
+        if n < S3_DELETE_BATCH:
+            return total
+
+# -------- worker en segundo plano (un thread por proceso) --------
+_worker = None
+_worker_pid = None
+_wake = threading.Event()
+_worker_lock = threading.Lock()
+
+def _worker_loop(wake: threading.Event):
+    last_sweep = 0.0
+    while True:
+        if time.monotonic() - last_sweep >= STAGING_SWEEP_INTERVAL:
+            try:
+                sweep_staging()
+            except Exception as e:
+                print("Staging sweep error:", e)
+            last_sweep = time.monotonic()
+        try:
+            n = drain_once()
+        except Exception as e:
+            print("Outbox S3 error:", e)
+            n = 0
+        if n >= S3_DELETE_BATCH:
+            continue  # probablemente hay más en cola
+        wake.wait(OUTBOX_POLL_INTERVAL)
+        wake.clear()
+
+def ensure_worker():
+    """
+    Arranca el worker de ESTE proceso si no existe (después de un fork de
+    gunicorn el thread del padre no sobrevive, se crea uno nuevo).
+    """
+    global _worker, _worker_pid, _wake
+    if not OUTBOX_WORKER:
+        return
+    pid = os.getpid()
+    if _worker is not None and _worker_pid == pid and _worker.is_alive():
+        return
+
+    with _worker_lock:
+        if _worker is None or _worker_pid != pid or not _worker.is_alive():
+            _wake = threading.Event()
+            _worker = threading.Thread(
+                target=_worker_loop, args=(_wake,), name=f"s3-outbox-{pid}", daemon=True
+            )
+            _worker.start()
+            _worker_pid = pid
+
+def wake_worker():
+    # llamar DESPUÉS del commit: antes el worker no ve las llaves nuevas
+    ensure_worker()
+    _wake.set()
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["sweep"]:
+        print(f"Llaves de staging encoladas: {sweep_staging()}")
+        argv = ["drain"]
+    if argv[:1] != ["drain"]:
+        print("Uso: python jobs.py drain|sweep")
+        return 2
+    print(f"Llaves procesadas: {drain_all()}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
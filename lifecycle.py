@@ -0,0 +1,37 @@
+# lifecycle.py  (ciclo de vida de los procesos de gunicorn; ver gunicorn.conf.py)
+#
+#   pre_fork    -> before_fork()      # master: nada con sockets pasa al hijo
+#   post_fork   -> init_worker()      # worker: pool, cliente S3 y threads propios
+#   worker_exit -> shutdown_worker()
+#
+# Con preload_app el master importa app.py UNA vez (esquema verificado una vez,
+# código compartido copy-on-write) y luego hace fork. Todo lo que tiene sockets
+# o threads se crea DESPUÉS del fork, por worker, antes de aceptar requests:
+# así el primer request de cada worker no paga el pool ni el cliente S3.
+# Sin gunicorn (flask run, scripts, bench) todo se sigue creando al primer uso.
+from db import DATABASE_URL, close_pool, get_pool
+from jobs import ensure_worker
+from reminders import ensure_workers
+from storage import get_s3
+
+def before_fork():
+    """
+    Master, antes de cada fork: cierra el pool que haya abierto ensure_schema()
+    (un socket heredado lo usarían dos procesos) y deja boto3 importado sin
+    crear cliente: el módulo se comparte, el cliente no.
+    """
+    close_pool()
+    import boto3.session  # noqa: F401  (sólo el import; get_s3() crea el cliente en el worker)
+
+def init_worker():
+    """
+    Worker recién creado: abre sus conexiones y arranca sus threads.
+    """
+    get_s3()
+    if DATABASE_URL:
+        get_pool()
+        ensure_worker()
+        ensure_workers()
+
+def shutdown_worker():
+    close_pool()
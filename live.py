@@ -0,0 +1,242 @@
+# live.py  (dashboard admin en vivo: LISTEN/NOTIFY -> Server-Sent Events)
+#
+#   sub = subscribe(request.headers.get("Last-Event-ID"))   # None si ya hay LIVE_MAX_STREAMS
+#   Response(stream_with_context(sse_stream(sub)), mimetype="text/event-stream")
+#
+# Los triggers de la migración 0013 avisan (pg_notify 'repse_dashboard') cada
+# escritura en usuarios, documentos, projects, project_docs y enabled_periods.
+# Un thread por proceso tiene UNA conexión con LISTEN (fuera del pool) y
+# reparte cada aviso a las colas de los navegadores conectados: un dashboard
+# abierto ya no consulta la BD hasta que el admin decide recargar.
+#
+# - Cola por cliente de LIVE_QUEUE_SIZE avisos; si se llena (cliente lento) se
+#   vacía y se le manda `resync` (que recargue) en vez de crecer sin límite.
+# - Si la conexión LISTEN se cae se reconecta con backoff y todos reciben
+#   `resync`: pudieron perderse avisos mientras tanto.
+# - Cada stream dura máx. LIVE_STREAM_MAX_SECONDS y EventSource reconecta solo:
+#   ningún thread del worker queda tomado para siempre. Necesita workers con
+#   threads (gthread): con workers sync cada stream ocupa un worker completo.
+# - Cada aviso trae 'v' (secuencia global, migración 0018) y sale como `id:`.
+#   El proceso guarda los últimos LIVE_REPLAY_SIZE avisos en el orden en que
+#   llegaron (igual en todos los workers): al reconectar con Last-Event-ID se
+#   reenvía lo que llegó después; si ese id ya no está, `resync`, salvo que la
+#   secuencia diga que no hubo escrituras desde entonces.
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from db import DATABASE_URL, dedicated_conn, get_conn
+
+CHANNEL = "repse_dashboard"
+SEQUENCE = "repse_dashboard_seq"
+
+LIVE_ENABLED = os.environ.get("LIVE_ENABLED", "1").lower() in ("1", "true")
+# Streams abiertos por proceso. Con gthread cada stream ocupa un thread del
+# worker hasta LIVE_STREAM_MAX_SECONDS (y EventSource reconecta solo): por
+# default sólo 1/4 de los threads, el resto queda para requests normales.
+LIVE_MAX_STREAMS = int(
+    os.environ.get("LIVE_MAX_STREAMS")
+    or max(1, int(os.environ.get("GUNICORN_THREADS", 8)) // 4)
+)
+LIVE_BUSY_RETRY_MS = int(os.environ.get("LIVE_BUSY_RETRY_MS", 30000))     # 503: reintentar en
+LIVE_QUEUE_SIZE = int(os.environ.get("LIVE_QUEUE_SIZE", 200))             # avisos por cliente
+LIVE_KEEPALIVE = float(os.environ.get("LIVE_KEEPALIVE", 15))              # seg. entre pings
+LIVE_STREAM_MAX_SECONDS = float(os.environ.get("LIVE_STREAM_MAX_SECONDS", 300))
+LIVE_RETRY_MS = int(os.environ.get("LIVE_RETRY_MS", 3000))                # reconexión de EventSource
+LIVE_BACKOFF_MAX = float(os.environ.get("LIVE_BACKOFF_MAX", 60))
+LIVE_REPLAY_SIZE = int(os.environ.get("LIVE_REPLAY_SIZE", 1000))          # avisos para reconexiones
+
+RESYNC = object()
+RESYNC_EVENT = "event: resync\ndata: {}\n\n"
+
+_subs = set()
+_subs_lock = threading.Lock()
+_recent = deque(maxlen=LIVE_REPLAY_SIZE)   # (v, payload) en orden de llegada
+
+# ===================== SUSCRIPTORES =====================
+class _Sub(queue.Queue):
+    # `head`: lo que sale al abrir el stream, antes de los avisos en vivo
+    head = ""
+
+def subscribe(last_event_id: str | None = None) -> _Sub | None:
+    """
+    Cola de avisos para un cliente SSE (arranca el listener si hace falta).
+    None si el proceso ya tiene LIVE_MAX_STREAMS abiertos. `last_event_id`
+    es el Last-Event-ID de EventSource al reconectar.
+    """
+    ensure_listener()
+    with _subs_lock:
+        if len(_subs) >= LIVE_MAX_STREAMS:
+            return None
+        q = _Sub(maxsize=LIVE_QUEUE_SIZE)
+        _subs.add(q)
+        # lo que ya llegó; lo que llegue después entra a la cola
+        recent = list(_recent)
+    q.head = _catch_up(recent, last_event_id)
+    return q
+
+def unsubscribe(q: queue.Queue):
+    with _subs_lock:
+        _subs.discard(q)
+
+def _catch_up(recent: list, last_event_id: str | None) -> str:
+    """
+    Avisos perdidos entre el stream anterior y éste: los que llegaron después
+    de `last_event_id` si sigue en `recent`; si no, `resync` salvo que la
+    secuencia no haya avanzado. Termina con `ready` y el `id:` del último
+    aviso conocido: la siguiente reconexión parte de aquí aunque en este
+    stream no llegue nada.
+    """
+    ids = [v for v, _ in recent]
+    head = ""
+    latest = None
+    if last_event_id:
+        try:
+            last = int(last_event_id)
+        except ValueError:
+            last = None
+        if last is not None and last in ids:
+            head = _format(recent[ids.index(last) + 1:])
+        else:
+            latest = _latest_version()
+            if last is None or latest is None or latest > last:
+                head = RESYNC_EVENT
+    anchor = ids[-1] if ids else (latest if latest is not None else _latest_version())
+    if anchor is not None:
+        head += f"id: {anchor}\nevent: ready\ndata: {{}}\n\n"
+    return head
+
+def _latest_version() -> int | None:
+    # último valor de la secuencia de los avisos; None si no se pudo leer
+    try:
+        with get_conn() as conn:
+            return conn.execute(
+                f"SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM {SEQUENCE}"
+            ).fetchone()[0]
+    except Exception as e:
+        print("LIVE version error:", e)
+        return None
+
+def _version(payload: str) -> int | None:
+    try:
+        return json.loads(payload).get("v")
+    except ValueError:
+        return None
+
+def _broadcast(item):
+    with _subs_lock:
+        if item is RESYNC:
+            # pudieron perderse avisos: el historial ya no sirve para reenviar
+            _recent.clear()
+        else:
+            _recent.append(item)
+        subs = list(_subs)
+    for q in subs:
+        try:
+            q.put_nowait(item)
+        except queue.Full:
+            # cliente atrasado: en vez de guardar más, que recargue
+            _clear(q)
+            q.put_nowait(RESYNC)
+
+def _clear(q: queue.Queue):
+    try:
+        while True:
+            q.get_nowait()
+    except queue.Empty:
+        pass
+
+def _format(items: list) -> str:
+    return "".join(
+        f"id: {v}\nevent: change\ndata: {payload}\n\n" if v is not None
+        else f"event: change\ndata: {payload}\n\n"
+        for v, payload in items
+    )
+
+def sse_stream(q: _Sub):
+    """
+    Generador del stream: `change` por aviso (id = 'v', data = json del
+    trigger), `resync` si hay que recargar y un comentario de ping cada
+    LIVE_KEEPALIVE (mantiene vivos los proxies y detecta al cliente que ya se fue).
+    """
+    deadline = time.monotonic() + LIVE_STREAM_MAX_SECONDS
+    try:
+        yield f"retry: {LIVE_RETRY_MS}\n\n" + q.head
+        while True:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return
+            try:
+                items = [q.get(timeout=min(LIVE_KEEPALIVE, left))]
+            except queue.Empty:
+                yield ": ping\n\n"
+                continue
+
+            # lo que llegó junto sale en una sola escritura
+            try:
+                while True:
+                    items.append(q.get_nowait())
+            except queue.Empty:
+                pass
+
+            if RESYNC in items:
+                yield RESYNC_EVENT
+            else:
+                yield _format(items)
+    finally:
+        unsubscribe(q)
+
+# ===================== LISTENER (un thread por proceso) =====================
+_listener = None
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+def _listen_loop():
+    backoff = 1.0
+    lost = False
+    while True:
+        try:
+            # application_name: identificable en pg_stat_activity
+            with dedicated_conn(autocommit=True, application_name=f"repse-live-{os.getpid()}") as conn:
+                conn.execute(f"LISTEN {CHANNEL}")
+                if lost:
+                    _broadcast(RESYNC)
+                    lost = False
+                backoff = 1.0
+                while True:
+                    for n in conn.notifies(timeout=LIVE_KEEPALIVE):
+                        _broadcast((_version(n.payload), n.payload))
+                    # sin avisos un rato: confirma que la conexión sigue viva
+                    conn.execute("SELECT 1")
+        except Exception as e:
+            print("LISTEN error:", e)
+            lost = True
+        time.sleep(backoff)
+        backoff = min(backoff * 2, LIVE_BACKOFF_MAX)
+
+def ensure_listener():
+    """
+    Arranca el listener de ESTE proceso si no existe (tras el fork de
+    gunicorn el thread del padre no sobrevive, se crea uno nuevo).
+    """
+    global _listener, _listener_pid
+    if not LIVE_ENABLED or not DATABASE_URL:
+        return
+    pid = os.getpid()
+    if _listener is not None and _listener_pid == pid and _listener.is_alive():
+        return
+
+    with _listener_lock:
+        if _listener is None or _listener_pid != pid or not _listener.is_alive():
+            if _listener_pid != pid:
+                # colas heredadas del padre: nadie las lee en este proceso; y
+                # su historial no dice qué pasó antes de este listener
+                with _subs_lock:
+                    _subs.clear()
+                    _recent.clear()
+            _listener = threading.Thread(target=_listen_loop, name=f"live-listen-{pid}", daemon=True)
+            _listener.start()
+            _listener_pid = pid
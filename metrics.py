@@ -0,0 +1,232 @@
+# metrics.py  (instrumentación por request: latencia, BD, S3, templates)
+#
+#   metrics.init_app(app)
+#   storage.on_s3_client(metrics.instrument_s3)   # cada cliente S3 al crearse
+#
+# - Histogramas en memoria del proceso, expuestos en formato de texto de
+#   Prometheus en /metrics (admin o "Authorization: Bearer $METRICS_TOKEN").
+#   Cada worker de gunicorn tiene los suyos: cada scrape ve un proceso.
+# - Header Server-Timing en cada respuesta (app, db, s3, tpl).
+# - METRICS_ENABLED=0 no registra hooks ni la ruta: cero costo por request.
+import os
+import threading
+import time
+
+from flask import (
+    abort, before_render_template, g, request, session, template_rendered
+)
+
+from db import pool_stats, query_stats
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1").lower() in ("1", "true")
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# segundos
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def expose(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            out.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return out
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}   # labels -> [conteo por bucket..., suma, total]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            s = self._series.get(labels)
+            if s is None:
+                s = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, upper in enumerate(self.buckets):
+                if value <= upper:
+                    s[i] += 1
+                    break
+            s[-2] += value
+            s[-1] += 1
+
+    def expose(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for labels, s in items:
+            cumulative = 0
+            for upper, n in zip(self.buckets, s):
+                cumulative += n
+                le = _labels(self.labelnames, labels, f'le="{upper}"')
+                out.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _labels(self.labelnames, labels, 'le="+Inf"')
+            out.append(f"{self.name}_bucket{le} {s[-1]}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {s[-2]}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, labels)} {s[-1]}")
+        return out
+
+HTTP_LATENCY = Histogram(
+    "repse_http_request_duration_seconds", "Latencia por ruta.", ("endpoint", "method", "status"))
+DB_QUERIES = Counter(
+    "repse_db_queries_total", "Consultas a PostgreSQL por ruta.", ("endpoint",))
+DB_TIME = Counter(
+    "repse_db_query_seconds_total", "Tiempo acumulado en PostgreSQL por ruta.", ("endpoint",))
+DB_PER_REQUEST = Histogram(
+    "repse_db_queries_per_request", "Consultas por request.", ("endpoint",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100))
+S3_LATENCY = Histogram(
+    "repse_s3_call_duration_seconds", "Latencia de llamadas a S3.", ("operation", "outcome"))
+TEMPLATE_RENDER = Histogram(
+    "repse_template_render_seconds", "Tiempo de render por template.", ("template",))
+
+_ALL = (HTTP_LATENCY, DB_QUERIES, DB_TIME, DB_PER_REQUEST, S3_LATENCY, TEMPLATE_RENDER)
+
+# acumulados del request actual (S3 y templates; la BD los lleva db.py)
+_local = threading.local()
+
+def _reset_request():
+    _local.s3_calls = 0
+    _local.s3_time = 0.0
+    _local.tpl_time = 0.0
+    _local.tpl_start = None
+
+def _add_s3(seconds: float):
+    _local.s3_calls = getattr(_local, "s3_calls", 0) + 1
+    _local.s3_time = getattr(_local, "s3_time", 0.0) + seconds
+
+# -------- S3: eventos de botocore (cada llamada HTTP real, no los presign) --------
+def instrument_s3(client):
+    def before_call(context=None, **kwargs):
+        if context is not None:
+            context["metrics_t0"] = time.perf_counter()
+
+    def after_call(context=None, model=None, http_response=None, **kwargs):
+        t0 = (context or {}).pop("metrics_t0", None)
+        if t0 is None:
+            return
+        dt = time.perf_counter() - t0
+        status = getattr(http_response, "status_code", 0) or 0
+        S3_LATENCY.observe(dt, model.name if model else "?", "ok" if status < 400 else "error")
+        _add_s3(dt)
+
+    def after_call_error(context=None, model=None, **kwargs):
+        t0 = (context or {}).pop("metrics_t0", None)
+        if t0 is None:
+            return
+        dt = time.perf_counter() - t0
+        S3_LATENCY.observe(dt, model.name if model else "?", "exception")
+        _add_s3(dt)
+
+    events = client.meta.events
+    events.register("before-call.s3", before_call)
+    events.register("after-call.s3", after_call)
+    events.register("after-call-error.s3", after_call_error)
+
+# -------- templates: señales de Flask --------
+def _before_render(sender, template, context, **extra):
+    _local.tpl_start = time.perf_counter()
+
+def _rendered(sender, template, context, **extra):
+    t0 = getattr(_local, "tpl_start", None)
+    if t0 is None:
+        return
+    dt = time.perf_counter() - t0
+    _local.tpl_start = None
+    _local.tpl_time = getattr(_local, "tpl_time", 0.0) + dt
+    TEMPLATE_RENDER.observe(dt, template.name or "?")
+
+# -------- Flask --------
+def _start_request():
+    g._metrics_t0 = time.perf_counter()
+    _reset_request()
+
+def _finish_request(resp):
+    t0 = g.pop("_metrics_t0", None)
+    if t0 is None:
+        return resp
+    total = time.perf_counter() - t0
+    endpoint = request.endpoint or "(sin ruta)"
+    if endpoint == "metrics":
+        return resp
+
+    queries, db_time = query_stats()
+    HTTP_LATENCY.observe(total, endpoint, request.method, resp.status_code)
+    DB_QUERIES.inc(endpoint, amount=queries)
+    DB_TIME.inc(endpoint, amount=db_time)
+    DB_PER_REQUEST.observe(queries, endpoint)
+
+    s3_calls = getattr(_local, "s3_calls", 0)
+    timing = [
+        f"app;dur={total * 1000:.1f}",
+        f'db;dur={db_time * 1000:.1f};desc="{queries} consultas"',
+    ]
+    if s3_calls:
+        timing.append(f's3;dur={getattr(_local, "s3_time", 0.0) * 1000:.1f};desc="{s3_calls} llamadas"')
+    tpl_time = getattr(_local, "tpl_time", 0.0)
+    if tpl_time:
+        timing.append(f"tpl;dur={tpl_time * 1000:.1f}")
+    resp.headers["Server-Timing"] = ", ".join(timing)
+    return resp
+
+def _pool_gauges() -> list[str]:
+    stats = pool_stats()
+    if not stats.get("pool_open"):
+        return []
+    out = []
+    for key in ("pool_size", "pool_available", "requests_waiting"):
+        name = f"repse_db_{key}"
+        out += [f"# TYPE {name} gauge", f"{name} {stats[key]}"]
+    return out
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _ALL:
+        lines.extend(metric.expose())
+    lines.extend(_pool_gauges())
+    return "\n".join(lines) + "\n"
+
+def _authorized() -> bool:
+    if session.get("rol") == 1:
+        return True
+    auth = request.headers.get("Authorization", "")
+    return bool(METRICS_TOKEN) and auth == f"Bearer {METRICS_TOKEN}"
+
+def init_app(app):
+    if not METRICS_ENABLED:
+        return
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+
+    @app.route("/metrics")
+    def metrics():
+        if not _authorized():
+            abort(403)
+        return render_metrics(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
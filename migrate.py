@@ -0,0 +1,110 @@
+# migrate.py  (migraciones versionadas: migrations/NNNN_nombre.sql)
+import os
+import re
+import sys
+
+from db import DATABASE_URL, get_conn
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+# llave fija para pg_advisory_xact_lock: sólo un proceso migra a la vez
+_LOCK_KEY = 0x52455053  # "REPS"
+
+_FILE_RE = re.compile(r"^(\d{4})_([a-zA-Z0-9_]+)\.sql$")
+
+def list_migrations() -> list[tuple[int, str, str]]:
+    """
+    [(version, nombre, ruta), ...] ordenado por versión.
+    """
+    out = []
+    for fn in os.listdir(MIGRATIONS_DIR):
+        m = _FILE_RE.match(fn)
+        if m:
+            out.append((int(m.group(1)), m.group(2), os.path.join(MIGRATIONS_DIR, fn)))
+    out.sort()
+
+    versions = [v for v, _, _ in out]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError("Hay migraciones con el mismo número de versión.")
+    return out
+
+def latest_version() -> int:
+    migrations = list_migrations()
+    return migrations[-1][0] if migrations else 0
+
+def _ensure_version_table(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version(
+        version INT PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMP NOT NULL DEFAULT NOW()
+    )
+    """)
+
+def current_version(cur) -> int:
+    cur.execute("SELECT to_regclass('schema_version')")
+    if cur.fetchone()[0] is None:
+        return 0
+    cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return cur.fetchone()[0]
+
+def run_migrations(conn) -> list[int]:
+    """
+    Aplica las migraciones pendientes, cada una en su propia transacción.
+    Regresa las versiones aplicadas.
+    """
+    applied = []
+    for version, name, path in list_migrations():
+        with open(path, encoding="utf-8") as f:
+            sql = f.read()
+
+        with conn.transaction(), conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (_LOCK_KEY,))
+            _ensure_version_table(cur)
+            cur.execute("SELECT 1 FROM schema_version WHERE version=%s", (version,))
+            if cur.fetchone():
+                continue
+
+            cur.execute(sql)
+            cur.execute(
+                "INSERT INTO schema_version(version, name) VALUES(%s,%s)",
+                (version, name)
+            )
+            applied.append(version)
+            print(f">>> Migración {version:04d}_{name} aplicada")
+    return applied
+
+_checked = False
+
+def ensure_schema():
+    """
+    Chequeo único por proceso: una sola consulta si la DB ya está al día,
+    y sólo si está atrasada se corren las migraciones pendientes.
+    """
+    global _checked
+    if _checked:
+        return
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            up_to_date = current_version(cur) >= latest_version()
+        conn.commit()
+        if not up_to_date:
+            run_migrations(conn)
+    _checked = True
+
+def main():
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL no está definido en variables de entorno.")
+
+    with get_conn() as conn:
+        applied = run_migrations(conn)
+        with conn.cursor() as cur:
+            version = current_version(cur)
+
+    if applied:
+        print(f"Esquema actualizado a la versión {version}.")
+    else:
+        print(f"El esquema ya está en la versión {version}.")
+
+if __name__ == "__main__":
+    sys.exit(main())
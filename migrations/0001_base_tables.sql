@@ -0,0 +1,38 @@
+-- 0001: tablas base (usuarios, projects, documentos)
+
+CREATE TABLE IF NOT EXISTS usuarios(
+    id SERIAL PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    usuario TEXT UNIQUE NOT NULL,
+    correo TEXT NOT NULL,
+    password TEXT NOT NULL,
+    rol INTEGER NOT NULL,
+    estado TEXT NOT NULL,
+    mail_password TEXT,
+
+    -- columnas legacy (si ya las usabas antes, se quedan)
+    empresa TEXT,
+    rfc TEXT,
+    repse TEXT,
+    domicilio TEXT,
+    telefono TEXT,
+    representante_legal TEXT
+);
+
+CREATE TABLE IF NOT EXISTS projects(
+    id SERIAL PRIMARY KEY,
+    provider_id INTEGER NOT NULL REFERENCES usuarios(id),
+    name TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    completed INTEGER DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS documentos(
+    id SERIAL PRIMARY KEY,
+    usuario_id INTEGER NOT NULL REFERENCES usuarios(id),
+    nombre_archivo TEXT NOT NULL,
+    ruta TEXT NOT NULL,
+    fecha_subida TIMESTAMP NOT NULL DEFAULT NOW(),
+    tipo_documento TEXT,
+    project_id INTEGER REFERENCES projects(id)
+);
@@ -0,0 +1,14 @@
+-- 0002: columnas REPSE/Contacto del registro.html
+-- (el form manda RFC como "repse_rfc" y se guarda en la columna legacy "rfc")
+
+ALTER TABLE usuarios
+    ADD COLUMN IF NOT EXISTS repse_numero TEXT,
+    ADD COLUMN IF NOT EXISTS repse_folio TEXT,
+    ADD COLUMN IF NOT EXISTS repse_aviso TEXT,
+    ADD COLUMN IF NOT EXISTS repse_fecha_aviso DATE,
+    ADD COLUMN IF NOT EXISTS repse_vigencia DATE,
+    ADD COLUMN IF NOT EXISTS repse_regimen TEXT,
+    ADD COLUMN IF NOT EXISTS repse_objeto TEXT,
+    ADD COLUMN IF NOT EXISTS contacto_nombre TEXT,
+    ADD COLUMN IF NOT EXISTS contacto_tel TEXT,
+    ADD COLUMN IF NOT EXISTS contacto_correo TEXT;
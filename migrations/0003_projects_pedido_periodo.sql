@@ -0,0 +1,6 @@
+-- 0003: pedido y periodo en projects
+
+ALTER TABLE projects
+    ADD COLUMN IF NOT EXISTS pedido_no TEXT,
+    ADD COLUMN IF NOT EXISTS periodo_year INT,
+    ADD COLUMN IF NOT EXISTS periodo_month INT;
@@ -0,0 +1,19 @@
+-- 0004: meses habilitados por proveedor + docs que aplican por pedido
+
+CREATE TABLE IF NOT EXISTS enabled_periods(
+    id SERIAL PRIMARY KEY,
+    provider_id INTEGER NOT NULL REFERENCES usuarios(id),
+    periodo_year INT NOT NULL,
+    periodo_month INT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    UNIQUE(provider_id, periodo_year, periodo_month)
+);
+
+CREATE TABLE IF NOT EXISTS project_docs(
+    id SERIAL PRIMARY KEY,
+    project_id INTEGER NOT NULL REFERENCES projects(id),
+    tipo_documento TEXT NOT NULL,
+    aplica BOOLEAN NOT NULL DEFAULT FALSE,
+    completed BOOLEAN NOT NULL DEFAULT FALSE,
+    UNIQUE(project_id, tipo_documento)
+);
@@ -0,0 +1,4 @@
+-- 0005: índice para la paginación keyset de projects (ORDER BY created_at DESC, id DESC)
+
+CREATE INDEX IF NOT EXISTS projects_created_at_id_idx
+    ON projects(created_at DESC, id DESC);
@@ -0,0 +1,14 @@
+-- 0006: búsqueda de pedidos (q) indexada
+--   * pg_trgm + GIN para ILIKE '%q%' sobre name y pedido_no
+--   * btree sobre pedido_no para la búsqueda exacta (#pedido)
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS projects_name_trgm_idx
+    ON projects USING gin (name gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS projects_pedido_no_trgm_idx
+    ON projects USING gin (pedido_no gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS projects_pedido_no_idx
+    ON projects(pedido_no);
@@ -0,0 +1,63 @@
+-- 0007: índices para las consultas calientes de los dashboards
+-- (los UNIQUE de enabled_periods y project_docs ya cubren provider_id / project_id)
+
+-- ---- documentos: UN doc global por (usuario, tipo) ----
+-- Antes de crear el índice único se quitan duplicados viejos (solo pudieron
+-- quedar por carreras en el reemplazo); se conserva el más reciente.
+-- Sus archivos en S3 quedan en s3_orphan_keys: 0008 los pasa al outbox de
+-- borrado (aquí todavía no existe).
+CREATE TABLE IF NOT EXISTS s3_orphan_keys(
+    s3_key TEXT PRIMARY KEY,
+    reason TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+WITH removed AS (
+    DELETE FROM documentos d
+    USING documentos newer
+    WHERE d.project_id IS NULL
+      AND newer.project_id IS NULL
+      AND newer.usuario_id = d.usuario_id
+      AND newer.tipo_documento IS NOT DISTINCT FROM d.tipo_documento
+      AND (newer.fecha_subida, newer.id) > (d.fecha_subida, d.id)
+    RETURNING d.ruta
+)
+INSERT INTO s3_orphan_keys(s3_key, reason)
+SELECT DISTINCT ruta, '0007 dedupe documentos globales' FROM removed
+WHERE ruta IS NOT NULL AND ruta <> ''
+ON CONFLICT (s3_key) DO NOTHING;
+
+CREATE UNIQUE INDEX IF NOT EXISTS documentos_global_usuario_tipo_uidx
+    ON documentos(usuario_id, tipo_documento)
+    WHERE project_id IS NULL;
+
+-- admin: todos los globales ORDER BY fecha_subida DESC
+CREATE INDEX IF NOT EXISTS documentos_global_fecha_idx
+    ON documentos(fecha_subida DESC)
+    WHERE project_id IS NULL;
+
+-- delete_project / delete_user
+CREATE INDEX IF NOT EXISTS documentos_project_id_idx
+    ON documentos(project_id)
+    WHERE project_id IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS documentos_usuario_id_idx
+    ON documentos(usuario_id);
+
+-- ---- projects: filtros (proveedor, periodo) + orden keyset ----
+CREATE INDEX IF NOT EXISTS projects_provider_periodo_created_idx
+    ON projects(provider_id, periodo_year, periodo_month, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS projects_provider_created_idx
+    ON projects(provider_id, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS projects_periodo_created_idx
+    ON projects(periodo_year, periodo_month, created_at DESC, id DESC);
+
+-- ---- enabled_periods: listado admin ORDER BY periodo DESC ----
+CREATE INDEX IF NOT EXISTS enabled_periods_periodo_idx
+    ON enabled_periods(periodo_year DESC, periodo_month DESC);
+
+-- ---- usuarios: pendientes / proveedores aprobados ----
+CREATE INDEX IF NOT EXISTS usuarios_estado_rol_nombre_idx
+    ON usuarios(estado, rol, nombre);
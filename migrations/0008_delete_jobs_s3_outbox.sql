@@ -0,0 +1,50 @@
+-- 0008: borrado en cascada en segundo plano
+--   delete_jobs      : un registro por delete_user / delete_project (progreso consultable)
+--   s3_delete_outbox : llaves de S3 pendientes de borrar; se insertan en la MISMA
+--                      transacción que los DELETE de la BD y las drena jobs.py
+
+CREATE TABLE IF NOT EXISTS delete_jobs(
+    id SERIAL PRIMARY KEY,
+    kind TEXT NOT NULL,                       -- 'user' | 'project'
+    target_id INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'running',   -- running | done | failed
+    total_keys INT NOT NULL DEFAULT 0,
+    deleted_keys INT NOT NULL DEFAULT 0,
+    failed_keys INT NOT NULL DEFAULT 0,
+    created_by INTEGER,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS s3_delete_outbox(
+    id BIGSERIAL PRIMARY KEY,
+    job_id INTEGER REFERENCES delete_jobs(id) ON DELETE SET NULL,
+    s3_key TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',   -- pending | done | failed
+    attempts INT NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    last_error TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    done_at TIMESTAMP
+);
+
+-- el worker sólo busca pendientes ya vencidas
+CREATE INDEX IF NOT EXISTS s3_delete_outbox_pending_idx
+    ON s3_delete_outbox(next_attempt_at) WHERE status = 'pending';
+
+CREATE INDEX IF NOT EXISTS s3_delete_outbox_job_idx
+    ON s3_delete_outbox(job_id);
+
+-- llaves huérfanas del dedupe de 0007: al outbox, salvo las que otro
+-- documento sigue usando. Si 0007 corrió antes de guardar las llaves, la
+-- tabla no existe y no hay nada que pasar.
+DO $$
+BEGIN
+    IF to_regclass('s3_orphan_keys') IS NOT NULL THEN
+        INSERT INTO s3_delete_outbox(s3_key)
+        SELECT o.s3_key FROM s3_orphan_keys o
+        WHERE NOT EXISTS (SELECT 1 FROM documentos d WHERE d.ruta = o.s3_key);
+
+        DROP TABLE s3_orphan_keys;
+    END IF;
+END $$;
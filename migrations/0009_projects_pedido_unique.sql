@@ -0,0 +1,44 @@
+-- 0009: un pedido_no por proveedor y periodo (alta masiva con ON CONFLICT DO NOTHING)
+-- Antes del índice se fusionan los duplicados que ya existan: se conserva el
+-- más viejo (menor id) y se le pasan documentos y project_docs de los demás.
+
+CREATE TEMP TABLE dup_projects ON COMMIT DROP AS
+SELECT p.id AS dup_id, k.keep_id
+FROM projects p
+JOIN (
+    SELECT provider_id, pedido_no, periodo_year, periodo_month, MIN(id) AS keep_id
+    FROM projects
+    WHERE pedido_no IS NOT NULL
+    GROUP BY provider_id, pedido_no, periodo_year, periodo_month
+    HAVING COUNT(*) > 1
+) k ON k.provider_id = p.provider_id
+   AND k.pedido_no = p.pedido_no
+   AND k.periodo_year IS NOT DISTINCT FROM p.periodo_year
+   AND k.periodo_month IS NOT DISTINCT FROM p.periodo_month
+WHERE p.id <> k.keep_id;
+
+UPDATE documentos d
+SET project_id = dp.keep_id
+FROM dup_projects dp
+WHERE d.project_id = dp.dup_id;
+
+-- "aplica"/"completed" quedan marcados si lo estaban en cualquiera de los duplicados
+INSERT INTO project_docs(project_id, tipo_documento, aplica, completed)
+SELECT dp.keep_id, pd.tipo_documento, bool_or(pd.aplica), bool_or(pd.completed)
+FROM project_docs pd
+JOIN dup_projects dp ON dp.dup_id = pd.project_id
+GROUP BY dp.keep_id, pd.tipo_documento
+ON CONFLICT (project_id, tipo_documento) DO UPDATE
+SET aplica = project_docs.aplica OR EXCLUDED.aplica,
+    completed = project_docs.completed OR EXCLUDED.completed;
+
+DELETE FROM project_docs pd
+USING dup_projects dp
+WHERE pd.project_id = dp.dup_id;
+
+DELETE FROM projects p
+USING dup_projects dp
+WHERE p.id = dp.dup_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS projects_provider_pedido_periodo_uidx
+    ON projects(provider_id, pedido_no, periodo_year, periodo_month);
@@ -0,0 +1,33 @@
+-- 0010: resumen de cumplimiento por pedido (lo mantiene compliance.py)
+
+CREATE TABLE IF NOT EXISTS project_compliance(
+    project_id INTEGER PRIMARY KEY REFERENCES projects(id),
+    provider_id INTEGER NOT NULL,
+    aplica_count INT NOT NULL DEFAULT 0,
+    uploaded_count INT NOT NULL DEFAULT 0,
+    missing_count INT NOT NULL DEFAULT 0,
+    completed BOOLEAN NOT NULL DEFAULT FALSE,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- filtro "solo incompletos"
+CREATE INDEX IF NOT EXISTS project_compliance_missing_idx
+    ON project_compliance(project_id) WHERE missing_count > 0;
+
+-- carga inicial (mismo cálculo que compliance.rebuild)
+INSERT INTO project_compliance(project_id, provider_id, aplica_count, uploaded_count, missing_count, completed)
+SELECT p.id,
+       p.provider_id,
+       COUNT(pd.id),
+       COUNT(g.id),
+       COUNT(pd.id) - COUNT(g.id),
+       COALESCE(p.completed, 0) = 1
+FROM projects p
+LEFT JOIN project_docs pd
+       ON pd.project_id = p.id AND pd.aplica
+LEFT JOIN documentos g
+       ON g.usuario_id = p.provider_id
+      AND g.project_id IS NULL
+      AND g.tipo_documento = pd.tipo_documento
+GROUP BY p.id, p.provider_id, p.completed
+ON CONFLICT (project_id) DO NOTHING;
@@ -0,0 +1,24 @@
+-- 0011: cola de recordatorios por correo (la drenan los workers de reminders.py)
+
+CREATE TABLE IF NOT EXISTS reminders(
+    id BIGSERIAL PRIMARY KEY,
+    provider_id INTEGER NOT NULL REFERENCES usuarios(id),
+    to_email TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',   -- pending | sent | failed
+    attempts INT NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    last_error TEXT,
+    created_by INTEGER,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    sent_at TIMESTAMP
+);
+
+-- dedupe: a lo más UN recordatorio pendiente por proveedor
+CREATE UNIQUE INDEX IF NOT EXISTS reminders_pending_provider_uidx
+    ON reminders(provider_id) WHERE status = 'pending';
+
+-- los workers sólo buscan pendientes ya vencidos
+CREATE INDEX IF NOT EXISTS reminders_due_idx
+    ON reminders(next_attempt_at) WHERE status = 'pending';
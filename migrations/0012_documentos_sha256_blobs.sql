@@ -0,0 +1,16 @@
+-- 0012: documentos por contenido (SHA-256) con conteo de referencias
+--   documentos.sha256 : hash del archivo; NULL = subido antes de esto (llave propia)
+--   s3_blobs          : UN objeto de S3 por contenido (cas/xx/<sha256>) y cuántas
+--                       filas de documentos lo usan. En 0 la llave pasa a
+--                       s3_delete_outbox; jobs.py sólo la borra si sigue en 0.
+
+ALTER TABLE documentos
+    ADD COLUMN IF NOT EXISTS sha256 TEXT;
+
+CREATE TABLE IF NOT EXISTS s3_blobs(
+    sha256 TEXT PRIMARY KEY,
+    s3_key TEXT NOT NULL UNIQUE,
+    size_bytes BIGINT NOT NULL,
+    refcount INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,61 @@
+-- 0013: avisos de cambios para el dashboard admin en vivo (live.py)
+--   Cada fila escrita en usuarios, documentos, projects, project_docs y
+--   enabled_periods hace pg_notify('repse_dashboard', json) con la tabla, la
+--   operación, id, provider_id / project_id y las columnas que pase el trigger
+--   como argumentos. NOTIFY sale al hacer commit (un rollback no avisa).
+--   Cargas masivas lo apagan en su transacción: SET LOCAL repse.notify = 'off'
+
+CREATE OR REPLACE FUNCTION notify_dashboard() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    r jsonb;
+    payload jsonb;
+    col text;
+BEGIN
+    IF current_setting('repse.notify', true) = 'off' THEN
+        RETURN NULL;
+    END IF;
+
+    r := to_jsonb(CASE WHEN TG_OP = 'DELETE' THEN OLD ELSE NEW END);
+    payload := jsonb_build_object(
+        't', TG_TABLE_NAME,
+        'op', TG_OP,
+        'id', r->'id',
+        'provider_id', COALESCE(r->'provider_id', r->'usuario_id'),
+        'project_id', r->'project_id'
+    );
+    IF TG_NARGS > 0 THEN
+        FOREACH col IN ARRAY TG_ARGV LOOP
+            payload := payload || jsonb_build_object(col, r->col);
+        END LOOP;
+    END IF;
+
+    PERFORM pg_notify('repse_dashboard', jsonb_strip_nulls(payload)::text);
+    RETURN NULL;
+END $$;
+
+-- usuarios: sólo lo que se ve en el dashboard (no contraseñas ni datos REPSE)
+DROP TRIGGER IF EXISTS usuarios_notify_dashboard ON usuarios;
+CREATE TRIGGER usuarios_notify_dashboard
+    AFTER INSERT OR DELETE OR UPDATE OF estado, nombre, correo ON usuarios
+    FOR EACH ROW EXECUTE FUNCTION notify_dashboard('nombre', 'usuario', 'correo', 'rol', 'estado');
+
+DROP TRIGGER IF EXISTS documentos_notify_dashboard ON documentos;
+CREATE TRIGGER documentos_notify_dashboard
+    AFTER INSERT OR UPDATE OR DELETE ON documentos
+    FOR EACH ROW EXECUTE FUNCTION notify_dashboard('tipo_documento');
+
+DROP TRIGGER IF EXISTS projects_notify_dashboard ON projects;
+CREATE TRIGGER projects_notify_dashboard
+    AFTER INSERT OR DELETE OR UPDATE OF completed ON projects
+    FOR EACH ROW EXECUTE FUNCTION notify_dashboard('completed');
+
+DROP TRIGGER IF EXISTS project_docs_notify_dashboard ON project_docs;
+CREATE TRIGGER project_docs_notify_dashboard
+    AFTER INSERT OR UPDATE OR DELETE ON project_docs
+    FOR EACH ROW EXECUTE FUNCTION notify_dashboard('tipo_documento', 'aplica');
+
+DROP TRIGGER IF EXISTS enabled_periods_notify_dashboard ON enabled_periods;
+CREATE TRIGGER enabled_periods_notify_dashboard
+    AFTER INSERT OR DELETE ON enabled_periods
+    FOR EACH ROW EXECUTE FUNCTION notify_dashboard('periodo_year', 'periodo_month');
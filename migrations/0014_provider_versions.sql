@@ -0,0 +1,74 @@
+-- 0014: versión por proveedor para el cache de fragmentos del dashboard admin
+--   Toda fila escrita en projects, project_docs, documentos, project_compliance
+--   (y nombre / usuario / correo en usuarios) cambia la versión de SU
+--   proveedor. El valor es el txid de la transacción: único por transacción,
+--   así que las demás filas del mismo proveedor en esa transacción no vuelven
+--   a escribir la fila (WHERE del ON CONFLICT). Sin fila = versión 0.
+--   A diferencia de repse.notify, esto no se apaga: el cache depende de ello.
+
+CREATE TABLE IF NOT EXISTS provider_versions(
+    provider_id INTEGER PRIMARY KEY,   -- sin FK: borrar el usuario no debe fallar aquí
+    version BIGINT NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION bump_provider_version() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    col text := TG_ARGV[0];   -- columna con el proveedor; 'project_id' = buscarlo en projects
+    recs jsonb[] := '{}';
+    r jsonb;
+    pid integer;
+    last_pid integer;
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        recs := array_append(recs, to_jsonb(NEW));
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        recs := array_append(recs, to_jsonb(OLD));   -- UPDATE: también el proveedor anterior
+    END IF;
+
+    FOREACH r IN ARRAY recs LOOP
+        IF col = 'project_id' THEN
+            -- el pedido pudo borrarse antes en la misma transacción (cascada):
+            -- entonces su propio trigger ya cambió la versión
+            SELECT p.provider_id INTO pid FROM projects p WHERE p.id = (r->>'project_id')::int;
+        ELSE
+            pid := (r->>col)::int;
+        END IF;
+
+        IF pid IS NOT NULL AND pid IS DISTINCT FROM last_pid THEN
+            INSERT INTO provider_versions AS v (provider_id, version)
+            VALUES (pid, txid_current())
+            ON CONFLICT (provider_id) DO UPDATE SET version = EXCLUDED.version
+            WHERE v.version <> EXCLUDED.version;
+        END IF;
+        last_pid := pid;
+    END LOOP;
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS projects_provider_version ON projects;
+CREATE TRIGGER projects_provider_version
+    AFTER INSERT OR UPDATE OR DELETE ON projects
+    FOR EACH ROW EXECUTE FUNCTION bump_provider_version('provider_id');
+
+DROP TRIGGER IF EXISTS project_docs_provider_version ON project_docs;
+CREATE TRIGGER project_docs_provider_version
+    AFTER INSERT OR UPDATE OR DELETE ON project_docs
+    FOR EACH ROW EXECUTE FUNCTION bump_provider_version('project_id');
+
+DROP TRIGGER IF EXISTS documentos_provider_version ON documentos;
+CREATE TRIGGER documentos_provider_version
+    AFTER INSERT OR UPDATE OR DELETE ON documentos
+    FOR EACH ROW EXECUTE FUNCTION bump_provider_version('usuario_id');
+
+DROP TRIGGER IF EXISTS project_compliance_provider_version ON project_compliance;
+CREATE TRIGGER project_compliance_provider_version
+    AFTER INSERT OR UPDATE OR DELETE ON project_compliance
+    FOR EACH ROW EXECUTE FUNCTION bump_provider_version('provider_id');
+
+-- encabezado del bloque del proveedor
+DROP TRIGGER IF EXISTS usuarios_provider_version ON usuarios;
+CREATE TRIGGER usuarios_provider_version
+    AFTER UPDATE OF nombre, usuario, correo ON usuarios
+    FOR EACH ROW EXECUTE FUNCTION bump_provider_version('id');
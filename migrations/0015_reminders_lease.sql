@@ -0,0 +1,6 @@
+-- 0015: recordatorios apartados por un worker mientras se envían (reminders.py)
+--   El envío ya no ocurre dentro de la transacción del SELECT ... FOR UPDATE:
+--   el worker aparta el lote (locked_until) y hace commit antes de hablar con
+--   SMTP. Vencido locked_until, el lote vuelve a estar disponible.
+
+ALTER TABLE reminders ADD COLUMN IF NOT EXISTS locked_until TIMESTAMP;
@@ -0,0 +1,9 @@
+-- 0016: el outbox de S3 se borra sin transacción abierta (jobs.py)
+--   s3_delete_outbox.locked_until : lote apartado por un worker mientras llama
+--                                   a delete_objects; vencido, vuelve a la cola
+--   s3_blobs.deleting_until       : llave cas/ en 0 que se está borrando;
+--                                   retain_blob no la reutiliza mientras tanto
+
+ALTER TABLE s3_delete_outbox ADD COLUMN IF NOT EXISTS locked_until TIMESTAMP;
+
+ALTER TABLE s3_blobs ADD COLUMN IF NOT EXISTS deleting_until TIMESTAMP;
@@ -0,0 +1,13 @@
+-- 0017: llaves de staging de la subida directa a S3 (app.py: presign/confirm)
+--   Cada POST firmado deja aquí su llave; confirm la quita. Las que nadie
+--   confirmó (el navegador se cerró, S3 rechazó la subida, ...) las pasa
+--   jobs.sweep_staging a s3_delete_outbox pasado UPLOAD_STAGING_MAX_AGE.
+
+CREATE TABLE IF NOT EXISTS upload_staging(
+    s3_key TEXT PRIMARY KEY,
+    usuario_id INTEGER,                       -- sin FK: borrar el usuario no debe fallar aquí
+    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS upload_staging_created_idx
+    ON upload_staging(created_at);
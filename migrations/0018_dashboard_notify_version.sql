@@ -0,0 +1,37 @@
+-- 0018: versión global en los avisos del dashboard (live.py)
+--   Cada aviso lleva 'v' = nextval('repse_dashboard_seq'): el mismo número en
+--   todos los workers, que lo mandan como `id:` del evento SSE. Al reconectar,
+--   EventSource manda Last-Event-ID y el worker reenvía lo que llegó después o
+--   pide `resync`. Sólo cambia la función; los triggers de 0013 siguen igual.
+
+CREATE SEQUENCE IF NOT EXISTS repse_dashboard_seq;
+
+CREATE OR REPLACE FUNCTION notify_dashboard() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    r jsonb;
+    payload jsonb;
+    col text;
+BEGIN
+    IF current_setting('repse.notify', true) = 'off' THEN
+        RETURN NULL;
+    END IF;
+
+    r := to_jsonb(CASE WHEN TG_OP = 'DELETE' THEN OLD ELSE NEW END);
+    payload := jsonb_build_object(
+        'v', nextval('repse_dashboard_seq'),
+        't', TG_TABLE_NAME,
+        'op', TG_OP,
+        'id', r->'id',
+        'provider_id', COALESCE(r->'provider_id', r->'usuario_id'),
+        'project_id', r->'project_id'
+    );
+    IF TG_NARGS > 0 THEN
+        FOREACH col IN ARRAY TG_ARGV LOOP
+            payload := payload || jsonb_build_object(col, r->col);
+        END LOOP;
+    END IF;
+
+    PERFORM pg_notify('repse_dashboard', jsonb_strip_nulls(payload)::text);
+    RETURN NULL;
+END $$;
@@ -0,0 +1,376 @@
+# reminders.py  (recordatorios por correo: cola en BD + pool de workers SMTP)
+#
+#   r = enqueue_reminders(conn, provider_ids, subject, message)  # arma y encola
+#   conn.commit(); wake_workers()                                 # los workers envían
+#
+# El contenido se arma con los documentos que APLICAN y faltan por cargar
+# en los pedidos de cada proveedor (project_compliance + project_docs).
+# Dedupe: a lo más un recordatorio pendiente por proveedor (índice único
+# parcial). Cada worker: (1) aparta un lote con SKIP LOCKED + locked_until y
+# hace commit, (2) lo envía por una misma conexión SMTP sin tener conexión a
+# la BD, (3) guarda los resultados en otra transacción corta. Entrega "al
+# menos una vez": si el worker muere o el paso 3 falla, el lote vuelve a la
+# cola al vencer locked_until y se reintenta.
+import os
+import smtplib
+import sys
+import threading
+from email.message import EmailMessage
+from email.utils import make_msgid
+
+from db import get_conn
+
+SMTP_HOST = os.environ.get("SMTP_HOST", "")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", 587))
+SMTP_USER = os.environ.get("SMTP_USER", "")
+SMTP_PASSWORD = os.environ.get("SMTP_PASSWORD", "")
+SMTP_STARTTLS = os.environ.get("SMTP_STARTTLS", "1").lower() in ("1", "true")
+SMTP_SSL = os.environ.get("SMTP_SSL", "0").lower() in ("1", "true")
+SMTP_TIMEOUT = float(os.environ.get("SMTP_TIMEOUT", 20))
+SMTP_FROM = os.environ.get("SMTP_FROM", SMTP_USER or "no-reply@localhost")
+
+REMINDER_WORKERS = int(os.environ.get("REMINDER_WORKERS", 2))              # threads por proceso
+REMINDER_BATCH = int(os.environ.get("REMINDER_BATCH", 50))                 # correos por conexión/lote
+REMINDER_POLL_INTERVAL = float(os.environ.get("REMINDER_POLL_INTERVAL", 10))
+REMINDER_MAX_ATTEMPTS = int(os.environ.get("REMINDER_MAX_ATTEMPTS", 6))
+REMINDER_BACKOFF_BASE = float(os.environ.get("REMINDER_BACKOFF_BASE", 30))  # seg.; se duplica por intento
+REMINDER_BACKOFF_MAX = float(os.environ.get("REMINDER_BACKOFF_MAX", 3600))
+# un lote apartado vuelve a la cola si el worker no reporta en este tiempo
+# (murió a medio lote): cubre el peor caso de timeouts SMTP del lote
+REMINDER_LEASE = float(os.environ.get("REMINDER_LEASE", REMINDER_BATCH * SMTP_TIMEOUT + 60))
+
+DEFAULT_SUBJECT = "Documentos pendientes - REPSE"
+
+# ===================== ENCOLAR =====================
+def _missing_by_provider(cur, provider_ids: list[int]) -> dict:
+    """
+    {provider_id: {"nombre", "correo", "pedidos": [(etiqueta, [tipos...]), ...]}}
+    solo proveedores aprobados; los que no deben nada traen pedidos vacío.
+    """
+    cur.execute("""
+        SELECT u.id, u.nombre, u.correo,
+               p.id AS project_id, p.name, p.pedido_no, p.periodo_year, p.periodo_month,
+               pd.tipo_documento
+        FROM usuarios u
+        LEFT JOIN projects p
+               ON p.provider_id = u.id
+              AND p.id IN (SELECT project_id FROM project_compliance
+                           WHERE provider_id = u.id AND missing_count > 0)
+        LEFT JOIN project_docs pd
+               ON pd.project_id = p.id AND pd.aplica
+              AND NOT EXISTS (
+                  SELECT 1 FROM documentos g
+                  WHERE g.usuario_id = u.id AND g.project_id IS NULL
+                    AND g.tipo_documento = pd.tipo_documento
+              )
+        WHERE u.id = ANY(%s) AND u.rol = 2 AND u.estado = 'aprobado'
+        ORDER BY u.id, p.periodo_year, p.periodo_month, p.id, pd.tipo_documento
+    """, (provider_ids,))
+
+    out = {}
+    for uid, nombre, correo, project_id, name, pedido_no, year, month, tipo in cur.fetchall():
+        prov = out.setdefault(uid, {"nombre": nombre, "correo": correo, "pedidos": {}})
+        if project_id is None or tipo is None:
+            continue
+        label = f"Pedido {pedido_no}" if pedido_no else name
+        if year and month:
+            label += f" ({month:02d}/{year})"
+        prov["pedidos"].setdefault(project_id, (label, []))[1].append(tipo)
+
+    for prov in out.values():
+        prov["pedidos"] = list(prov["pedidos"].values())
+    return out
+
+def _build_body(nombre: str, message: str, pedidos) -> str:
+    lines = [f"Hola {nombre},", ""]
+    if message:
+        lines += [message, ""]
+    lines.append("Estos pedidos tienen documentos que aplican y aún no están cargados:")
+    lines.append("")
+    for label, tipos in pedidos:
+        lines.append(f"- {label}: {', '.join(tipos)}")
+    lines += ["", "Ingresa al portal REPSE para cargarlos.", ""]
+    return "\n".join(lines)
+
+def enqueue_reminders(conn, provider_ids, subject: str = "", message: str = "",
+                      created_by: int | None = None) -> dict:
+    """
+    Arma y encola un recordatorio por proveedor, en la transacción actual
+    (el que llama hace commit). Regresa:
+      {"queued": [...], "no_pendientes": [...], "sin_correo": [...], "duplicados": [...]}
+    """
+    provider_ids = sorted({int(x) for x in provider_ids})
+    result = {"queued": [], "no_pendientes": [], "sin_correo": [], "duplicados": []}
+    if not provider_ids:
+        return result
+
+    subject = (subject or "").strip() or DEFAULT_SUBJECT
+    message = (message or "").strip()
+
+    with conn.cursor() as cur:
+        providers = _missing_by_provider(cur, provider_ids)
+
+        rows = []
+        for uid, prov in providers.items():
+            if not prov["pedidos"]:
+                result["no_pendientes"].append(uid)
+            elif not (prov["correo"] or "").strip():
+                result["sin_correo"].append(uid)
+            else:
+                rows.append((uid, prov["correo"].strip(), _build_body(prov["nombre"], message, prov["pedidos"])))
+
+        if rows:
+            cur.execute("""
+                INSERT INTO reminders(provider_id, to_email, subject, body, created_by)
+                SELECT t.provider_id, t.to_email, %(subject)s, t.body, %(created_by)s
+                FROM unnest(%(ids)s::int[], %(emails)s::text[], %(bodies)s::text[])
+                     AS t(provider_id, to_email, body)
+                ON CONFLICT (provider_id) WHERE status = 'pending' DO NOTHING
+                RETURNING provider_id
+            """, {
+                "subject": subject,
+                "created_by": created_by,
+                "ids": [r[0] for r in rows],
+                "emails": [r[1] for r in rows],
+                "bodies": [r[2] for r in rows],
+            })
+            queued = {r[0] for r in cur.fetchall()}
+            result["queued"] = sorted(queued)
+            result["duplicados"] = sorted(r[0] for r in rows if r[0] not in queued)
+
+    return result
+
+def queue_stats(conn) -> dict:
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT status, COUNT(*), MIN(created_at) FILTER (WHERE status='pending')
+            FROM reminders GROUP BY status
+        """)
+        rows = cur.fetchall()
+    stats = {"pending": 0, "sent": 0, "failed": 0, "oldest_pending": None}
+    for status, n, oldest in rows:
+        stats[status] = n
+        if oldest:
+            stats["oldest_pending"] = oldest.isoformat()
+    return stats
+
+# ===================== ENVÍO (SMTP) =====================
+class SmtpSession:
+    """
+    Una conexión SMTP reutilizada entre correos (y lotes) del mismo worker;
+    se abre al primer envío y se reconecta si el servidor la cerró.
+    """
+
+    def __init__(self):
+        self._smtp = None
+
+    def _connect(self):
+        if SMTP_SSL:
+            smtp = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        else:
+            smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+            if SMTP_STARTTLS:
+                smtp.starttls()
+        if SMTP_USER:
+            smtp.login(SMTP_USER, SMTP_PASSWORD)
+        self._smtp = smtp
+
+    def send(self, msg: EmailMessage):
+        if self._smtp is None:
+            self._connect()
+        try:
+            self._smtp.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            self._smtp = None
+            self._connect()
+            self._smtp.send_message(msg)
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (OSError, smtplib.SMTPException):
+                pass
+            self._smtp = None
+
+def _message(to_email: str, subject: str, body: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = SMTP_FROM
+    msg["To"] = to_email
+    msg["Subject"] = subject
+    msg["Message-ID"] = make_msgid(domain=SMTP_FROM.rsplit("@", 1)[-1])
+    msg.set_content(body)
+    return msg
+
+def _claim(limit: int) -> list[tuple]:
+    """
+    Toma un lote de recordatorios vencidos (SKIP LOCKED) y los aparta
+    (locked_until) en una transacción CORTA: el envío ya no tiene la
+    conexión del pool ni los locks de las filas.
+    """
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("""
+            UPDATE reminders r
+            SET locked_until = NOW() + %(lease)s * INTERVAL '1 second'
+            FROM (
+                SELECT id FROM reminders
+                WHERE status='pending' AND next_attempt_at <= NOW()
+                  AND (locked_until IS NULL OR locked_until <= NOW())
+                ORDER BY next_attempt_at, id
+                LIMIT %(limit)s
+                FOR UPDATE SKIP LOCKED
+            ) c
+            WHERE r.id = c.id
+            RETURNING r.id, r.to_email, r.subject, r.body
+        """, {"lease": REMINDER_LEASE, "limit": limit})
+        rows = cur.fetchall()
+        conn.commit()
+    return sorted(rows)
+
+def _record(sent_ids: list, failures: list):
+    """
+    Guarda el resultado del lote (otra transacción corta) y libera las filas.
+    """
+    with get_conn() as conn, conn.cursor() as cur:
+        if sent_ids:
+            cur.execute("""
+                UPDATE reminders
+                SET status='sent', attempts=attempts+1, sent_at=NOW(), last_error=NULL, locked_until=NULL
+                WHERE id = ANY(%s)
+            """, (sent_ids,))
+
+        if failures:
+            cur.execute("""
+                UPDATE reminders r
+                SET attempts=r.attempts+1,
+                    last_error=f.err,
+                    locked_until=NULL,
+                    status=CASE WHEN f.permanent OR r.attempts+1 >= %(max)s THEN 'failed' ELSE 'pending' END,
+                    next_attempt_at=NOW() + LEAST(%(base)s * power(2, r.attempts), %(cap)s) * INTERVAL '1 second'
+                FROM unnest(%(ids)s::bigint[], %(errs)s::text[], %(perm)s::bool[]) AS f(id, err, permanent)
+                WHERE r.id=f.id
+            """, {
+                "max": REMINDER_MAX_ATTEMPTS,
+                "base": REMINDER_BACKOFF_BASE,
+                "cap": REMINDER_BACKOFF_MAX,
+                "ids": [f[0] for f in failures],
+                "errs": [f[1] for f in failures],
+                "perm": [f[2] for f in failures],
+            })
+        conn.commit()
+
+def drain_once(smtp: SmtpSession, limit: int = REMINDER_BATCH) -> int:
+    """
+    Aparta un lote de recordatorios vencidos, los envía por la conexión
+    `smtp` SIN tener conexión a la BD y guarda el resultado. Regresa cuántos
+    procesó.
+    """
+    rows = _claim(limit)
+    if not rows:
+        return 0
+
+    sent_ids = []
+    failures = []   # (id, error, permanente)
+    for i, (rid, to_email, subject, body) in enumerate(rows):
+        try:
+            smtp.send(_message(to_email, subject, body))
+            sent_ids.append(rid)
+        except smtplib.SMTPRecipientsRefused as e:
+            codes = [code for code, _ in e.recipients.values()]
+            failures.append((rid, f"Destinatario rechazado: {e.recipients}", all(c >= 500 for c in codes)))
+        except smtplib.SMTPResponseException as e:
+            # 5xx = rechazo definitivo; 4xx = temporal
+            failures.append((rid, f"{e.smtp_code} {e.smtp_error!r}", e.smtp_code >= 500))
+        except (OSError, smtplib.SMTPException) as e:
+            # sin conexión: no tiene caso intentar el resto del lote ahora
+            smtp.close()
+            err = f"{type(e).__name__}: {e}"
+            failures.extend((r[0], err, False) for r in rows[i:])
+            break
+
+    _record(sent_ids, failures)
+    return len(rows)
+
+def drain_all() -> int:
+    """
+    Envía hasta que no quedan recordatorios vencidos (CLI / pruebas).
+    """
+    total = 0
+    smtp = SmtpSession()
+    try:
+        while True:
+            n = drain_once(smtp)
+            total += n
+            if n < REMINDER_BATCH:
+                return total
+    finally:
+        smtp.close()
+
+# -------- pool de workers (threads por proceso) --------
+_workers = []
+_workers_pid = None
+_wake = threading.Event()
+_workers_lock = threading.Lock()
+
+def _worker_loop(wake: threading.Event):
+    smtp = SmtpSession()
+    while True:
+        try:
+            n = drain_once(smtp)
+        except Exception as e:
+            print("Reminders error:", e)
+            n = 0
+        if n >= REMINDER_BATCH:
+            continue  # probablemente hay más en cola; misma conexión
+        smtp.close()  # cola vacía: no dejar la conexión ociosa
+        wake.wait(REMINDER_POLL_INTERVAL)
+        wake.clear()
+
+def ensure_workers():
+    """
+    Arranca el pool de ESTE proceso si no existe. Sin SMTP_HOST no arranca
+    (los recordatorios se quedan en cola).
+    """
+    global _workers, _workers_pid, _wake
+    if not SMTP_HOST or REMINDER_WORKERS < 1:
+        return
+    pid = os.getpid()
+    if _workers_pid == pid and all(t.is_alive() for t in _workers):
+        return
+
+    with _workers_lock:
+        if _workers_pid != pid or not all(t.is_alive() for t in _workers):
+            if _workers_pid != pid:
+                _workers = []
+                _wake = threading.Event()
+            _workers = [t for t in _workers if t.is_alive()]
+            for n in range(len(_workers), REMINDER_WORKERS):
+                t = threading.Thread(
+                    target=_worker_loop, args=(_wake,), name=f"reminders-{pid}-{n}", daemon=True
+                )
+                t.start()
+                _workers.append(t)
+            _workers_pid = pid
+
+def wake_workers():
+    # llamar DESPUÉS del commit
+    ensure_workers()
+    _wake.set()
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    cmd = argv[0] if argv else ""
+    if cmd == "drain":
+        if not SMTP_HOST:
+            raise RuntimeError("SMTP_HOST no está definido en variables de entorno.")
+        print(f"Recordatorios procesados: {drain_all()}")
+        return 0
+    if cmd == "status":
+        with get_conn() as conn:
+            print(queue_stats(conn))
+        return 0
+    print("Uso: python reminders.py drain|status")
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+# rows.py  (filas tipadas por caso de uso: columnas explícitas + NamedTuple)
+#
+#   cur = conn.cursor(row_factory=row_factory(ProjectRow))
+#   cur.execute(f"SELECT {columns(ProjectRow)} FROM projects WHERE ...")
+#
+# Cada consulta pide SOLO las columnas de su tipo (nada de SELECT *: usuarios
+# trae ~25 columnas, incluidos los hashes de contraseña) y cada fila es una
+# tupla con nombre en vez de un dict: menos bytes desde PostgreSQL y menos
+# memoria por fila. En los templates usar `row.campo`: `row['campo']` también
+# funciona, pero Jinja primero intenta tuple['campo'] (excepción) y luego getattr.
+from datetime import date, datetime
+from typing import NamedTuple
+
+class UserAuthRow(NamedTuple):
+    """
+    Login: lo mínimo para validar la contraseña y armar la sesión.
+    """
+    id: int
+    usuario: str
+    password: str
+    rol: int
+    estado: str
+
+class ProviderRow(NamedTuple):
+    """
+    Usuarios en las listas del dashboard admin (pendientes, proveedores,
+    selects, tarjetas). El detalle completo se pide aparte (PROVIDER_DETAIL_COLUMNS).
+    """
+    id: int
+    nombre: str
+    usuario: str
+    correo: str
+    rol: int
+    empresa: str | None
+    rfc: str | None
+    repse_numero: str | None
+
+# detalle de un proveedor (pestaña "Información de proveedor", bajo demanda);
+# sin password / mail_password
+PROVIDER_DETAIL_COLUMNS = (
+    "id", "nombre", "usuario", "correo", "estado",
+    "empresa", "rfc", "repse", "domicilio", "telefono", "representante_legal",
+    "repse_numero", "repse_folio", "repse_aviso", "repse_fecha_aviso", "repse_vigencia",
+    "repse_regimen", "repse_objeto",
+    "contacto_nombre", "contacto_tel", "contacto_correo",
+)
+
+class ProjectRow(NamedTuple):
+    id: int
+    provider_id: int
+    name: str
+    pedido_no: str | None
+    periodo_year: int | None
+    periodo_month: int | None
+    created_at: datetime
+    completed: int | None
+
+class GlobalDocRow(NamedTuple):
+    """
+    Documento global (project_id NULL): lo que muestran los dashboards; la
+    ruta de S3 sólo la lee la descarga.
+    """
+    id: int
+    usuario_id: int
+    tipo_documento: str | None
+    nombre_archivo: str
+    fecha_subida: datetime
+
+class ProjectDocRow(NamedTuple):
+    project_id: int
+    tipo_documento: str
+    aplica: bool
+    completed: bool
+
+class ComplianceRow(NamedTuple):
+    project_id: int
+    aplica_count: int
+    uploaded_count: int
+    missing_count: int
+    completed: bool
+
+class EnabledPeriodRow(NamedTuple):
+    id: int
+    provider_id: int
+    periodo_year: int
+    periodo_month: int
+
+class EnabledPeriodAdminRow(NamedTuple):
+    """
+    Meses habilitados en el dashboard admin (con el proveedor).
+    """
+    id: int
+    provider_id: int
+    periodo_year: int
+    periodo_month: int
+    nombre: str
+    usuario: str
+    correo: str
+
+class ExportRow(NamedTuple):
+    """
+    Exportación de cumplimiento: una fila por (pedido, tipo de documento).
+    """
+    proveedor: str
+    usuario: str
+    rfc: str | None
+    pedido_no: str | None
+    pedido: str
+    periodo_year: int | None
+    periodo_month: int | None
+    tipo_documento: str
+    aplica: bool
+    nombre_archivo: str | None
+    fecha_subida: datetime | None
+    pedido_completado: bool
+
+class ZipDocRow(NamedTuple):
+    """
+    Documento global a empaquetar en el ZIP de descarga.
+    """
+    id: int
+    usuario: str
+    tipo_documento: str | None
+    nombre_archivo: str
+    ruta: str
+
+def columns(cls, alias: str | None = None) -> str:
+    """
+    Lista de columnas del tipo para el SELECT ("a.id, a.nombre, ...").
+    """
+    prefix = f"{alias}." if alias else ""
+    return ", ".join(prefix + f for f in cls._fields)
+
+def row_factory(cls):
+    """
+    row_factory de psycopg que arma `cls` por posición (sin dict intermedio).
+    Falla si el SELECT no trae exactamente las columnas del tipo, en orden.
+    """
+    make = cls._make
+    fields = cls._fields
+
+    def factory(cursor):
+        names = tuple(c.name for c in cursor.description or ())
+        if names and names != fields:
+            raise ValueError(f"{cls.__name__}: el SELECT trae {names}, se esperaba {fields}")
+        return make
+
+    return factory
+
+def jsonable(row: dict) -> dict:
+    """
+    Fechas a ISO (jsonify las manda en formato HTTP).
+    """
+    return {k: v.isoformat() if isinstance(v, (date, datetime)) else v for k, v in row.items()}
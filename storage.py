@@ -0,0 +1,178 @@
+# storage.py  (AWS S3: cliente, URLs firmadas y borrado)
+#
+# El cliente de boto3 se crea al PRIMER uso y uno por proceso (get_s3()):
+# importar boto3 cuesta ~100 ms y un cliente creado antes del fork de gunicorn
+# (--preload) no debe compartirse entre workers. Nada aquí importa boto3 al
+# cargar el módulo.
+import base64
+import os
+import re
+import threading
+
+from cache import TTLCache
+
+AWS_REGION = os.environ.get("AWS_REGION", "us-east-2")
+BUCKET_NAME = os.environ.get("AWS_BUCKET_NAME", "repse-documento")
+# Endpoint alterno (MinIO, moto server, etc.); vacío = AWS
+S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL") or None
+# x-amz-checksum-sha256 en el POST firmado: S3 verifica el contenido y lo
+# guarda; 0 para endpoints que rechazan el campo
+S3_CHECKSUM_SHA256 = os.environ.get("S3_CHECKSUM_SHA256", "1").lower() in ("1", "true")
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+_client_hooks = []
+
+def on_s3_client(hook):
+    """
+    Registra hook(client), llamado con cada cliente nuevo (p. ej. métricas).
+    """
+    _client_hooks.append(hook)
+
+def get_s3():
+    """
+    Cliente S3 de ESTE proceso; se crea en el primer uso (y otra vez tras un
+    fork, con su propia Session: la de boto3 por defecto no es segura entre procesos).
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            import boto3.session
+
+            client = boto3.session.Session().client(
+                "s3",
+                aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
+                aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY"),
+                region_name=AWS_REGION,
+                endpoint_url=S3_ENDPOINT_URL,
+            )
+            for hook in _client_hooks:
+                hook(client)
+            _client = client
+            _client_pid = pid
+    return _client
+
+# delete_objects acepta máximo 1000 llaves por llamada
+S3_DELETE_BATCH = 1000
+
+def clean_filename(name: str) -> str:
+    name = name or "archivo"
+    name = re.sub(r"[^a-zA-Z0-9._-]+", "_", name).strip("_")
+    return name[:180] if len(name) > 180 else name
+
+# URLs firmadas: vigencia en S3 y cache local que las expira ANTES (margen)
+PRESIGN_EXPIRES = int(os.environ.get("PRESIGN_EXPIRES", 300))
+PRESIGN_MARGIN = int(os.environ.get("PRESIGN_MARGIN", 60))
+_presign_cache = TTLCache(
+    maxsize=int(os.environ.get("PRESIGN_CACHE_SIZE", 2048)),
+    ttl=max(PRESIGN_EXPIRES - PRESIGN_MARGIN, 0),
+)
+
+def get_presigned_url(s3_key: str, download_name: str | None = None) -> str | None:
+    if not s3_key:
+        return None
+
+    cache_key = (s3_key, download_name)
+    url = _presign_cache.get(cache_key)
+    if url:
+        return url
+
+    try:
+        params = {"Bucket": BUCKET_NAME, "Key": s3_key}
+        if download_name:
+            params["ResponseContentDisposition"] = f'attachment; filename="{clean_filename(download_name)}"'
+        url = get_s3().generate_presigned_url("get_object", Params=params, ExpiresIn=PRESIGN_EXPIRES)
+    except Exception as e:
+        print("Presign error:", e)
+        return None
+
+    _presign_cache.set(cache_key, url)
+    return url
+
+def presign_upload(key: str, content_type: str, max_bytes: int, expires: int,
+                   sha256: str | None = None) -> dict:
+    """
+    POST firmado para que el navegador suba DIRECTO a S3 (sin pasar por
+    gunicorn). S3 rechaza otro Content-Type o un tamaño fuera de rango.
+    Con `sha256` (hex) también exige ese checksum: S3 rechaza otro contenido
+    y lo deja en el objeto (head_object(..., checksum=True)).
+    Regresa {"url": ..., "fields": {...}}; el archivo va como último campo.
+    """
+    fields = {"acl": "private", "Content-Type": content_type}
+    if sha256 and S3_CHECKSUM_SHA256:
+        fields["x-amz-checksum-algorithm"] = "SHA256"
+        fields["x-amz-checksum-sha256"] = base64.b64encode(bytes.fromhex(sha256)).decode()
+    return get_s3().generate_presigned_post(
+        Bucket=BUCKET_NAME,
+        Key=key,
+        Fields=fields,
+        Conditions=[{k: v} for k, v in fields.items()] + [
+            ["content-length-range", 1, max_bytes],
+        ],
+        ExpiresIn=expires,
+    )
+
+def head_object(key: str, checksum: bool = False) -> dict | None:
+    """
+    Metadatos del objeto (ContentLength, ContentType, ...) o None si no existe.
+    Con `checksum` pide también los checksums guardados (ChecksumSHA256, si
+    la subida lo traía).
+    """
+    s3 = get_s3()
+    params = {"Bucket": BUCKET_NAME, "Key": key}
+    if checksum:
+        params["ChecksumMode"] = "ENABLED"
+    try:
+        return s3.head_object(**params)
+    except s3.exceptions.ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+
+def open_object(key: str):
+    """
+    GET en streaming: regresa (tamaño, body) sin leer el contenido; el body
+    (StreamingBody) se consume con iter_chunks() y se cierra con close().
+    """
+    obj = get_s3().get_object(Bucket=BUCKET_NAME, Key=key)
+    return obj["ContentLength"], obj["Body"]
+
+def copy_object(src: str, dst: str):
+    """
+    Copia del lado de S3 (los bytes no pasan por la app); conserva ContentType.
+    """
+    get_s3().copy_object(Bucket=BUCKET_NAME, Key=dst, CopySource={"Bucket": BUCKET_NAME, "Key": src})
+
+def s3_delete_key(key: str):
+    if not key:
+        return
+    try:
+        get_s3().delete_object(Bucket=BUCKET_NAME, Key=key)
+    except Exception as e:
+        print("S3 delete error:", e)
+
+def s3_delete_keys(keys: list[str]) -> dict[str, str]:
+    """
+    Borra hasta S3_DELETE_BATCH llaves en UNA llamada (delete_objects).
+    Regresa {llave: error} de las que fallaron; vacío = todas borradas.
+    Una llave que ya no existe cuenta como borrada (S3 no la reporta).
+    Si la llamada completa falla, se propaga la excepción.
+    """
+    if not keys:
+        return {}
+    if len(keys) > S3_DELETE_BATCH:
+        raise ValueError(f"Máximo {S3_DELETE_BATCH} llaves por lote.")
+
+    resp = get_s3().delete_objects(
+        Bucket=BUCKET_NAME,
+        Delete={"Objects": [{"Key": k} for k in keys], "Quiet": True},
+    )
+    return {
+        e.get("Key"): f"{e.get('Code')}: {e.get('Message')}"
+        for e in resp.get("Errors", [])
+    }